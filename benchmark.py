@@ -0,0 +1,252 @@
+import argparse
+import json
+import platform
+import statistics
+import time
+from datetime import datetime
+from functools import partial
+
+import consultas
+import generador_datos
+from cache_referencia import CacheReferencia
+from indice_prefijos import IndicePrefijos
+from modelo import registro_cliente, registro_producto
+from pool_conexiones import PoolConexiones
+from reporte import MotorReporte
+
+# =========================
+# BENCHMARK DE CARGAS Y REPORTES
+# =========================
+# Mide sin ventana lo mismo que hace programa.py en cada carga: las mismas
+# funciones de consultas.py, el cache de referencia y los indices de los
+# combos. Cada operacion se repite varias veces y se guarda el minimo, la
+# mediana y el percentil 95 en un JSON; --comparar muestra la diferencia
+# con una corrida anterior.
+#
+#   python generador_datos.py --sqlite bench.db --escala 100k
+#   python benchmark.py --sqlite bench.db --salida despues.json --comparar antes.json
+
+TABLAS = ("clientes", "productos", "ventas", "detalle_venta", "pedido", "detalle_pedido",
+          "clienPedido", "clienXproducto")
+FILAS_POR_PAGINA = 100  # como tabla_ventas.tamano_pagina
+BUSQUEDAS = ("lu", "maria lo", "carlos p", "to", "ramos")
+
+
+def medir(funcion, repeticiones):
+    # Devuelve (estadisticas en ms, ultimo resultado)
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        "repeticiones": repeticiones,
+        "min_ms": round(tiempos[0], 2),
+        "mediana_ms": round(statistics.median(tiempos), 2),
+        "p95_ms": round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+        "max_ms": round(tiempos[-1], 2),
+    }, resultado
+
+
+class Benchmark:
+    def __init__(self, pool, repeticiones=5, escrituras=True):
+        self.pool = pool
+        self.repeticiones = repeticiones
+        self.escrituras = escrituras
+        self.cache = CacheReferencia()
+        self.indices = {"clientes": IndicePrefijos(), "productos": IndicePrefijos()}
+        self.resultados = {}
+
+    def _registrar(self, nombre, funcion, repeticiones=None, **extra):
+        estadisticas, resultado = medir(funcion, repeticiones or self.repeticiones)
+        estadisticas.update(extra)
+        self.resultados[nombre] = estadisticas
+        print(f"   {nombre:<28} mediana {estadisticas['mediana_ms']:>10.1f} ms"
+              f"   p95 {estadisticas['p95_ms']:>10.1f} ms")
+        return resultado
+
+    # -------------------------
+    # CARGAS
+    # -------------------------
+    def _cargar_referencia(self, entidad, listar, registro):
+        # Igual que recibir_bloque + al_agregar_bloque: cache e indice por bloques
+        indice = self.indices[entidad]
+        primer_bloque = []
+        inicio = time.perf_counter()
+
+        def notificar(parcial):
+            _, filas, primero, ultimo = parcial
+            if primero:
+                self.cache.comenzar_carga(entidad)
+                indice.reemplazar(())
+            self.cache.agregar_bloque(entidad, filas)
+            indice.agregar_lote(registro(fila) for fila in filas)
+            if not primer_bloque:
+                primer_bloque.append((time.perf_counter() - inicio) * 1000)
+            if ultimo:
+                self.cache.terminar_carga(entidad)
+
+        with self.pool.conexion() as conexion:
+            listar(conexion, notificar)
+        return primer_bloque[0] if primer_bloque else 0.0
+
+    def cargas(self):
+        for entidad, listar, registro in (("clientes", consultas.listar_clientes, registro_cliente),
+                                          ("productos", consultas.listar_productos, registro_producto)):
+            primeros = []
+            self._registrar(f"cargar_{entidad}",
+                            lambda: primeros.append(self._cargar_referencia(entidad, listar, registro)))
+            self.resultados[f"cargar_{entidad}"]["primer_bloque_ms"] = round(statistics.median(primeros), 2)
+            self.resultados[f"cargar_{entidad}"]["filas"] = self.cache.total(entidad)
+
+        for entidad, contar, paginar in (("ventas", consultas.contar_ventas, consultas.pagina_ventas),
+                                         ("pedidos", consultas.contar_pedidos, consultas.pagina_pedidos)):
+            with self.pool.conexion() as conexion:
+                total = contar(conexion)
+            self._registrar(f"cargar_{entidad}", partial(self._primera_pagina, contar, paginar), filas=total)
+            self._registrar(f"pagina_media_{entidad}",
+                            partial(self._pagina, paginar, total // 2))
+
+    def _primera_pagina(self, contar, paginar):
+        # Lo que hace una TablaVirtual al recargarse: total y primera pagina
+        with self.pool.conexion() as conexion:
+            return contar(conexion), paginar(conexion, 0, FILAS_POR_PAGINA)
+
+    def _pagina(self, paginar, desde):
+        with self.pool.conexion() as conexion:
+            return paginar(conexion, desde, FILAS_POR_PAGINA)
+
+    # -------------------------
+    # COMBOS
+    # -------------------------
+    def combos(self):
+        for entidad, registro in (("clientes", registro_cliente), ("productos", registro_producto)):
+            indice = self.indices[entidad]
+            filas = getattr(self.cache, entidad).values()
+            self._registrar(f"combo_{entidad}_reconstruir",
+                            lambda: indice.reemplazar(registro(fila) for fila in filas))
+        self._registrar("combo_clientes_buscar",
+                        lambda: [self.indices["clientes"].buscar(texto) for texto in BUSQUEDAS],
+                        busquedas=len(BUSQUEDAS))
+
+    # -------------------------
+    # ORDEN POR COLUMNA
+    # -------------------------
+    def orden(self):
+        # La primera vez arma las claves de la columna; despues reordenar o
+        # invertir el sentido solo lee la lista guardada
+        for nombre, columna in (("nombre", 1), ("precio", 4)):
+            self._registrar(f"ordenar_productos_{nombre}",
+                            partial(self.cache.ordenar, "productos", (columna, False)), repeticiones=1)
+
+        def reordenar():
+            self.cache.ordenar("productos", (4, True))
+            return self.cache.pagina("productos", 0, FILAS_POR_PAGINA)
+        self._registrar("reordenar_productos", reordenar)
+        self.cache.ordenar("productos", None)
+
+    # -------------------------
+    # PEDIDOS Y REPORTE
+    # -------------------------
+    def crear_pedido(self):
+        if not self.escrituras:
+            return
+        # Los productos con mas stock, para que ningun pedido falle
+        productos = sorted(self.cache.productos.values(), key=lambda fila: fila[5], reverse=True)[:3]
+        lineas = [(fila[0], 1, fila[4]) for fila in productos]
+        cliente = next(iter(self.cache.clientes.values()), None)
+
+        def crear():
+            with self.pool.conexion() as conexion:
+                return consultas.registrar_pedido(conexion, cliente and cliente[0], None, lineas)
+        self._registrar("crear_pedido", crear, repeticiones=max(20, self.repeticiones), lineas=len(lineas))
+
+    def reporte(self):
+        def secuencial():
+            with self.pool.conexion() as conexion:
+                return consultas.reporte_general(conexion)
+        self._registrar("reporte_secuencial", secuencial)
+
+        motor = MotorReporte(self.pool, vigencia=0)
+        try:
+            self._registrar("generar_reporte_ventas", motor.generar)
+        finally:
+            motor.cerrar()
+
+    def ejecutar(self):
+        self.cargas()
+        self.combos()
+        self.orden()
+        self.crear_pedido()
+        self.reporte()
+        return self.resultados
+
+
+def contar_filas(pool):
+    with pool.conexion() as conexion:
+        cursor = conexion.cursor()
+        filas = {}
+        for tabla in TABLAS:
+            cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+            filas[tabla] = cursor.fetchone()[0]
+        return filas
+
+def comparar(actual, anterior):
+    print(f"\n{'operacion':<28} {'antes':>10} {'ahora':>10} {'cambio':>8}")
+    for nombre, datos in actual["resultados"].items():
+        previo = anterior["resultados"].get(nombre)
+        if not previo:
+            continue
+        antes, ahora = previo["mediana_ms"], datos["mediana_ms"]
+        cambio = f"{ahora / antes:.2f}x" if antes else "-"
+        print(f"{nombre:<28} {antes:>10.1f} {ahora:>10.1f} {cambio:>8}")
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Benchmark de cargas y reportes de tiendas")
+    origen = analizador.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--odbc", help="cadena de conexion ODBC a SQL Server")
+    origen.add_argument("--sqlite", help="archivo SQLite local")
+    analizador.add_argument("--generar", metavar="ESCALA",
+                            help="antes de medir, agrega datos con generador_datos.py")
+    analizador.add_argument("--repeticiones", type=int, default=5)
+    analizador.add_argument("--sin-escrituras", action="store_true", help="no mide crear_pedido")
+    analizador.add_argument("--salida", default="benchmark.json")
+    analizador.add_argument("--comparar", metavar="JSON", help="resultado anterior para comparar")
+    argumentos = analizador.parse_args()
+
+    if argumentos.generar:
+        conexion, sqlserver = generador_datos.abrir(argumentos.sqlite, argumentos.odbc)
+        generador_datos.generar(conexion, generador_datos.leer_escala(argumentos.generar),
+                                sqlserver=sqlserver)
+        conexion.close()
+
+    if argumentos.sqlite:
+        import sqlite_local
+        fabrica = partial(sqlite_local.conectar, argumentos.sqlite)
+    else:
+        import pyodbc
+        fabrica = partial(pyodbc.connect, argumentos.odbc)
+    pool = PoolConexiones(fabrica, tamano_maximo=len(consultas.PARTES_REPORTE))
+
+    filas = contar_filas(pool)
+    print(f"Base: {argumentos.sqlite or 'SQL Server'} - {sum(filas.values()):,} filas")
+    resultados = Benchmark(pool, argumentos.repeticiones, not argumentos.sin_escrituras).ejecutar()
+    pool.cerrar()
+
+    salida = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "base": "sqlite" if argumentos.sqlite else "sqlserver",
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "filas": filas,
+        "resultados": resultados,
+    }
+    with open(argumentos.salida, "w", encoding="utf-8") as archivo:
+        json.dump(salida, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados en {argumentos.salida}")
+
+    if argumentos.comparar:
+        with open(argumentos.comparar, encoding="utf-8") as archivo:
+            comparar(salida, json.load(archivo))
@@ -0,0 +1,250 @@
+import bisect
+from decimal import Decimal
+
+# =========================
+# CACHE DE DATOS DE REFERENCIA
+# =========================
+# Clientes y productos se cargan una sola vez y se guardan aqui; la tabla
+# de clientes, la de productos y los tres combos se derivan de este cache
+# en lugar de consultar cada uno la base de datos. Las escrituras lo
+# corrigen fila por fila y avisan a los oyentes suscritos.
+#
+# Solo debe usarse desde el hilo de Tk.
+
+ENTIDADES = ("clientes", "productos")
+
+
+class _Vacio:
+    # Va despues de cualquier valor, para que los NULL queden al final
+    def __lt__(self, otro):
+        return False
+
+    def __gt__(self, otro):
+        return otro is not self
+
+    def __eq__(self, otro):
+        return otro is self
+
+    __hash__ = object.__hash__
+
+VACIO = _Vacio()
+
+def clave_orden(valor):
+    # Clave tipada para ordenar por una columna: numeros, importes y fechas
+    # por su valor y no por su texto (asi "1200.00" va despues de "45.00"),
+    # textos sin distinguir mayusculas y los vacios al final (en orden
+    # ascendente). Los importes
+    # se comparan como float, que conserva su orden y se compara mas rapido.
+    if valor is None:
+        return VACIO
+    if isinstance(valor, str):
+        return valor.casefold()
+    if isinstance(valor, Decimal):
+        return float(valor)
+    return valor
+
+
+class CacheReferencia:
+    def __init__(self, entidades=ENTIDADES):
+        self._filas = {entidad: {} for entidad in entidades}  # id -> fila
+        self._ids = {entidad: [] for entidad in entidades}    # ids ordenados
+        self._orden = {entidad: None for entidad in entidades}   # (columna, descendente)
+        self._claves = {entidad: {} for entidad in entidades}    # columna -> [(clave, id)]
+        self._oyentes = []  # (oyente, al_agregar_bloque)
+        self._entrantes = {}  # entidad -> {id: fila} de una carga que conserva las filas
+        self.cargado = {entidad: False for entidad in entidades}
+
+    @property
+    def clientes(self):
+        return self._filas["clientes"]
+
+    @property
+    def productos(self):
+        return self._filas["productos"]
+
+    def suscribir(self, oyente, al_agregar_bloque=None):
+        # oyente(entidad, anterior, nueva):
+        #   alta -> (None, fila); cambio -> (fila, fila); baja -> (fila, None)
+        #   recarga completa -> (None, None)
+        # al_agregar_bloque(entidad, filas): durante una carga por bloques.
+        # Quien no lo indique recibe una sola recarga completa al terminar.
+        self._oyentes.append((oyente, al_agregar_bloque))
+
+    def _avisar(self, entidad, anterior, nueva):
+        for oyente, _ in self._oyentes:
+            oyente(entidad, anterior, nueva)
+
+    # -------------------------
+    # CARGA Y CAMBIOS
+    # -------------------------
+    def reemplazar(self, entidad, filas):
+        self._filas[entidad] = {fila[0]: fila for fila in filas}
+        self._ids[entidad] = sorted(self._filas[entidad])
+        self._claves[entidad].clear()
+        self._armar_orden(entidad)
+        self.cargado[entidad] = True
+        self._avisar(entidad, None, None)
+
+    # Carga por bloques: comenzar_carga vacia la entidad, cada bloque se
+    # agrega al final (las filas llegan ordenadas por id) y terminar_carga
+    # la marca como completa.
+    #
+    # Con conservar=True (filas de una instantanea a la vista) las filas
+    # actuales siguen hasta el final: los bloques se juntan aparte, sin
+    # avisar a nadie, y terminar_carga los pone en su lugar de una vez.
+    def comenzar_carga(self, entidad, conservar=False):
+        if conservar:
+            self._entrantes[entidad] = {}
+        else:
+            self._entrantes.pop(entidad, None)
+            self.reemplazar(entidad, [])
+        self.cargado[entidad] = False
+
+    def agregar_bloque(self, entidad, filas):
+        entrantes = self._entrantes.get(entidad)
+        if entrantes is not None:
+            for fila in filas:
+                entrantes.setdefault(fila[0], fila)
+            return
+        filas_entidad = self._filas[entidad]
+        ids = self._ids[entidad]
+        for fila in filas:
+            if fila[0] in filas_entidad:
+                continue
+            filas_entidad[fila[0]] = fila
+            if not ids or fila[0] > ids[-1]:
+                ids.append(fila[0])
+            else:
+                bisect.insort(ids, fila[0])
+        for columna, claves in self._claves[entidad].items():
+            # Dos tramos ya ordenados: sort() los intercala en tiempo lineal
+            claves.extend(sorted((clave_orden(fila[columna]), fila[0]) for fila in filas))
+            claves.sort()
+        for oyente, al_agregar_bloque in self._oyentes:
+            if al_agregar_bloque is not None:
+                al_agregar_bloque(entidad, filas)
+
+    def terminar_carga(self, entidad):
+        entrantes = self._entrantes.pop(entidad, None)
+        if entrantes is not None:
+            self.reemplazar(entidad, entrantes.values())
+            return
+        self.cargado[entidad] = True
+        for oyente, al_agregar_bloque in self._oyentes:
+            if al_agregar_bloque is None:
+                oyente(entidad, None, None)
+
+    def recibidas(self, entidad):
+        # Filas traidas por la carga en curso
+        entrantes = self._entrantes.get(entidad)
+        return self.total(entidad) if entrantes is None else len(entrantes)
+
+    def guardar(self, entidad, fila):
+        # Durante una carga que conserva las filas, el cambio vale para las
+        # dos: la que se ve y la que la reemplazara
+        if entidad in self._entrantes:
+            self._entrantes[entidad][fila[0]] = fila
+        filas = self._filas[entidad]
+        anterior = filas.get(fila[0])
+        filas[fila[0]] = fila
+        if anterior is None:
+            ids = self._ids[entidad]
+            if not ids or fila[0] > ids[-1]:
+                ids.append(fila[0])
+            else:
+                bisect.insort(ids, fila[0])
+        self._mover_claves(entidad, anterior, fila)
+        self._avisar(entidad, anterior, fila)
+        return anterior
+
+    def quitar(self, entidad, clave):
+        if entidad in self._entrantes:
+            self._entrantes[entidad].pop(clave, None)
+        anterior = self._filas[entidad].pop(clave, None)
+        if anterior is not None:
+            ids = self._ids[entidad]
+            del ids[bisect.bisect_left(ids, clave)]
+            self._mover_claves(entidad, anterior, None)
+            self._avisar(entidad, anterior, None)
+        return anterior
+
+    def aplicar_cambios(self, entidad, filas, eliminadas=()):
+        # Cambios traidos por la sincronizacion. Solo se guardan (y avisan)
+        # las filas distintas de las que ya estan: las escrituras de esta
+        # misma ventana llegan de nuevo pero ya se aplicaron. Devuelve
+        # cuantas filas cambiaron.
+        actuales = self._filas[entidad]
+        cambios = 0
+        for fila in filas:
+            anterior = actuales.get(fila[0])
+            if anterior is None or tuple(anterior) != tuple(fila):
+                self.guardar(entidad, fila)
+                cambios += 1
+        for clave in eliminadas:
+            if self.quitar(entidad, clave) is not None:
+                cambios += 1
+        return cambios
+
+    # -------------------------
+    # ORDEN POR COLUMNA
+    # -------------------------
+    # Por defecto las filas van por id. Para ordenar por otra columna se
+    # arma una vez la lista de (clave tipada, id) de esa columna y se guarda:
+    # volver a una columna ya usada o invertir el sentido no recorre las
+    # filas. Altas, cambios y bajas corrigen cada lista guardada con una
+    # busqueda binaria.
+    def ordenar(self, entidad, orden):
+        # orden: (columna, descendente), o None para volver al orden por id
+        self._orden[entidad] = orden
+        self._armar_orden(entidad)
+
+    def orden(self, entidad):
+        return self._orden[entidad]
+
+    def _armar_orden(self, entidad):
+        orden = self._orden[entidad]
+        if orden is None or orden[0] in self._claves[entidad]:
+            return
+        columna = orden[0]
+        self._claves[entidad][columna] = sorted(
+            (clave_orden(fila[columna]), clave) for clave, fila in self._filas[entidad].items())
+
+    def _mover_claves(self, entidad, anterior, nueva):
+        for columna, claves in self._claves[entidad].items():
+            if anterior is not None:
+                del claves[bisect.bisect_left(claves, (clave_orden(anterior[columna]), anterior[0]))]
+            if nueva is not None:
+                bisect.insort(claves, (clave_orden(nueva[columna]), nueva[0]))
+
+    # -------------------------
+    # CONSULTAS EN MEMORIA
+    # -------------------------
+    def obtener(self, entidad, clave):
+        return self._filas[entidad].get(clave)
+
+    def total(self, entidad):
+        return len(self._ids[entidad])
+
+    def posicion(self, entidad, clave):
+        # Indice de la fila en el orden actual (el de las tablas)
+        orden = self._orden[entidad]
+        fila = self._filas[entidad].get(clave)
+        if orden is None or fila is None:
+            return bisect.bisect_left(self._ids[entidad], clave)
+        claves = self._claves[entidad][orden[0]]
+        posicion = bisect.bisect_left(claves, (clave_orden(fila[orden[0]]), clave))
+        return len(claves) - 1 - posicion if orden[1] else posicion
+
+    def pagina(self, entidad, desde, cantidad):
+        filas = self._filas[entidad]
+        orden = self._orden[entidad]
+        if orden is None:
+            return [filas[clave] for clave in self._ids[entidad][desde:desde + cantidad]]
+        claves = self._claves[entidad][orden[0]]
+        if orden[1]:
+            # Descendente: el mismo tramo contado desde el final
+            fin = len(claves) - desde
+            tramo = reversed(claves[max(0, fin - cantidad):fin]) if fin > 0 else ()
+        else:
+            tramo = claves[desde:desde + cantidad]
+        return [filas[clave] for _, clave in tramo]
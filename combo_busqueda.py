@@ -0,0 +1,63 @@
+from tkinter import ttk
+
+# =========================
+# COMBO CON BUSQUEDA
+# =========================
+# Combobox editable que, en lugar de cargar el catalogo completo, muestra
+# solo las opciones que coinciden con lo escrito. Las coincidencias las da
+# un IndicePrefijos, de modo que cada tecla responde igual de rapido con
+# cien o con cien mil registros.
+#
+# La opcion elegida en la lista se recuerda con su clave: dos registros con
+# la misma etiqueta no se confunden, y la eleccion sigue valiendo aunque la
+# etiqueta cambie despues (el stock de un producto, por ejemplo).
+
+TECLAS_NAVEGACION = {"Up", "Down", "Return", "KP_Enter", "Escape", "Tab",
+                     "Left", "Right", "Home", "End", "Shift_L", "Shift_R",
+                     "Control_L", "Control_R", "Alt_L", "Alt_R"}
+
+class ComboBusqueda(ttk.Combobox):
+    def __init__(self, padre, indice, fijos=(), limite=50, **opciones):
+        # fijos: opciones que siempre aparecen primero (por ejemplo "Sin cliente")
+        super().__init__(padre, postcommand=self.filtrar, **opciones)
+        self.indice = indice
+        self.fijos = list(fijos)
+        self.limite = limite
+        self._mostradas = []   # clave de cada opcion de la lista (None en los fijos)
+        self._elegida = None   # (texto, clave) de la ultima opcion elegida
+        self.bind("<KeyRelease>", self._al_escribir)
+        self.bind("<<ComboboxSelected>>", self._al_elegir, add="+")
+        self.filtrar()
+
+    def _al_escribir(self, event):
+        if event.keysym not in TECLAS_NAVEGACION:
+            self.filtrar()
+
+    def _al_elegir(self, event):
+        posicion = self.current()
+        if 0 <= posicion < len(self._mostradas):
+            self._elegida = (self.get(), self._mostradas[posicion])
+
+    def filtrar(self):
+        texto = self.get()
+        # Si el texto ya es una opcion elegida se muestra la lista inicial,
+        # para que al desplegar de nuevo se pueda cambiar la seleccion.
+        if texto in self.fijos or self.indice.claves(texto):
+            texto = ""
+        registros = self.indice.buscar_registros(texto, self.limite)
+        self._mostradas = [None] * len(self.fijos) + [clave for _, clave in registros]
+        self['values'] = self.fijos + [etiqueta for etiqueta, _ in registros]
+
+    def clave(self):
+        # Clave del registro elegido; None para un texto que no es una opcion
+        # o que comparten varios registros sin haber elegido uno de la lista
+        texto = self.get()
+        if self._elegida is not None and self._elegida[0] == texto and \
+                self.indice.etiqueta(self._elegida[1]) is not None:
+            return self._elegida[1]
+        return self.indice.clave(texto)
+
+    def set(self, valor):
+        self._elegida = None
+        super().set(valor)
+        self.filtrar()
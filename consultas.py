@@ -0,0 +1,747 @@
+import functools
+import random
+import time
+
+import modelo
+
+# =========================
+# CAPA DE DATOS
+# =========================
+# Consultas SQL de la aplicacion. Cada funcion recibe una conexion abierta
+# y devuelve datos simples; no toca la interfaz, asi puede ejecutarse en un
+# hilo de fondo sin congelar la ventana. Las filas de clientes, productos,
+# ventas y pedidos salen como registros tipados (modelo.py).
+
+class ErrorNegocio(Exception):
+    # Regla de negocio incumplida (DNI duplicado, registros relacionados...)
+    pass
+
+
+class ErrorStock(ErrorNegocio):
+    # Otro terminal vendio antes el stock pedido. "productos" trae las filas
+    # con el stock actual para corregir el cache de la interfaz.
+    def __init__(self, mensaje, productos):
+        super().__init__(mensaje)
+        self.productos = productos
+
+
+class ErrorOperacion(Exception):
+    # Una operacion de un lote (aplicar_operaciones) incumplio una regla de
+    # negocio o una restriccion de la base; el lote entero se deshizo.
+    # "error" es el ErrorNegocio o el error de la base original.
+    def __init__(self, clave, error):
+        super().__init__(str(error))
+        self.clave = clave
+        self.error = error
+
+
+# REINTENTOS
+# SQLSTATE 40001: la transaccion fue elegida victima de un interbloqueo y el
+# servidor ya la deshizo; repetirla completa es seguro.
+ESTADOS_REINTENTABLES = {"40001"}
+
+def es_conflicto(error):
+    args = getattr(error, "args", ())
+    return bool(args) and str(args[0]) in ESTADOS_REINTENTABLES
+
+# Errores que se repiten igual en cada reintento: una restriccion (clave
+# foranea, CHECK, UNIQUE) o un valor que no entra en la columna. pyodbc y
+# sqlite3 siguen la DB-API y los llaman igual.
+ERRORES_DE_DATOS = {"IntegrityError", "DataError"}
+
+def es_error_de_datos(error):
+    return any(clase.__name__ in ERRORES_DE_DATOS for clase in type(error).__mro__)
+
+def reintentar_en_conflicto(intentos=3, espera=0.05):
+    # Repite la funcion completa (su transaccion entera) si choca con otra
+    # terminal, con una espera creciente y al azar para que no vuelvan a
+    # chocar. Se ejecuta en un hilo de fondo, asi que la espera no congela
+    # la ventana.
+    def decorar(funcion):
+        @functools.wraps(funcion)
+        def envoltura(conexion, *args, **kwargs):
+            for intento in range(intentos):
+                try:
+                    return funcion(conexion, *args, **kwargs)
+                except Exception as e:
+                    if intento == intentos - 1 or not es_conflicto(e):
+                        raise
+                    conexion.rollback()
+                    time.sleep(espera * 2 ** intento * random.uniform(0.5, 1.5))
+        return envoltura
+    return decorar
+
+
+# LECTURA POR BLOQUES
+FILAS_POR_BLOQUE = 2000
+
+def bloques(cursor, tamano=FILAS_POR_BLOQUE):
+    # Genera (primero, filas, ultimo) leyendo con fetchmany. Se lee un bloque
+    # por adelantado para saber cual es el ultimo; una consulta sin filas
+    # entrega un unico bloque vacio.
+    filas = cursor.fetchmany(tamano)
+    primero = True
+    while True:
+        siguiente = cursor.fetchmany(tamano) if len(filas) == tamano else []
+        yield primero, filas, not siguiente
+        if not siguiente:
+            return
+        primero, filas = False, siguiente
+
+def entregar_en_bloques(cursor, entidad, notificar):
+    # notificar((entidad, filas, primero, ultimo)) por cada bloque, para que
+    # la interfaz muestre las primeras filas sin esperar a las demas
+    for primero, filas, ultimo in bloques(cursor):
+        notificar((entidad, modelo.registros(entidad, filas), primero, ultimo))
+
+
+# CLIENTES
+# Clientes y productos se leen completos una vez para el cache de
+# referencia (cache_referencia.py); tablas y combos se derivan de alli.
+# Con "notificar" las filas se entregan por bloques en lugar de devolverse.
+def listar_clientes(conexion, notificar=None):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT id_cliente, nombre, apellido, dni, telefono, correo, direccion
+        FROM clientes
+        ORDER BY id_cliente
+    """)
+    if notificar is None:
+        return modelo.registros("clientes", cursor.fetchall())
+    entregar_en_bloques(cursor, "clientes", notificar)
+
+def contar_clientes(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM clientes")
+    return cursor.fetchone()[0]
+
+def nombre_cliente(conexion, id_cliente):
+    # "Nombre Apellido", o None si el cliente no existe
+    cursor = conexion.cursor()
+    cursor.execute("SELECT nombre_completo FROM clientes WHERE id_cliente = ?", (id_cliente,))
+    fila = cursor.fetchone()
+    return fila[0] if fila else None
+
+def pagina_clientes(conexion, desde, cantidad):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT id_cliente, nombre, apellido, dni, telefono, correo, direccion
+        FROM clientes
+        ORDER BY id_cliente
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, (desde, cantidad))
+    return modelo.registros("clientes", cursor.fetchall())
+
+def insertar_cliente(conexion, cliente):
+    cursor = conexion.cursor()
+    # Verificar si el DNI ya existe. El parametro se convierte a CHAR(8), el
+    # tipo de la columna, para que SQL Server use el indice UX_clientes_dni en
+    # lugar de convertir la columna fila por fila.
+    cursor.execute("SELECT id_cliente FROM clientes WHERE dni = CAST(? AS CHAR(8))", (cliente["dni"],))
+    if cursor.fetchone():
+        raise ErrorNegocio("Ya existe un cliente con este DNI")
+
+    # OUTPUT devuelve la fila creada para agregarla a la tabla sin recargarla
+    cursor.execute("""
+        INSERT INTO clientes (nombre, apellido, dni, telefono, correo, direccion)
+        OUTPUT INSERTED.id_cliente, INSERTED.nombre, INSERTED.apellido, INSERTED.dni,
+               INSERTED.telefono, INSERTED.correo, INSERTED.direccion
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (
+        cliente["nombre"],
+        cliente["apellido"],
+        cliente["dni"],
+        cliente["telefono"],
+        cliente["correo"],
+        cliente["direccion"]
+    ))
+    fila = modelo.registro("clientes", cursor.fetchone())
+    conexion.commit()
+    return fila
+
+def actualizar_cliente(conexion, id_cliente, cliente):
+    cursor = conexion.cursor()
+    # Verificar si el DNI ya existe en otro cliente
+    cursor.execute("SELECT id_cliente FROM clientes WHERE dni = CAST(? AS CHAR(8)) AND id_cliente != ?",
+                   (cliente["dni"], id_cliente))
+    if cursor.fetchone():
+        raise ErrorNegocio("Ya existe otro cliente con este DNI")
+
+    cursor.execute("""
+        UPDATE clientes
+        SET nombre=?, apellido=?, dni=?, telefono=?, correo=?, direccion=?
+        OUTPUT INSERTED.id_cliente, INSERTED.nombre, INSERTED.apellido, INSERTED.dni,
+               INSERTED.telefono, INSERTED.correo, INSERTED.direccion
+        WHERE id_cliente=?
+    """, (
+        cliente["nombre"],
+        cliente["apellido"],
+        cliente["dni"],
+        cliente["telefono"],
+        cliente["correo"],
+        cliente["direccion"],
+        id_cliente
+    ))
+    fila = modelo.registro("clientes", cursor.fetchone())
+    if not fila:
+        raise ErrorNegocio("El cliente ya no existe; actualiza la lista.")
+    conexion.commit()
+    return fila
+
+def eliminar_cliente(conexion, id_cliente):
+    cursor = conexion.cursor()
+    # Verificar si el cliente tiene ventas relacionadas
+    cursor.execute("SELECT COUNT(*) FROM ventas WHERE id_cliente = ?", (id_cliente,))
+    if cursor.fetchone()[0] > 0:
+        raise ErrorNegocio("No se puede eliminar el cliente porque tiene ventas registradas.")
+
+    # Eliminar primero las relaciones en clienPedido y clienXproducto
+    cursor.execute("DELETE FROM clienPedido WHERE id_cliente = ?", (id_cliente,))
+    cursor.execute("DELETE FROM clienXproducto WHERE id_cliente = ?", (id_cliente,))
+
+    # Ahora eliminar el cliente
+    cursor.execute("DELETE FROM clientes WHERE id_cliente = ?", (id_cliente,))
+    conexion.commit()
+    return id_cliente
+
+
+# PRODUCTOS
+def listar_productos(conexion, notificar=None):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT id_producto, nombre, categoria, marca, precio, stock
+        FROM productos
+        ORDER BY id_producto
+    """)
+    if notificar is None:
+        return modelo.registros("productos", cursor.fetchall())
+    entregar_en_bloques(cursor, "productos", notificar)
+
+def contar_productos(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM productos")
+    return cursor.fetchone()[0]
+
+def pagina_productos(conexion, desde, cantidad):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT id_producto, nombre, categoria, marca, precio, stock
+        FROM productos
+        ORDER BY id_producto
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, (desde, cantidad))
+    return modelo.registros("productos", cursor.fetchall())
+
+def precios_productos(conexion, ids):
+    # {id_producto: precio} de los productos pedidos, en una sola consulta
+    marcadores = ", ".join("?" * len(ids))
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT id_producto, precio FROM productos WHERE id_producto IN ({marcadores})",
+                   list(ids))
+    return {id_producto: precio for id_producto, precio in cursor.fetchall()}
+
+def insertar_producto(conexion, producto):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        INSERT INTO productos (nombre, categoria, marca, precio, stock)
+        OUTPUT INSERTED.id_producto, INSERTED.nombre, INSERTED.categoria, INSERTED.marca,
+               INSERTED.precio, INSERTED.stock
+        VALUES (?, ?, ?, ?, ?)
+    """, (
+        producto["nombre"],
+        producto["categoria"],
+        producto["marca"],
+        producto["precio"],
+        producto["stock"]
+    ))
+    fila = modelo.registro("productos", cursor.fetchone())
+    conexion.commit()
+    return fila
+
+def actualizar_producto(conexion, id_producto, producto):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        UPDATE productos
+        SET nombre=?, categoria=?, marca=?, precio=?, stock=?
+        OUTPUT INSERTED.id_producto, INSERTED.nombre, INSERTED.categoria, INSERTED.marca,
+               INSERTED.precio, INSERTED.stock
+        WHERE id_producto=?
+    """, (
+        producto["nombre"],
+        producto["categoria"],
+        producto["marca"],
+        producto["precio"],
+        producto["stock"],
+        id_producto
+    ))
+    fila = modelo.registro("productos", cursor.fetchone())
+    if not fila:
+        raise ErrorNegocio("El producto ya no existe; actualiza la lista.")
+    conexion.commit()
+    return fila
+
+def eliminar_producto(conexion, id_producto):
+    cursor = conexion.cursor()
+    # Verificar si el producto tiene ventas relacionadas en detalle_venta
+    cursor.execute("SELECT COUNT(*) FROM detalle_venta WHERE id_producto = ?", (id_producto,))
+    if cursor.fetchone()[0] > 0:
+        raise ErrorNegocio("No se puede eliminar el producto porque tiene ventas registradas.")
+    cursor.execute("SELECT COUNT(*) FROM detalle_pedido WHERE id_producto = ?", (id_producto,))
+    if cursor.fetchone()[0] > 0:
+        raise ErrorNegocio("No se puede eliminar el producto porque tiene pedidos registrados.")
+
+    # Eliminar primero las relaciones en productoXpresentacion y clienXproducto
+    cursor.execute("DELETE FROM productoXpresentacion WHERE id_producto = ?", (id_producto,))
+    cursor.execute("DELETE FROM clienXproducto WHERE id_producto = ?", (id_producto,))
+
+    # Ahora eliminar el producto
+    cursor.execute("DELETE FROM productos WHERE id_producto = ?", (id_producto,))
+    conexion.commit()
+    return id_producto
+
+
+# VENTAS
+def contar_ventas(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM ventas")
+    return cursor.fetchone()[0]
+
+def pagina_ventas(conexion, desde, cantidad):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT v.id_venta,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente,
+               v.fecha, v.total
+        FROM ventas v
+        LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
+        ORDER BY v.fecha DESC, v.id_venta DESC
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, (desde, cantidad))
+    return modelo.registros("ventas", cursor.fetchall())
+
+def listar_ventas(conexion, notificar):
+    # Todas, por bloques: solo para ordenarlas en memoria por una columna
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT v.id_venta,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente,
+               v.fecha, v.total
+        FROM ventas v
+        LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
+        ORDER BY v.id_venta
+    """)
+    entregar_en_bloques(cursor, "ventas", notificar)
+
+def registrar_venta(conexion, id_cliente, cliente_nombre, total):
+    fila = insertar_venta(conexion.cursor(), id_cliente, cliente_nombre, total)
+    conexion.commit()
+    return fila
+
+def insertar_venta(cursor, id_cliente, cliente_nombre, total, fecha=None):
+    # Sin confirmar: la transaccion es de quien llama. Sin fecha, la de hoy.
+    # El cliente va por su id, como en los pedidos: el nombre solo se usa
+    # para la fila que se devuelve.
+    cursor.execute("""
+        INSERT INTO ventas (id_cliente, fecha, total)
+        OUTPUT INSERTED.id_venta, INSERTED.fecha, INSERTED.total
+        VALUES (?, COALESCE(?, GETDATE()), ?)
+    """, (id_cliente, fecha, total))
+    id_venta, fecha, total = cursor.fetchone()
+    # Misma forma que las filas de pagina_ventas
+    return modelo.registro("ventas",
+                           (id_venta, cliente_nombre if id_cliente else "Sin cliente", fecha, total))
+
+
+# PEDIDOS
+def contar_pedidos(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM pedido p
+        LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+    """)
+    return cursor.fetchone()[0]
+
+def pagina_pedidos(conexion, desde, cantidad):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT p.id_pedido, p.fecha, p.total,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
+        FROM pedido p
+        LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+        LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
+        ORDER BY p.fecha DESC, p.id_pedido DESC
+        OFFSET ? ROWS FETCH NEXT ? ROWS ONLY
+    """, (desde, cantidad))
+    return modelo.registros("pedidos", cursor.fetchall())
+
+def listar_pedidos(conexion, notificar):
+    # Todos, por bloques: solo para ordenarlos en memoria por una columna
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT p.id_pedido, p.fecha, p.total,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
+        FROM pedido p
+        LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+        LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
+        ORDER BY p.id_pedido
+    """)
+    entregar_en_bloques(cursor, "pedidos", notificar)
+
+@reintentar_en_conflicto()
+def registrar_pedido(conexion, id_cliente, cliente_nombre, lineas):
+    # lineas: [(id_producto, cantidad, precio)]. Cabecera, cliente, lineas y
+    # descuento de stock van en una sola transaccion: se graba el pedido
+    # completo o nada. La cantidad de viajes al servidor no depende de la
+    # cantidad de lineas.
+    cursor = conexion.cursor()
+    resultado = insertar_pedido(cursor, id_cliente, cliente_nombre, lineas)
+    if resultado is None:
+        # Algun producto ya no alcanza: se deshace todo el pedido
+        conexion.rollback()
+        raise stock_insuficiente(cursor, lineas)
+    conexion.commit()
+    return resultado
+
+def insertar_pedido(cursor, id_cliente, cliente_nombre, lineas, fecha=None):
+    # Sin confirmar: la transaccion es de quien llama. Devuelve None si algun
+    # producto no alcanza; quien llama debe deshacer antes de seguir.
+    if not lineas:
+        raise ErrorNegocio("El pedido no tiene productos")
+    total = sum(cantidad * precio for _, cantidad, precio in lineas)
+    pedidas = cantidades_pedidas(lineas)
+
+    # Insertar pedido; OUTPUT devuelve el id generado en el mismo viaje
+    cursor.execute("""
+        INSERT INTO pedido (fecha, total)
+        OUTPUT INSERTED.id_pedido, INSERTED.fecha, INSERTED.total
+        VALUES (COALESCE(?, GETDATE()), ?)
+    """, (fecha, total))
+    id_pedido, fecha, total = cursor.fetchone()
+
+    # Asociar cliente si se seleccionó uno
+    if id_cliente:
+        cursor.execute("INSERT INTO clienPedido (id_cliente, id_pedido) VALUES (?, ?)",
+                       (id_cliente, id_pedido))
+
+    # Todas las lineas en un solo envio: fast_executemany manda los
+    # parametros como un arreglo en lugar de una llamada por linea
+    cursor.fast_executemany = True
+    try:
+        cursor.executemany("""
+            INSERT INTO detalle_pedido (id_pedido, id_producto, cantidad, precio, subtotal)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(id_pedido, id_producto, cantidad, precio, cantidad * precio)
+              for id_producto, cantidad, precio in lineas])
+    finally:
+        cursor.fast_executemany = False
+
+    # Reservar el stock al final, para retener los bloqueos de productos el
+    # menor tiempo posible. Es una sola sentencia condicional: solo descuenta
+    # donde todavia alcanza, sin leer antes el stock (que otro terminal podria
+    # cambiar entre la lectura y la escritura). OUTPUT devuelve los productos
+    # con su stock nuevo. Se escribe sin UPDATE ... FROM para que tambien
+    # corra sobre la base SQLite local (sqlite_local.py).
+    cursor.execute("""
+        UPDATE productos
+        SET stock = stock - (SELECT SUM(d.cantidad) FROM detalle_pedido d
+                             WHERE d.id_pedido = ? AND d.id_producto = productos.id_producto)
+        OUTPUT INSERTED.id_producto, INSERTED.nombre, INSERTED.categoria,
+               INSERTED.marca, INSERTED.precio, INSERTED.stock
+        WHERE id_producto IN (SELECT id_producto FROM detalle_pedido WHERE id_pedido = ?)
+          AND stock >= (SELECT SUM(d.cantidad) FROM detalle_pedido d
+                        WHERE d.id_pedido = ? AND d.id_producto = productos.id_producto)
+    """, (id_pedido, id_pedido, id_pedido))
+    productos = modelo.registros("productos", cursor.fetchall())
+    if len(productos) < len(pedidas):
+        return None
+    # Misma forma que las filas de pagina_pedidos, mas los productos tocados
+    pedido = modelo.registro("pedidos",
+                             (id_pedido, fecha, total, cliente_nombre if id_cliente else "Sin cliente"))
+    return pedido, productos
+
+def cantidades_pedidas(lineas):
+    pedidas = {}
+    for id_producto, cantidad, _ in lineas:
+        pedidas[id_producto] = pedidas.get(id_producto, 0) + cantidad
+    return pedidas
+
+def stock_insuficiente(cursor, lineas):
+    # Se llama despues de deshacer, para leer el stock real
+    pedidas = cantidades_pedidas(lineas)
+    marcadores = ", ".join("?" * len(pedidas))
+    cursor.execute(f"""
+        SELECT id_producto, nombre, categoria, marca, precio, stock
+        FROM productos
+        WHERE id_producto IN ({marcadores})
+    """, list(pedidas))
+    productos = modelo.registros("productos", cursor.fetchall())
+    faltantes = [f"{fila[1]} (quedan {fila[5]})" for fila in productos
+                 if fila[5] < pedidas[fila[0]]]
+    return ErrorStock("Stock insuficiente, otro terminal lo vendió antes:\n" +
+                      "\n".join(faltantes), productos)
+
+def obtener_pedido(conexion, id_pedido):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT p.id_pedido, p.fecha, p.total,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
+        FROM pedido p
+        LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+        LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
+        WHERE p.id_pedido = ?
+    """, id_pedido)
+    pedido = modelo.registro("pedidos", cursor.fetchone())
+    if not pedido:
+        return None, []
+
+    cursor.execute("""
+        SELECT pr.nombre, d.cantidad, d.precio, d.subtotal
+        FROM detalle_pedido d
+        JOIN productos pr ON d.id_producto = pr.id_producto
+        WHERE d.id_pedido = ?
+        ORDER BY d.id_detalle
+    """, id_pedido)
+    return pedido, cursor.fetchall()
+
+
+# OPERACIONES DEL DIARIO
+# Ventas y pedidos anotados en el diario local (diario_operaciones.py) se
+# envian por lotes: un lote es una sola transaccion. Cada operacion trae
+# una clave unica que se guarda en operaciones_aplicadas (migracion 0005)
+# junto con ella; si un lote se reenvia porque no llego la confirmacion, las
+# operaciones ya grabadas se reconocen por la clave y no se repiten.
+@reintentar_en_conflicto()
+def aplicar_operaciones(conexion, operaciones):
+    # operaciones: [(clave, "venta", (id_cliente, cliente_nombre, total, fecha))] o
+    # [(clave, "pedido", (id_cliente, cliente_nombre, lineas, fecha))].
+    # Devuelve {clave: fila de insertar_venta / resultado de
+    # insertar_pedido}, con None para las que ya estaban grabadas.
+    if not operaciones:
+        return {}
+    cursor = conexion.cursor()
+    marcadores = ", ".join("?" * len(operaciones))
+    cursor.execute(f"SELECT clave FROM operaciones_aplicadas WHERE clave IN ({marcadores})",
+                   [clave for clave, _, _ in operaciones])
+    grabadas = {fila[0] for fila in cursor.fetchall()}
+
+    resultados = {}
+    aplicadas = []
+    for clave, tipo, argumentos in operaciones:
+        if clave in grabadas:
+            resultados[clave] = None
+            continue
+        try:
+            if tipo == "venta":
+                resultado = insertar_venta(cursor, *argumentos)
+                id_resultado = resultado[0]
+            else:
+                resultado = insertar_pedido(cursor, *argumentos)
+                if resultado is None:
+                    conexion.rollback()
+                    raise stock_insuficiente(cursor, argumentos[2])
+                id_resultado = resultado[0][0]
+        except Exception as e:
+            # Una regla de negocio o un dato que la base no acepta (el
+            # producto o el cliente ya no existen, por ejemplo) fallaran
+            # igual siempre: se informa cual fue. Un error de conexion sube
+            # tal cual y el lote queda para reintentar.
+            if not isinstance(e, ErrorNegocio) and not es_error_de_datos(e):
+                raise
+            conexion.rollback()
+            raise ErrorOperacion(clave, e) from e
+        resultados[clave] = resultado
+        aplicadas.append((clave, tipo, id_resultado))
+
+    if aplicadas:
+        cursor.executemany("""
+            INSERT INTO operaciones_aplicadas (clave, tipo, id_resultado)
+            VALUES (?, ?, ?)
+        """, aplicadas)
+    conexion.commit()
+    return resultados
+
+
+# SINCRONIZACION
+# Filas cambiadas desde la ultima sincronizacion, segun la columna version
+# (ROWVERSION, migracion 0004). Las versiones viajan como BIGINT y se
+# comparan como BINARY(8) para que SQL Server busque por el indice.
+# MIN_ACTIVE_ROWVERSION es la menor version que todavia puede confirmarse:
+# todo lo que esta por debajo ya es definitivo, asi una transaccion larga de
+# otra terminal no se saltea aunque confirme despues que otras mas nuevas.
+# Cada consulta devuelve filas con la misma forma que la carga de su lista
+CONSULTAS_CAMBIOS = {
+    "clientes": """
+        SELECT id_cliente, nombre, apellido, dni, telefono, correo, direccion
+        FROM clientes
+        WHERE version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+          AND version <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+        ORDER BY id_cliente
+    """,
+    "productos": """
+        SELECT id_producto, nombre, categoria, marca, precio, stock
+        FROM productos
+        WHERE version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+          AND version <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+        ORDER BY id_producto
+    """,
+    "ventas": """
+        SELECT v.id_venta,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente,
+               v.fecha, v.total
+        FROM ventas v
+        LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
+        WHERE v.version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+          AND v.version <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+        ORDER BY v.id_venta
+    """,
+    "pedidos": """
+        SELECT p.id_pedido, p.fecha, p.total,
+               COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
+        FROM pedido p
+        LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+        LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
+        WHERE p.version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+          AND p.version <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+        ORDER BY p.id_pedido
+    """,
+}
+# Nombre de cada tabla en "eliminaciones" -> entidad de la aplicacion
+TABLAS_ELIMINACIONES = {"clientes": "clientes", "productos": "productos",
+                        "ventas": "ventas", "pedido": "pedidos"}
+
+def marca_cambios(conexion):
+    # Version hasta la que todo esta confirmado; punto de partida de la
+    # sincronizacion, tomado antes de la primera carga
+    cursor = conexion.cursor()
+    cursor.execute("SELECT CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1")
+    return cursor.fetchone()[0]
+
+def cambios_desde(conexion, desde):
+    # Devuelve (hasta, {entidad: filas cambiadas}, {entidad: claves borradas});
+    # la proxima llamada parte de "hasta". Sin cambios no lee ninguna tabla.
+    hasta = marca_cambios(conexion)
+    filas = {entidad: [] for entidad in CONSULTAS_CAMBIOS}
+    eliminadas = {entidad: [] for entidad in CONSULTAS_CAMBIOS}
+    if hasta <= desde:
+        return desde, filas, eliminadas
+    cursor = conexion.cursor()
+    for entidad, consulta in CONSULTAS_CAMBIOS.items():
+        cursor.execute(consulta, (desde, hasta))
+        filas[entidad] = modelo.registros(entidad, cursor.fetchall())
+    cursor.execute("""
+        SELECT tabla, clave
+        FROM eliminaciones
+        WHERE version > CAST(CAST(? AS BIGINT) AS BINARY(8))
+          AND version <= CAST(CAST(? AS BIGINT) AS BINARY(8))
+    """, (desde, hasta))
+    for tabla, clave in cursor.fetchall():
+        entidad = TABLAS_ELIMINACIONES.get(tabla)
+        if entidad is not None:
+            eliminadas[entidad].append(clave)
+    return hasta, filas, eliminadas
+
+
+# REPORTES
+# Los totales y rankings salen de las vistas indexadas resumen_* (migracion
+# 0003), que SQL Server mantiene al dia con cada escritura. NOEXPAND obliga
+# a leer la vista ya agrupada en lugar de recalcularla desde las tablas.
+def reporte_ventas(conexion):
+    # Ventas totales: una fila por dia en lugar de una por venta
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT SUM(ventas), SUM(ingresos)
+        FROM resumen_ventas_diarias WITH (NOEXPAND)
+    """)
+    total_ventas, total_ingresos = cursor.fetchone()
+    return {"total_ventas": total_ventas or 0, "total_ingresos": total_ingresos or 0}
+
+def reporte_pedidos(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT SUM(pedidos), SUM(monto)
+        FROM resumen_pedidos_diarios WITH (NOEXPAND)
+    """)
+    total_pedidos, total_pedidos_monto = cursor.fetchone()
+    return {"total_pedidos": total_pedidos or 0, "total_pedidos_monto": total_pedidos_monto or 0}
+
+def reporte_productos_mas_vendidos(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT TOP 5 p.nombre, SUM(r.unidades) as total_vendido
+        FROM resumen_unidades_producto r WITH (NOEXPAND)
+        JOIN productos p ON r.id_producto = p.id_producto
+        GROUP BY p.nombre
+        ORDER BY total_vendido DESC
+    """)
+    return {"productos_mas_vendidos": cursor.fetchall()}
+
+def reporte_clientes_frecuentes(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT TOP 5 c.nombre_completo as cliente, r.compras
+        FROM resumen_compras_cliente r WITH (NOEXPAND)
+        JOIN clientes c ON r.id_cliente = c.id_cliente
+        ORDER BY r.compras DESC
+    """)
+    return {"clientes_frecuentes": cursor.fetchall()}
+
+def reporte_bajo_stock(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT TOP 5 nombre, stock
+        FROM productos
+        WHERE stock < 10
+        ORDER BY stock ASC
+    """)
+    return {"productos_bajo_stock": cursor.fetchall()}
+
+# Partes independientes del reporte general; cada una devuelve sus claves
+# del diccionario final y puede ejecutarse en su propia conexion
+# (reporte.py las lanza en paralelo).
+PARTES_REPORTE = (
+    reporte_ventas,
+    reporte_pedidos,
+    reporte_productos_mas_vendidos,
+    reporte_clientes_frecuentes,
+    reporte_bajo_stock,
+)
+
+# Reporte consolidado de varias tiendas (tiendas_multiples.py): cada tienda
+# entrega totales y agrupaciones completas, no sus cinco primeros, porque
+# el ranking entre tiendas solo se puede armar sumando antes de ordenar.
+def unidades_por_producto(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT p.nombre, SUM(r.unidades) as unidades
+        FROM resumen_unidades_producto r WITH (NOEXPAND)
+        JOIN productos p ON r.id_producto = p.id_producto
+        GROUP BY p.nombre
+    """)
+    return {"unidades_por_producto": cursor.fetchall()}
+
+def compras_por_cliente(conexion):
+    # El DNI identifica al mismo cliente en todas las tiendas
+    cursor = conexion.cursor()
+    cursor.execute("""
+        SELECT c.dni, c.nombre_completo as cliente, r.compras
+        FROM resumen_compras_cliente r WITH (NOEXPAND)
+        JOIN clientes c ON r.id_cliente = c.id_cliente
+    """)
+    return {"compras_por_cliente": cursor.fetchall()}
+
+# Los cinco de menor stock de todas las tiendas estan entre los cinco de
+# menor stock de cada una, asi que reporte_bajo_stock sirve tal cual.
+PARTES_CONSOLIDADO = (
+    reporte_ventas,
+    reporte_pedidos,
+    unidades_por_producto,
+    compras_por_cliente,
+    reporte_bajo_stock,
+)
+
+def reporte_general(conexion):
+    datos = {}
+    for parte in PARTES_REPORTE:
+        datos.update(parte(conexion))
+    return datos
@@ -0,0 +1,229 @@
+import json
+import os
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+import consultas
+
+# =========================
+# DIARIO DE VENTAS Y PEDIDOS
+# =========================
+# Las ventas y pedidos se anotan primero en un archivo local y recien
+# despues se envian a la base. Asi registrar una venta no espera a la red
+# ni al servidor, y si la base no responde la venta no se pierde: queda en
+# el diario hasta que vuelva.
+#
+# El archivo solo crece al final: una linea por registro, con su CRC32
+# delante, y os.fsync despues de cada escritura. Si el programa o el equipo
+# se cortan a mitad de una linea, esa linea no pasa el CRC y se descarta al
+# abrir; todo lo anterior sigue intacto. Registros:
+#   {"op": "alta", "clave": ..., "tipo": "venta"|"pedido", "datos": {...}}
+#   {"op": "hecha", "clave": ...}       ya esta en la base
+#   {"op": "rechazada", "clave": ..., "motivo": ...}
+#
+# La clave de cada operacion viaja a la base (tabla operaciones_aplicadas,
+# migracion 0005): si la base confirmo un lote pero el programa se corto
+# antes de anotar "hecha", al reenviarlo la base lo reconoce y no lo repite.
+
+
+class DiarioOperaciones:
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._candado = threading.Lock()
+        self._pendientes = OrderedDict()  # clave -> (tipo, datos)
+        self._leer()
+        self._descriptor = None
+        self._compactar()
+
+    def __len__(self):
+        with self._candado:
+            return len(self._pendientes)
+
+    # -------------------------
+    # ARCHIVO
+    # -------------------------
+    def _leer(self):
+        if not os.path.exists(self.ruta):
+            return
+        with open(self.ruta, "rb") as archivo:
+            for linea in archivo:
+                registro = self._decodificar(linea)
+                if registro is None:
+                    continue  # linea cortada o danada
+                if registro["op"] == "alta":
+                    self._pendientes[registro["clave"]] = (registro["tipo"], registro["datos"])
+                else:
+                    self._pendientes.pop(registro["clave"], None)
+
+    @staticmethod
+    def _codificar(registro):
+        texto = json.dumps(registro, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return b"%08x " % zlib.crc32(texto) + texto + b"\n"
+
+    @staticmethod
+    def _decodificar(linea):
+        if not linea.endswith(b"\n") or len(linea) < 10:
+            return None
+        suma, texto = linea[:8], linea[9:-1]
+        try:
+            if int(suma, 16) != zlib.crc32(texto):
+                return None
+            return json.loads(texto)
+        except ValueError:
+            return None
+
+    def _escribir(self, registros):
+        # Una sola escritura y un solo fsync por llamada
+        datos = b"".join(self._codificar(registro) for registro in registros)
+        os.write(self._descriptor, datos)
+        os.fsync(self._descriptor)
+
+    def _abrir(self):
+        self._descriptor = os.open(self.ruta, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _compactar(self):
+        # Reescribe el archivo con solo las altas pendientes. Se escribe en
+        # otro archivo y se reemplaza de una vez, asi un corte deja el viejo
+        # o el nuevo, nunca uno a medias.
+        temporal = self.ruta + ".tmp"
+        with open(temporal, "wb") as archivo:
+            for clave, (tipo, datos) in self._pendientes.items():
+                archivo.write(self._codificar({"op": "alta", "clave": clave, "tipo": tipo, "datos": datos}))
+            archivo.flush()
+            os.fsync(archivo.fileno())
+        if self._descriptor is not None:
+            os.close(self._descriptor)
+        os.replace(temporal, self.ruta)
+        _sincronizar_carpeta(self.ruta)
+        self._abrir()
+
+    def cerrar(self):
+        with self._candado:
+            if self._descriptor is not None:
+                os.close(self._descriptor)
+                self._descriptor = None
+
+    # -------------------------
+    # OPERACIONES
+    # -------------------------
+    def _agregar(self, tipo, datos):
+        clave = uuid.uuid4().hex
+        with self._candado:
+            self._escribir([{"op": "alta", "clave": clave, "tipo": tipo, "datos": datos,
+                             "creada": time.time()}])
+            self._pendientes[clave] = (tipo, datos)
+        return clave
+
+    def agregar_venta(self, id_cliente, cliente_nombre, total):
+        return self._agregar("venta", {"id_cliente": id_cliente, "cliente": cliente_nombre,
+                                       "total": str(total), "fecha": date.today().isoformat()})
+
+    def agregar_pedido(self, id_cliente, cliente_nombre, lineas):
+        # lineas: [(id_producto, cantidad, precio)], como registrar_pedido
+        return self._agregar("pedido", {
+            "id_cliente": id_cliente,
+            "cliente": cliente_nombre,
+            "lineas": [[id_producto, cantidad, str(precio)] for id_producto, cantidad, precio in lineas],
+            "fecha": date.today().isoformat(),
+        })
+
+    def pendientes(self, limite=None):
+        # [(clave, tipo, datos)] en el orden en que se registraron
+        with self._candado:
+            elementos = list(self._pendientes.items())[:limite]
+        return [(clave, tipo, datos) for clave, (tipo, datos) in elementos]
+
+    def marcar_hechas(self, claves):
+        with self._candado:
+            self._escribir([{"op": "hecha", "clave": clave} for clave in claves])
+            for clave in claves:
+                self._pendientes.pop(clave, None)
+            self._vaciar_si_termino()
+
+    def marcar_rechazada(self, clave, motivo):
+        with self._candado:
+            self._escribir([{"op": "rechazada", "clave": clave, "motivo": motivo}])
+            self._pendientes.pop(clave, None)
+            self._vaciar_si_termino()
+
+    def _vaciar_si_termino(self):
+        # Nada pendiente: el archivo vuelve a empezar vacio
+        if not self._pendientes:
+            os.ftruncate(self._descriptor, 0)
+            os.fsync(self._descriptor)
+
+
+def _sincronizar_carpeta(ruta):
+    # El nombre nuevo del archivo queda en disco recien al sincronizar la
+    # carpeta (no disponible en Windows, donde os.replace ya es duradero)
+    try:
+        descriptor = os.open(os.path.dirname(os.path.abspath(ruta)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(descriptor)
+    except OSError:
+        pass
+    finally:
+        os.close(descriptor)
+
+
+def argumentos(tipo, datos):
+    # Datos del diario (JSON) -> argumentos tipados de consultas.aplicar_operaciones
+    fecha = date.fromisoformat(datos["fecha"])
+    if tipo == "venta":
+        return datos["id_cliente"], datos["cliente"], Decimal(datos["total"]), fecha
+    lineas = [(id_producto, cantidad, Decimal(precio)) for id_producto, cantidad, precio in datos["lineas"]]
+    return datos["id_cliente"], datos["cliente"], lineas, fecha
+
+
+def reenviar(conexion, diario, tamano_lote=50):
+    # Envia todo lo pendiente en lotes de una transaccion cada uno. Si una
+    # operacion incumple una regla de negocio (stock agotado) o una
+    # restriccion de la base (un producto ya borrado) se deshace su lote;
+    # las anteriores se envian solas y ella se prueba despues sobre la base
+    # ya al dia: si vuelve a fallar se anota como rechazada, con el motivo
+    # en el error, y no frena a las siguientes. Un registro ilegible se
+    # rechaza sin enviarlo. Un error de conexion deja todo pendiente para la
+    # proxima vez.
+    # Devuelve (aplicadas [(clave, tipo, resultado)],
+    #          rechazadas [(clave, tipo, datos, error)]).
+    aplicadas, rechazadas = [], []
+    limite = tamano_lote
+    while True:
+        lote = diario.pendientes(limite)
+        if not lote:
+            return aplicadas, rechazadas
+        limite = tamano_lote
+        tipos = {clave: (tipo, datos) for clave, tipo, datos in lote}
+        operaciones = []
+        for clave, tipo, datos in lote:
+            try:
+                operaciones.append((clave, tipo, argumentos(tipo, datos)))
+            except (KeyError, TypeError, ValueError, ArithmeticError) as e:
+                error = consultas.ErrorNegocio(f"Datos ilegibles en el diario: {e!r}")
+                diario.marcar_rechazada(clave, str(error))
+                rechazadas.append((clave, tipo, datos, error))
+                break
+        if len(operaciones) < len(lote):
+            continue
+        try:
+            resultados = consultas.aplicar_operaciones(conexion, operaciones)
+        except consultas.ErrorOperacion as e:
+            posicion = list(tipos).index(e.clave)
+            if posicion > 0:
+                limite = posicion
+                continue
+            diario.marcar_rechazada(e.clave, str(e.error))
+            tipo, datos = tipos[e.clave]
+            rechazadas.append((e.clave, tipo, datos, e.error))
+            continue
+        diario.marcar_hechas(list(resultados))
+        # Sin resultado: ya estaba en la base desde un envio anterior
+        aplicadas.extend((clave, tipos[clave][0], resultado)
+                         for clave, resultado in resultados.items() if resultado is not None)
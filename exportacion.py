@@ -0,0 +1,187 @@
+import csv
+import os
+import time
+
+import modelo
+from consultas import ErrorNegocio
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet es opcional; CSV funciona siempre
+    pyarrow = None
+
+# =========================
+# EXPORTACION (CSV / PARQUET)
+# =========================
+# Extractos de ventas, pedidos y sus lineas para contabilidad. Las filas se
+# leen con fetchmany en bloques de tamaño fijo y cada bloque se escribe al
+# archivo antes de pedir el siguiente, asi la memoria usada es la misma
+# para un mes que para diez años. Se ejecuta en un hilo de fondo;
+# "notificar" recibe la cantidad de filas escritas tras cada bloque.
+
+FILAS_POR_BLOQUE = 10000
+
+# Cada extracto: consulta base, columna de fecha para el filtro, orden y
+# columnas (nombre, tipo). Los tipos se traducen a Parquet en _esquema.
+EXPORTACIONES = {
+    "ventas": {
+        "consulta": """
+            SELECT v.id_venta,
+                   COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente,
+                   v.fecha, v.total
+            FROM ventas v
+            LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
+        """,
+        "fecha": "v.fecha",
+        "orden": "v.fecha, v.id_venta",
+        "columnas": (("id_venta", "entero"), ("cliente", "texto"),
+                     ("fecha", "fecha"), ("total", "dinero")),
+    },
+    "detalle_venta": {
+        "consulta": """
+            SELECT dv.id_detalle, dv.id_venta, v.fecha, dv.id_producto, p.nombre as producto,
+                   dv.cantidad, dv.subtotal
+            FROM detalle_venta dv
+            JOIN ventas v ON dv.id_venta = v.id_venta
+            LEFT JOIN productos p ON dv.id_producto = p.id_producto
+        """,
+        "fecha": "v.fecha",
+        "orden": "v.fecha, dv.id_venta, dv.id_detalle",
+        "columnas": (("id_detalle", "entero"), ("id_venta", "entero"), ("fecha", "fecha"),
+                     ("id_producto", "entero"), ("producto", "texto"),
+                     ("cantidad", "entero"), ("subtotal", "dinero")),
+    },
+    "pedidos": {
+        "consulta": """
+            SELECT p.id_pedido, p.fecha, p.total,
+                   COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
+            FROM pedido p
+            LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
+            LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
+        """,
+        "fecha": "p.fecha",
+        "orden": "p.fecha, p.id_pedido",
+        "columnas": (("id_pedido", "entero"), ("fecha", "fecha"),
+                     ("total", "dinero"), ("cliente", "texto")),
+    },
+    "detalle_pedido": {
+        "consulta": """
+            SELECT d.id_detalle, d.id_pedido, p.fecha, d.id_producto, pr.nombre as producto,
+                   d.cantidad, d.precio, d.subtotal
+            FROM detalle_pedido d
+            JOIN pedido p ON d.id_pedido = p.id_pedido
+            LEFT JOIN productos pr ON d.id_producto = pr.id_producto
+        """,
+        "fecha": "p.fecha",
+        "orden": "p.fecha, d.id_pedido, d.id_detalle",
+        "columnas": (("id_detalle", "entero"), ("id_pedido", "entero"), ("fecha", "fecha"),
+                     ("id_producto", "entero"), ("producto", "texto"),
+                     ("cantidad", "entero"), ("precio", "dinero"), ("subtotal", "dinero")),
+    },
+}
+
+FORMATOS = ("csv", "parquet")
+
+
+def parquet_disponible():
+    return pyarrow is not None
+
+def _esquema(columnas):
+    tipos = {
+        "entero": pyarrow.int64(),
+        "texto": pyarrow.string(),
+        "fecha": pyarrow.date32(),
+        "dinero": pyarrow.decimal128(18, 2),
+    }
+    return pyarrow.schema([(nombre, tipos[tipo]) for nombre, tipo in columnas])
+
+# El driver {SQL Server} entrega las columnas DATE como texto y SQLite los
+# importes como float: se convierten igual que en modelo.py antes de
+# armar las columnas de Parquet
+CONVERSIONES = {"fecha": modelo._fecha, "dinero": modelo._dinero}
+
+def _bloques(cursor, tamano):
+    while True:
+        filas = cursor.fetchmany(tamano)
+        if not filas:
+            return
+        yield filas
+
+
+class EscritorCSV:
+    def __init__(self, ruta, columnas):
+        # utf-8-sig para que Excel reconozca las tildes
+        self._archivo = open(ruta, "w", newline="", encoding="utf-8-sig")
+        self._escritor = csv.writer(self._archivo)
+        self._escritor.writerow([nombre for nombre, _ in columnas])
+
+    def escribir(self, filas):
+        self._escritor.writerows(filas)
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class EscritorParquet:
+    def __init__(self, ruta, columnas):
+        # Cada bloque se escribe como un grupo de filas del archivo
+        self._esquema = _esquema(columnas)
+        self._conversiones = [CONVERSIONES.get(tipo) for _, tipo in columnas]
+        self._escritor = pyarrow.parquet.ParquetWriter(ruta, self._esquema)
+
+    def escribir(self, filas):
+        columnas = [valores if convertir is None else list(map(convertir, valores))
+                    for valores, convertir in zip(zip(*filas), self._conversiones)]
+        self._escritor.write_table(pyarrow.Table.from_arrays(
+            [pyarrow.array(valores, type=campo.type) for valores, campo in zip(columnas, self._esquema)],
+            schema=self._esquema))
+
+    def cerrar(self):
+        self._escritor.close()
+
+
+def exportar(conexion, extracto, ruta, formato, desde=None, hasta=None, notificar=None,
+             filas_por_bloque=FILAS_POR_BLOQUE):
+    # desde/hasta: fechas (date) opcionales, ambas inclusive
+    if extracto not in EXPORTACIONES:
+        raise ErrorNegocio(f"Extracto desconocido: {extracto}")
+    if formato not in FORMATOS:
+        raise ErrorNegocio(f"Formato desconocido: {formato}")
+    if formato == "parquet" and not parquet_disponible():
+        raise ErrorNegocio("Para exportar a Parquet instala pyarrow (pip install pyarrow)")
+
+    definicion = EXPORTACIONES[extracto]
+    filtros, parametros = [], []
+    if desde is not None:
+        filtros.append(f"{definicion['fecha']} >= ?")
+        parametros.append(desde)
+    if hasta is not None:
+        filtros.append(f"{definicion['fecha']} <= ?")
+        parametros.append(hasta)
+    consulta = definicion["consulta"]
+    if filtros:
+        consulta += " WHERE " + " AND ".join(filtros)
+    consulta += " ORDER BY " + definicion["orden"]
+
+    inicio = time.perf_counter()
+    cursor = conexion.cursor()
+    cursor.execute(consulta, parametros)
+    clase = EscritorCSV if formato == "csv" else EscritorParquet
+    escritor = clase(ruta, definicion["columnas"])
+    total = 0
+    try:
+        for filas in _bloques(cursor, filas_por_bloque):
+            escritor.escribir(filas)
+            total += len(filas)
+            if notificar:
+                notificar(total)
+    finally:
+        escritor.cerrar()
+    segundos = time.perf_counter() - inicio
+    return {
+        "filas": total,
+        "segundos": segundos,
+        "filas_por_segundo": total / max(segundos, 0.001),
+        "bytes": os.path.getsize(ruta),
+    }
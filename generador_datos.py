@@ -0,0 +1,243 @@
+import argparse
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from importacion import en_lotes
+
+# =========================
+# GENERADOR DE DATOS DE PRUEBA
+# =========================
+# Llena una base (SQL Server o sqlite_local.py) con datos sinteticos para
+# medir la aplicacion con volumenes reales y no con las 10 filas del script.
+# La escala es la cantidad de ventas; el resto se deriva de ella:
+#
+#   clientes        escala / 10          productos   escala / 100 (100 a 50 000)
+#   ventas          escala               detalle_venta  1 a 5 lineas por venta
+#   pedido          escala / 2           detalle_pedido 1 a 4 lineas por pedido
+#   clienPedido     80 % de los pedidos  clienXproducto escala / 20
+#
+# Pocos clientes compran mucho y pocos productos se llevan la mayoria de las
+# ventas (sesgo de potencia), las fechas cubren los ultimos dos años con mas
+# movimiento los fines de semana y los precios siguen una lognormal. Con la
+# misma semilla se generan los mismos datos.
+#
+# Las filas se generan y envian por lotes, asi la memoria no depende de la
+# escala. Los ids se asignan aqui (a partir del maximo actual de cada tabla)
+# para relacionar las tablas sin releerlas.
+
+ESCALAS = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000}
+TAMANO_LOTE = 10_000
+
+NOMBRES = ("Luis", "María", "Carlos", "Lucía", "Pedro", "Ana", "Miguel", "Sandra", "Jorge", "Elena",
+           "José", "Rosa", "Juan", "Carmen", "Diego", "Valeria", "Andrés", "Sofía", "Raúl", "Patricia")
+APELLIDOS = ("Torres", "Lopez", "Perez", "Gomez", "Ramos", "Mendoza", "Quispe", "Flores", "Castro",
+             "Rojas", "Huamán", "Vargas", "Chávez", "Díaz", "Salazar", "Cruz", "Mamani", "Rivera")
+CALLES = ("Av. Los Incas", "Calle Cusco", "Jr. Grau", "Av. Los Andes", "Calle Lima", "Av. Collasuyo")
+CATEGORIAS = (("Periférico", 30), ("Componente", 25), ("Almacenamiento", 15), ("Pantalla", 10),
+              ("Computadora", 10), ("Redes", 10))
+MARCAS = ("HP", "Logitech", "Redragon", "Samsung", "Kingston", "Seagate", "Crucial", "NVIDIA",
+          "AMD", "ASUS", "Lenovo", "TP-Link")
+ARTICULOS = ("Mouse", "Teclado", "Monitor", "SSD", "Disco Duro", "Memoria RAM", "Tarjeta Gráfica",
+             "Procesador", "Placa Madre", "Laptop", "Router", "Audífonos")
+
+
+def volumenes(escala):
+    return {
+        "clientes": max(10, escala // 10),
+        "productos": min(50_000, max(100, escala // 100)),
+        "ventas": escala,
+        "pedidos": max(1, escala // 2),
+        "clienXproducto": max(1, escala // 20),
+    }
+
+def sesgado(azar, cantidad, sesgo=2.5):
+    # Indice 0..cantidad-1 con los primeros mucho mas probables
+    return int(cantidad * azar.random() ** sesgo)
+
+def fecha_al_azar(azar, hoy, dias=730):
+    fecha = hoy - timedelta(days=azar.randrange(dias))
+    # Sabados y domingos venden el doble: se repite el sorteo la mitad de
+    # las veces que cae entre semana
+    if fecha.weekday() < 5 and azar.random() < 0.5:
+        fecha = hoy - timedelta(days=azar.randrange(dias))
+    return fecha
+
+def dinero(valor):
+    return Decimal(valor).quantize(Decimal("0.01"))
+
+
+class Generador:
+    def __init__(self, conexion, escala, semilla=2025, sqlserver=True, notificar=print):
+        self.conexion = conexion
+        self.volumen = volumenes(escala)
+        self.azar = random.Random(semilla)
+        self.sqlserver = sqlserver
+        self.notificar = notificar
+        self.hoy = date.today()
+        self.cursor = conexion.cursor()
+        self.cursor.fast_executemany = True
+        self.filas = {}
+
+    def _maximo(self, tabla, columna):
+        self.cursor.execute(f"SELECT MAX({columna}) FROM {tabla}")
+        return self.cursor.fetchone()[0] or 0
+
+    def _enviar(self, tabla, columnas, filas, identidad=False):
+        # Un lote ya armado: un solo executemany y su propia transaccion
+        if not filas:
+            return
+        consulta = (f"INSERT INTO {tabla} ({', '.join(columnas)}) "
+                    f"VALUES ({', '.join('?' * len(columnas))})")
+        if identidad and self.sqlserver:
+            self.cursor.execute(f"SET IDENTITY_INSERT {tabla} ON")
+        try:
+            self.cursor.executemany(consulta, filas)
+        finally:
+            if identidad and self.sqlserver:
+                self.cursor.execute(f"SET IDENTITY_INSERT {tabla} OFF")
+        self.conexion.commit()
+        self.filas[tabla] = self.filas.get(tabla, 0) + len(filas)
+
+    # -------------------------
+    # TABLAS
+    # -------------------------
+    def clientes(self):
+        azar, cantidad = self.azar, self.volumen["clientes"]
+        self.base_clientes = self._maximo("clientes", "id_cliente")
+        # DNIs distintos de los ya cargados: se parte de 10 000 000 + id
+        def filas():
+            for i in range(1, cantidad + 1):
+                id_cliente = self.base_clientes + i
+                nombre, apellido = azar.choice(NOMBRES), azar.choice(APELLIDOS)
+                yield (id_cliente, nombre, apellido, str(10_000_000 + id_cliente),
+                       f"9{azar.randrange(10 ** 8):08d}",
+                       f"{nombre.lower()}.{apellido.lower()}{id_cliente}@correo.pe",
+                       f"{azar.choice(CALLES)} {azar.randrange(1, 2000)}")
+        for lote in en_lotes(filas(), TAMANO_LOTE):
+            self._enviar("clientes", ("id_cliente", "nombre", "apellido", "dni", "telefono",
+                                      "correo", "direccion"), lote, identidad=True)
+
+    def productos(self):
+        azar, cantidad = self.azar, self.volumen["productos"]
+        base = self._maximo("productos", "id_producto")
+        categorias = [nombre for nombre, _ in CATEGORIAS]
+        pesos = [peso for _, peso in CATEGORIAS]
+        self.precios = []  # (id_producto, precio), el indice 0 es el mas vendido
+        filas = []
+        for i in range(1, cantidad + 1):
+            precio = dinero(min(9000, max(5, azar.lognormvariate(4.5, 1.1))))
+            # Uno de cada diez con poco stock, para el aviso del reporte
+            stock = azar.randrange(0, 10) if azar.random() < 0.1 else azar.randrange(10, 500)
+            filas.append((base + i, f"{azar.choice(ARTICULOS)} {azar.choice(MARCAS)} {i}",
+                          azar.choices(categorias, pesos)[0], azar.choice(MARCAS), precio, stock))
+            self.precios.append((base + i, precio))
+        azar.shuffle(self.precios)
+        for lote in en_lotes(filas, TAMANO_LOTE):
+            self._enviar("productos", ("id_producto", "nombre", "categoria", "marca", "precio", "stock"),
+                         lote, identidad=True)
+
+    def _lineas(self, maximo):
+        lineas = {}
+        for _ in range(self.azar.randint(1, maximo)):
+            id_producto, precio = self.precios[sesgado(self.azar, len(self.precios))]
+            anterior = lineas.get(id_producto, (0, precio))[0]
+            lineas[id_producto] = (anterior + self.azar.randint(1, 4), precio)
+        return [(id_producto, cantidad, precio, precio * cantidad)
+                for id_producto, (cantidad, precio) in lineas.items()]
+
+    def _cliente_al_azar(self):
+        return self.base_clientes + 1 + sesgado(self.azar, self.volumen["clientes"])
+
+    def ventas(self):
+        # La cabecera lleva el total de sus lineas, asi que se generan
+        # juntas; cada lote de cabeceras se envia antes que sus lineas
+        azar = self.azar
+        base = self._maximo("ventas", "id_venta")
+        for ids in en_lotes(range(base + 1, base + self.volumen["ventas"] + 1), TAMANO_LOTE):
+            cabeceras, detalle = [], []
+            for id_venta in ids:
+                lineas = self._lineas(5)
+                id_cliente = self._cliente_al_azar() if azar.random() < 0.9 else None
+                cabeceras.append((id_venta, id_cliente, fecha_al_azar(azar, self.hoy),
+                                  sum(linea[3] for linea in lineas)))
+                detalle.extend((id_venta, id_producto, cantidad, subtotal)
+                               for id_producto, cantidad, _, subtotal in lineas)
+            self._enviar("ventas", ("id_venta", "id_cliente", "fecha", "total"), cabeceras, identidad=True)
+            self._enviar("detalle_venta", ("id_venta", "id_producto", "cantidad", "subtotal"), detalle)
+
+    def pedidos(self):
+        azar = self.azar
+        base = self._maximo("pedido", "id_pedido")
+        for ids in en_lotes(range(base + 1, base + self.volumen["pedidos"] + 1), TAMANO_LOTE):
+            cabeceras, clientes, detalle = [], [], []
+            for id_pedido in ids:
+                lineas = self._lineas(4)
+                cabeceras.append((id_pedido, fecha_al_azar(azar, self.hoy),
+                                  sum(linea[3] for linea in lineas)))
+                if azar.random() < 0.8:
+                    clientes.append((self._cliente_al_azar(), id_pedido))
+                detalle.extend((id_pedido,) + linea for linea in lineas)
+            self._enviar("pedido", ("id_pedido", "fecha", "total"), cabeceras, identidad=True)
+            self._enviar("clienPedido", ("id_cliente", "id_pedido"), clientes)
+            self._enviar("detalle_pedido", ("id_pedido", "id_producto", "cantidad", "precio", "subtotal"),
+                         detalle)
+
+    def clien_x_producto(self):
+        # Clave primaria (id_cliente, id_producto): se descartan los pares repetidos
+        azar = self.azar
+        self.cursor.execute("SELECT id_cliente, id_producto FROM clienXproducto")
+        pares = {tuple(fila) for fila in self.cursor.fetchall()}
+        def filas():
+            for _ in range(self.volumen["clienXproducto"]):
+                par = (self._cliente_al_azar(), self.precios[sesgado(azar, len(self.precios))][0])
+                if par not in pares:
+                    pares.add(par)
+                    yield par + (azar.randint(1, 5), fecha_al_azar(azar, self.hoy))
+        for lote in en_lotes(filas(), TAMANO_LOTE):
+            self._enviar("clienXproducto", ("id_cliente", "id_producto", "cantidad", "fecha"), lote)
+
+    def generar(self):
+        inicio = time.perf_counter()
+        for paso in (self.clientes, self.productos, self.ventas, self.pedidos, self.clien_x_producto):
+            paso()
+            self.notificar(f"   {paso.__name__}: {time.perf_counter() - inicio:.1f} s")
+        self.cursor.fast_executemany = False
+        return self.filas, time.perf_counter() - inicio
+
+
+def generar(conexion, escala, semilla=2025, sqlserver=True, notificar=print):
+    # Devuelve ({tabla: filas insertadas}, segundos)
+    return Generador(conexion, escala, semilla, sqlserver, notificar).generar()
+
+def abrir(sqlite=None, odbc=None):
+    # (conexion, es_sqlserver) segun los argumentos de linea de comandos
+    if sqlite:
+        import sqlite_local
+        conexion = sqlite_local.conectar(sqlite)
+        sqlite_local.crear_esquema(conexion)
+        return conexion, False
+    import pyodbc
+    return pyodbc.connect(odbc), True
+
+def leer_escala(texto):
+    if texto.lower() in ESCALAS:
+        return ESCALAS[texto.lower()]
+    return int(texto.replace("_", ""))
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Genera datos sinteticos para tiendas")
+    origen = analizador.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--odbc", help="cadena de conexion ODBC a SQL Server")
+    origen.add_argument("--sqlite", help="archivo SQLite local (se crea si no existe)")
+    analizador.add_argument("--escala", default="10k", help=f"ventas a generar: {', '.join(ESCALAS)} o un numero")
+    analizador.add_argument("--semilla", type=int, default=2025)
+    argumentos = analizador.parse_args()
+
+    conexion, sqlserver = abrir(argumentos.sqlite, argumentos.odbc)
+    escala = leer_escala(argumentos.escala)
+    print(f"Generando escala {escala:,}...")
+    filas, segundos = generar(conexion, escala, argumentos.semilla, sqlserver)
+    conexion.close()
+    print(f"{sum(filas.values()):,} filas en {segundos:.1f} s")
@@ -0,0 +1,207 @@
+import csv
+import time
+
+from consultas import ErrorNegocio
+from validacion import cliente_desde_campos, producto_desde_campos
+
+# =========================
+# IMPORTACION MASIVA (CSV)
+# =========================
+# Carga clientes o productos desde un CSV de cualquier tamaño. El archivo se
+# lee fila por fila y se procesa en lotes: cada lote se valida con las
+# mismas reglas que los formularios (validacion.py), se envia con
+# fast_executemany en un solo viaje y se confirma en su propia transaccion,
+# de modo que un error a mitad del archivo no deshace lo ya importado y la
+# memoria usada no depende del tamaño del archivo.
+#
+# Las funciones se ejecutan en un hilo de fondo; "notificar" recibe el
+# avance (leidas, importadas, rechazadas) al terminar cada lote.
+
+TAMANO_LOTE = 5000
+MAX_ERRORES = 200  # errores detallados que se conservan para el resumen
+
+COLUMNAS_CLIENTES = ("nombre", "apellido", "dni", "telefono", "correo", "direccion")
+COLUMNAS_PRODUCTOS = ("nombre", "categoria", "marca", "precio", "stock")
+
+ELIMINAR_TEMPORAL_CLIENTES = (
+    "IF OBJECT_ID('tempdb..#importar_clientes') IS NOT NULL DROP TABLE #importar_clientes"
+)
+
+
+class Resumen:
+    def __init__(self):
+        self.leidas = 0
+        self.importadas = 0
+        self.duplicadas = 0
+        self.invalidas = 0
+        self.errores = []  # (linea, mensaje), como maximo MAX_ERRORES
+        self._inicio = time.perf_counter()
+
+    @property
+    def rechazadas(self):
+        return self.duplicadas + self.invalidas
+
+    @property
+    def segundos(self):
+        return time.perf_counter() - self._inicio
+
+    def rechazar(self, linea, mensaje, duplicada=False):
+        if duplicada:
+            self.duplicadas += 1
+        else:
+            self.invalidas += 1
+        if len(self.errores) < MAX_ERRORES:
+            self.errores.append((linea, mensaje))
+
+    def texto(self):
+        texto = (f"Filas leídas: {self.leidas}\n"
+                 f"Importadas: {self.importadas}\n"
+                 f"Duplicadas: {self.duplicadas}\n"
+                 f"Inválidas: {self.invalidas}\n"
+                 f"Tiempo: {self.segundos:.1f} s "
+                 f"({self.leidas / max(self.segundos, 0.001):,.0f} filas/s)")
+        if self.errores:
+            texto += "\n\nPrimeros errores:\n"
+            texto += "\n".join(f"   Línea {linea}: {mensaje}" for linea, mensaje in self.errores[:10])
+        return texto
+
+
+def leer_csv(ruta, columnas, obligatorias):
+    # Genera (numero_de_linea, diccionario) con los encabezados en minusculas.
+    # Acepta coma, punto y coma o tabulador como separador.
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+        muestra = archivo.read(4096)
+        archivo.seek(0)
+        try:
+            dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+        except csv.Error:
+            dialecto = csv.excel
+        lector = csv.reader(archivo, dialecto)
+        encabezados = [encabezado.strip().lower() for encabezado in next(lector, [])]
+        faltantes = [columna for columna in obligatorias if columna not in encabezados]
+        if faltantes:
+            raise ErrorNegocio(f"Faltan columnas en el CSV: {', '.join(faltantes)}")
+        posiciones = {columna: encabezados.index(columna) for columna in columnas
+                      if columna in encabezados}
+        for fila in lector:
+            if not any(celda.strip() for celda in fila):
+                continue
+            yield lector.line_num, {columna: (fila[i] if i < len(fila) else "")
+                                    for columna, i in posiciones.items()}
+
+def en_lotes(filas, tamano):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+# CLIENTES
+def importar_clientes(conexion, ruta, notificar, tamano_lote=TAMANO_LOTE):
+    resumen = Resumen()
+    vistos = set()  # DNIs del archivo, para descartar repetidos dentro del CSV
+    cursor = conexion.cursor()
+    # Tabla temporal de la sesion: cada lote se sube aqui y pasa a clientes
+    # con un solo INSERT ... SELECT que descarta los DNI ya registrados.
+    # Si una importacion anterior en esta conexion no llego a borrarla, se
+    # descarta antes de crearla de nuevo.
+    cursor.execute(ELIMINAR_TEMPORAL_CLIENTES)
+    cursor.execute("""
+        CREATE TABLE #importar_clientes (
+            nombre NVARCHAR(100),
+            apellido NVARCHAR(100),
+            dni CHAR(8),
+            telefono VARCHAR(15),
+            correo NVARCHAR(100),
+            direccion NVARCHAR(150)
+        )
+    """)
+    cursor.fast_executemany = True
+    try:
+        filas = leer_csv(ruta, COLUMNAS_CLIENTES, ("nombre", "apellido", "dni"))
+        for lote in en_lotes(filas, tamano_lote):
+            validas = []
+            for linea, fila in lote:
+                resumen.leidas += 1
+                try:
+                    cliente = cliente_desde_campos(**fila)
+                except ErrorNegocio as e:
+                    resumen.rechazar(linea, str(e))
+                    continue
+                if cliente["dni"] in vistos:
+                    resumen.rechazar(linea, f"DNI {cliente['dni']} repetido en el archivo", duplicada=True)
+                    continue
+                vistos.add(cliente["dni"])
+                validas.append(tuple(cliente[columna] for columna in COLUMNAS_CLIENTES))
+
+            if validas:
+                cursor.execute("TRUNCATE TABLE #importar_clientes")
+                cursor.executemany("""
+                    INSERT INTO #importar_clientes (nombre, apellido, dni, telefono, correo, direccion)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, validas)
+                # Duplicados contra la base, para todo el lote de una vez
+                cursor.execute("""
+                    INSERT INTO clientes (nombre, apellido, dni, telefono, correo, direccion)
+                    SELECT s.nombre, s.apellido, s.dni, s.telefono, s.correo, s.direccion
+                    FROM #importar_clientes s
+                    WHERE NOT EXISTS (SELECT 1 FROM clientes c WHERE c.dni = s.dni)
+                """)
+                insertadas = cursor.rowcount
+                conexion.commit()
+                resumen.importadas += insertadas
+                resumen.duplicadas += len(validas) - insertadas
+            notificar((resumen.leidas, resumen.importadas, resumen.rechazadas))
+    except Exception:
+        # Solo se deshace el lote que fallo; los anteriores ya se confirmaron
+        try:
+            conexion.rollback()
+        except Exception:
+            pass
+        raise
+    finally:
+        cursor.fast_executemany = False
+        # La limpieza no debe ocultar el error original de la importacion
+        try:
+            cursor.execute(ELIMINAR_TEMPORAL_CLIENTES)
+            conexion.commit()
+        except Exception:
+            pass
+    return resumen
+
+
+# PRODUCTOS
+def importar_productos(conexion, ruta, notificar, tamano_lote=TAMANO_LOTE):
+    # Los productos no tienen clave natural: cada fila valida se inserta
+    resumen = Resumen()
+    cursor = conexion.cursor()
+    cursor.fast_executemany = True
+    try:
+        filas = leer_csv(ruta, COLUMNAS_PRODUCTOS, ("nombre", "precio"))
+        for lote in en_lotes(filas, tamano_lote):
+            validas = []
+            for linea, fila in lote:
+                resumen.leidas += 1
+                try:
+                    producto = producto_desde_campos(**{columna: fila.get(columna)
+                                                        for columna in COLUMNAS_PRODUCTOS})
+                except ErrorNegocio as e:
+                    resumen.rechazar(linea, str(e))
+                    continue
+                validas.append(tuple(producto[columna] for columna in COLUMNAS_PRODUCTOS))
+
+            if validas:
+                cursor.executemany("""
+                    INSERT INTO productos (nombre, categoria, marca, precio, stock)
+                    VALUES (?, ?, ?, ?, ?)
+                """, validas)
+                conexion.commit()
+                resumen.importadas += len(validas)
+            notificar((resumen.leidas, resumen.importadas, resumen.rechazadas))
+    finally:
+        cursor.fast_executemany = False
+    return resumen
@@ -0,0 +1,155 @@
+import bisect
+import unicodedata
+
+# =========================
+# INDICE DE PREFIJOS
+# =========================
+# Indice en memoria para la busqueda mientras se escribe en los combos de
+# clientes y productos. Cada registro se guarda con su etiqueta (el texto
+# que muestra el combo) y una lista de palabras por las que se puede
+# encontrar (nombre, apellido, DNI, marca...). Las palabras normalizadas se
+# mantienen en una lista ordenada de (palabra, clave), de modo que todas las
+# que empiezan por un prefijo forman un tramo contiguo que se ubica con
+# bisect: cada tecla cuesta O(log n + resultados), sin recorrer el catalogo.
+#
+# Dos registros pueden mostrar la misma etiqueta; por eso cada etiqueta
+# guarda todas sus claves y buscar_registros devuelve la clave de cada
+# opcion, para que el combo recuerde cual se eligio.
+#
+# Solo debe usarse desde el hilo de Tk.
+
+def normalizar(texto):
+    # Minusculas y sin tildes: "Pérez" y "perez" se buscan igual
+    texto = str(texto).lower()
+    if texto.isascii():
+        return texto
+    texto = unicodedata.normalize("NFKD", texto)
+    return "".join(c for c in texto if not unicodedata.combining(c))
+
+def palabras(*textos):
+    resultado = set()
+    for texto in textos:
+        if texto is not None:
+            resultado.update(normalizar(texto).split())
+    return resultado
+
+
+class IndicePrefijos:
+    def __init__(self):
+        self._entradas = []   # (palabra, clave) ordenadas
+        self._etiquetas = []  # (etiqueta normalizada, etiqueta, clave) ordenadas
+        self._registros = {}  # clave -> (etiqueta, palabras)
+        self._por_etiqueta = {}  # etiqueta -> [claves]
+
+    def __len__(self):
+        return len(self._registros)
+
+    # -------------------------
+    # CARGA Y CAMBIOS
+    # -------------------------
+    def reemplazar(self, registros):
+        # registros: iterable de (clave, etiqueta, textos)
+        self._registros = {}
+        for clave, etiqueta, textos in registros:
+            self._registros[clave] = (etiqueta, palabras(*textos))
+        self._entradas = sorted((palabra, clave)
+                                for clave, (_, propias) in self._registros.items()
+                                for palabra in propias)
+        self._etiquetas = sorted((normalizar(etiqueta), etiqueta, clave)
+                                 for clave, (etiqueta, _) in self._registros.items())
+        self._por_etiqueta = {}
+        for _, etiqueta, clave in self._etiquetas:
+            self._por_etiqueta.setdefault(etiqueta, []).append(clave)
+
+    def agregar_lote(self, registros):
+        # Para muchos registros nuevos a la vez: se agregan al final y se
+        # reordena una sola vez. sort() aprovecha que ambas partes ya estan
+        # ordenadas, asi cuesta mucho menos que un insort por palabra.
+        nuevas_entradas, nuevas_etiquetas = [], []
+        for clave, etiqueta, textos in registros:
+            self.quitar(clave)
+            propias = palabras(*textos)
+            self._registros[clave] = (etiqueta, propias)
+            self._por_etiqueta.setdefault(etiqueta, []).append(clave)
+            nuevas_entradas.extend((palabra, clave) for palabra in propias)
+            nuevas_etiquetas.append((normalizar(etiqueta), etiqueta, clave))
+        nuevas_entradas.sort()
+        nuevas_etiquetas.sort()
+        self._entradas.extend(nuevas_entradas)
+        self._entradas.sort()
+        self._etiquetas.extend(nuevas_etiquetas)
+        self._etiquetas.sort()
+
+    def guardar(self, clave, etiqueta, textos):
+        self.quitar(clave)
+        nuevas = palabras(*textos)
+        self._registros[clave] = (etiqueta, nuevas)
+        for palabra in nuevas:
+            bisect.insort(self._entradas, (palabra, clave))
+        bisect.insort(self._etiquetas, (normalizar(etiqueta), etiqueta, clave))
+        self._por_etiqueta.setdefault(etiqueta, []).append(clave)
+
+    def quitar(self, clave):
+        registro = self._registros.pop(clave, None)
+        if registro is None:
+            return
+        etiqueta, anteriores = registro
+        for palabra in anteriores:
+            self._borrar(self._entradas, (palabra, clave))
+        self._borrar(self._etiquetas, (normalizar(etiqueta), etiqueta, clave))
+        claves = self._por_etiqueta[etiqueta]
+        claves.remove(clave)
+        if not claves:
+            del self._por_etiqueta[etiqueta]
+
+    @staticmethod
+    def _borrar(lista, elemento):
+        i = bisect.bisect_left(lista, elemento)
+        if i < len(lista) and lista[i] == elemento:
+            del lista[i]
+
+    # -------------------------
+    # BUSQUEDA
+    # -------------------------
+    def clave(self, etiqueta):
+        # Clave del unico registro que muestra esa etiqueta; None si no
+        # existe o si la comparten varios
+        claves = self._por_etiqueta.get(etiqueta)
+        return claves[0] if claves and len(claves) == 1 else None
+
+    def claves(self, etiqueta):
+        return list(self._por_etiqueta.get(etiqueta, ()))
+
+    def etiqueta(self, clave):
+        registro = self._registros.get(clave)
+        return registro[0] if registro else None
+
+    def buscar(self, texto, limite=50):
+        return [etiqueta for etiqueta, _ in self.buscar_registros(texto, limite)]
+
+    def buscar_registros(self, texto, limite=50):
+        # (etiqueta, clave) de los registros que tienen, para cada palabra
+        # escrita, alguna palabra que empieza por ella. Sin texto devuelve
+        # los primeros en orden alfabetico.
+        consulta = sorted(palabras(texto), key=len, reverse=True)
+        if not consulta:
+            return [(etiqueta, clave) for _, etiqueta, clave in self._etiquetas[:limite]]
+
+        # La palabra mas larga suele ser la mas selectiva: su tramo guia la
+        # busqueda y las demas solo filtran los candidatos.
+        guia, resto = consulta[0], consulta[1:]
+        resultado = []
+        vistas = set()
+        i = bisect.bisect_left(self._entradas, (guia,))
+        while i < len(self._entradas) and len(resultado) < limite:
+            palabra, clave = self._entradas[i]
+            i += 1
+            if not palabra.startswith(guia):
+                break
+            if clave in vistas:
+                continue
+            vistas.add(clave)
+            etiqueta, propias = self._registros[clave]
+            if all(any(p.startswith(r) for p in propias) for r in resto):
+                resultado.append((etiqueta, clave))
+        return sorted(resultado, key=lambda registro: normalizar(registro[0]))
@@ -0,0 +1,108 @@
+import os
+import sqlite3
+import time
+from datetime import date
+from decimal import Decimal
+
+import modelo
+
+# =========================
+# INSTANTANEA LOCAL
+# =========================
+# Copia en un archivo SQLite local de lo ultimo que mostro la ventana:
+# clientes y productos completos y la primera pagina de ventas y pedidos.
+# Al abrir, la ventana la dibuja de inmediato (se lee del disco, no depende
+# de la red ni del servidor) y luego la reemplaza con los datos de la base,
+# que llegan en segundo plano; mientras tanto las filas se ven como
+# desactualizadas.
+#
+# Se guarda periodicamente y al cerrar. Cada guardado es una transaccion de
+# SQLite: si el programa se corta a mitad, queda la instantanea anterior.
+# Una instantanea danada o de otra tienda se ignora.
+
+# Columnas de cada entidad, en el orden de consultas.py. Los tipos DINERO y
+# FECHA se convierten al leer para devolver Decimal y date, como pyodbc.
+COLUMNAS = {
+    "clientes": (("id_cliente", "INTEGER"), ("nombre", "TEXT"), ("apellido", "TEXT"), ("dni", "TEXT"),
+                 ("telefono", "TEXT"), ("correo", "TEXT"), ("direccion", "TEXT")),
+    "productos": (("id_producto", "INTEGER"), ("nombre", "TEXT"), ("categoria", "TEXT"),
+                  ("marca", "TEXT"), ("precio", "DINERO"), ("stock", "INTEGER")),
+    "ventas": (("id_venta", "INTEGER"), ("cliente", "TEXT"), ("fecha", "FECHA"), ("total", "DINERO")),
+    "pedidos": (("id_pedido", "INTEGER"), ("fecha", "FECHA"), ("total", "DINERO"), ("cliente", "TEXT")),
+}
+
+
+def _a_fecha(texto):
+    texto = texto.decode()
+    try:
+        return date.fromisoformat(texto[:10])
+    except ValueError:
+        return texto
+
+sqlite3.register_converter("DINERO", lambda texto: Decimal(texto.decode()))
+sqlite3.register_converter("FECHA", _a_fecha)
+
+def _a_texto(valor, tipo):
+    # DINERO y FECHA se guardan como texto para no perder centavos ni formato
+    if valor is None or tipo not in ("DINERO", "FECHA"):
+        return valor
+    return str(valor)
+
+def _conectar(ruta):
+    conexion = sqlite3.connect(ruta, detect_types=sqlite3.PARSE_DECLTYPES)
+    conexion.execute("""
+        CREATE TABLE IF NOT EXISTS meta (
+            entidad TEXT PRIMARY KEY,
+            tienda TEXT,
+            total INTEGER,
+            guardada_en REAL
+        )
+    """)
+    for entidad, columnas in COLUMNAS.items():
+        # "DINERO TEXT": el convertidor se elige por la primera palabra y
+        # TEXT evita que SQLite pase "2800.50" a numero y pierda el cero
+        definicion = ", ".join(f"{nombre} {tipo} TEXT" if tipo in ("DINERO", "FECHA") else f"{nombre} {tipo}"
+                               for nombre, tipo in columnas)
+        conexion.execute(f"CREATE TABLE IF NOT EXISTS {entidad} (orden INTEGER PRIMARY KEY, {definicion})")
+    return conexion
+
+
+def guardar(ruta, tienda, datos):
+    # datos: {entidad: (total, filas)}; las entidades que no vienen
+    # conservan lo guardado antes. Pensado para un hilo de fondo.
+    conexion = _conectar(ruta)
+    try:
+        with conexion:
+            for entidad, (total, filas) in datos.items():
+                columnas = COLUMNAS[entidad]
+                conexion.execute(f"DELETE FROM {entidad}")
+                conexion.executemany(
+                    f"INSERT INTO {entidad} VALUES (?, {', '.join('?' * len(columnas))})",
+                    ((orden, *(_a_texto(valor, tipo) for valor, (_, tipo) in zip(fila, columnas)))
+                     for orden, fila in enumerate(filas)))
+                conexion.execute("INSERT OR REPLACE INTO meta VALUES (?, ?, ?, ?)",
+                                 (entidad, tienda, total, time.time()))
+    finally:
+        conexion.close()
+
+def leer(ruta, tienda):
+    # {entidad: (total, filas, guardada_en)} o {} si no hay instantanea util
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        conexion = _conectar(ruta)
+        try:
+            datos = {}
+            cursor = conexion.execute("SELECT entidad, total, guardada_en FROM meta WHERE tienda = ?",
+                                      (tienda,))
+            for entidad, total, guardada_en in cursor.fetchall():
+                if entidad not in COLUMNAS:
+                    continue
+                nombres = ", ".join(nombre for nombre, _ in COLUMNAS[entidad])
+                filas = conexion.execute(f"SELECT {nombres} FROM {entidad} ORDER BY orden").fetchall()
+                datos[entidad] = (total, modelo.registros(entidad, filas), guardada_en)
+            return datos
+        finally:
+            conexion.close()
+    except sqlite3.Error:
+        return {}
@@ -0,0 +1,319 @@
+import logging
+import math
+import sys
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+# =========================
+# MEDICION DE CONSULTAS
+# =========================
+# Envoltorios de conexion y cursor que miden cada sentencia: tiempo de
+# ejecucion, tiempo de lectura (fetch) y filas leidas, agrupados por texto
+# de la sentencia y por la funcion que la lanzo (consultas.registrar_pedido,
+# etc). Los tiempos se guardan en histogramas para dar percentiles sin
+# conservar cada muestra, y las sentencias que superan el umbral se
+# escriben en el registro de consultas lentas.
+#
+# Se instala envolviendo la fabrica del pool:
+#   pool = PoolConexiones(medir_fabrica(fabrica, metricas))
+#
+# Una sentencia se da por terminada cuando su cursor ejecuta otra o se
+# descarta (al salir de la funcion de consultas.py), o cuando la conexion
+# confirma, deshace o se devuelve al pool; asi el tiempo de lectura queda
+# incluido.
+
+# Modulos que no cuentan como "quien lanzo la consulta"
+MODULOS_INTERNOS = {__name__, "pool_conexiones", "sqlite_local", "contextlib", "functools"}
+
+
+class Histograma:
+    # Cubetas geometricas: cada una un 10 % mas ancha que la anterior desde
+    # 0.01 ms, asi cualquier percentil tiene menos de 10 % de error y la
+    # memoria no crece con la cantidad de muestras.
+    BASE = 1.1
+    MINIMO = 0.01
+
+    def __init__(self):
+        self._cubetas = {}
+        self.cantidad = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def agregar(self, ms):
+        cubeta = 0 if ms <= self.MINIMO else math.ceil(math.log(ms / self.MINIMO, self.BASE))
+        self._cubetas[cubeta] = self._cubetas.get(cubeta, 0) + 1
+        self.cantidad += 1
+        self.suma += ms
+        self.maximo = max(self.maximo, ms)
+
+    def percentil(self, p):
+        if not self.cantidad:
+            return 0.0
+        objetivo = max(1, math.ceil(self.cantidad * p / 100))
+        acumulado = 0
+        for cubeta in sorted(self._cubetas):
+            acumulado += self._cubetas[cubeta]
+            if acumulado >= objetivo:
+                return min(self.MINIMO * self.BASE ** cubeta, self.maximo)
+        return self.maximo
+
+    @property
+    def promedio(self):
+        return self.suma / self.cantidad if self.cantidad else 0.0
+
+
+class Estadistica:
+    def __init__(self):
+        self.tiempos = Histograma()  # ejecucion + lectura
+        self.ms_ejecutar = 0.0
+        self.ms_leer = 0.0
+        self.filas = 0
+
+    def agregar(self, ms_ejecutar, ms_leer, filas):
+        self.tiempos.agregar(ms_ejecutar + ms_leer)
+        self.ms_ejecutar += ms_ejecutar
+        self.ms_leer += ms_leer
+        self.filas += filas
+
+    def como_diccionario(self, nombre):
+        return {
+            "nombre": nombre,
+            "ejecuciones": self.tiempos.cantidad,
+            "total_ms": self.tiempos.suma,
+            "ejecutar_ms": self.ms_ejecutar,
+            "leer_ms": self.ms_leer,
+            "filas": self.filas,
+            "p50_ms": self.tiempos.percentil(50),
+            "p95_ms": self.tiempos.percentil(95),
+            "p99_ms": self.tiempos.percentil(99),
+            "max_ms": self.tiempos.maximo,
+        }
+
+
+class Metricas:
+    def __init__(self, umbral_lenta_ms=200.0, registro_lentas=None):
+        self.umbral_lenta_ms = umbral_lenta_ms
+        self._registro = registro_lentas or logging.getLogger("tiendas.consultas_lentas")
+        self._candado = threading.Lock()
+        self._por_sentencia = {}
+        self._por_funcion = {}
+        self._hilo = threading.local()  # operacion en curso de cada hilo
+        self._ultima = None
+
+    def registrar(self, sentencia, funcion, ms_ejecutar, ms_leer, filas):
+        clave = " ".join(sentencia.split())[:160]
+        with self._candado:
+            self._por_sentencia.setdefault(clave, Estadistica()).agregar(ms_ejecutar, ms_leer, filas)
+            self._por_funcion.setdefault(funcion, Estadistica()).agregar(ms_ejecutar, ms_leer, filas)
+            # Varios hilos pueden sumar a la misma operacion (continuar)
+            operacion = getattr(self._hilo, "operacion", None)
+            if operacion is not None:
+                operacion["consultas"] += 1
+                operacion["bd_ms"] += ms_ejecutar + ms_leer
+                operacion["filas"] += filas
+        total = ms_ejecutar + ms_leer
+        if total >= self.umbral_lenta_ms:
+            self._registro.warning("%.1f ms (ejecutar %.1f, leer %.1f) %d filas en %s: %s",
+                                   total, ms_ejecutar, ms_leer, filas, funcion, clave)
+
+    @contextmanager
+    def operacion(self, nombre):
+        # Agrupa las consultas que hace este hilo durante una tarea; al
+        # terminar queda disponible en ultima()
+        anterior = getattr(self._hilo, "operacion", None)
+        datos = {"nombre": nombre, "consultas": 0, "bd_ms": 0.0, "filas": 0}
+        self._hilo.operacion = datos
+        inicio = time.perf_counter()
+        try:
+            yield datos
+        finally:
+            datos["total_ms"] = (time.perf_counter() - inicio) * 1000
+            self._hilo.operacion = anterior
+            with self._candado:
+                self._ultima = datos
+
+    def en_curso(self):
+        # Operacion abierta en este hilo, o None
+        return getattr(self._hilo, "operacion", None)
+
+    @contextmanager
+    def continuar(self, operacion):
+        # Suma a "operacion" (tomada con en_curso() en otro hilo) las
+        # consultas que haga este hilo, p. ej. las partes del reporte que
+        # MotorReporte lanza en paralelo
+        anterior = getattr(self._hilo, "operacion", None)
+        self._hilo.operacion = operacion
+        try:
+            yield operacion
+        finally:
+            self._hilo.operacion = anterior
+
+    def ultima(self):
+        with self._candado:
+            return self._ultima
+
+    def resumen(self, por="funcion", limite=10):
+        # Las entradas con mas tiempo acumulado primero
+        with self._candado:
+            grupo = self._por_funcion if por == "funcion" else self._por_sentencia
+            filas = [estadistica.como_diccionario(nombre) for nombre, estadistica in grupo.items()]
+        filas.sort(key=lambda fila: fila["total_ms"], reverse=True)
+        return filas[:limite]
+
+    def informe(self, por="funcion", limite=10):
+        lineas = []
+        for fila in self.resumen(por, limite):
+            lineas.append(f"{fila['nombre']}\n"
+                          f"   {fila['ejecuciones']} ejecuciones, {fila['total_ms']:,.0f} ms en total, "
+                          f"{fila['filas']:,} filas\n"
+                          f"   p50 {fila['p50_ms']:.1f} ms · p95 {fila['p95_ms']:.1f} ms · "
+                          f"p99 {fila['p99_ms']:.1f} ms · máx {fila['max_ms']:.1f} ms")
+        return "\n".join(lineas) or "Todavía no se ejecutó ninguna consulta"
+
+    def reiniciar(self):
+        with self._candado:
+            self._por_sentencia.clear()
+            self._por_funcion.clear()
+            self._ultima = None
+
+
+def quien_llama():
+    # "modulo.funcion" del primer marco fuera de los envoltorios
+    marco = sys._getframe(2)
+    while marco is not None and marco.f_globals.get("__name__") in MODULOS_INTERNOS:
+        marco = marco.f_back
+    if marco is None:
+        return "?"
+    return f"{marco.f_globals.get('__name__')}.{marco.f_code.co_name}"
+
+
+class CursorMedido:
+    def __init__(self, cursor, metricas):
+        self._cursor = cursor
+        self._metricas = metricas
+        self._actual = None  # [sentencia, funcion, ms_ejecutar, ms_leer, filas]
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    @property
+    def fast_executemany(self):
+        return self._cursor.fast_executemany
+
+    @fast_executemany.setter
+    def fast_executemany(self, valor):
+        self._cursor.fast_executemany = valor
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def terminar(self):
+        if self._actual is not None:
+            self._metricas.registrar(*self._actual)
+            self._actual = None
+
+    def _ejecutar(self, metodo, sentencia, *args):
+        self.terminar()
+        funcion = quien_llama()
+        inicio = time.perf_counter()
+        try:
+            metodo(sentencia, *args)
+        finally:
+            self._actual = [sentencia, funcion, (time.perf_counter() - inicio) * 1000, 0.0, 0]
+        return self
+
+    def execute(self, sentencia, *args):
+        return self._ejecutar(self._cursor.execute, sentencia, *args)
+
+    def executemany(self, sentencia, *args):
+        return self._ejecutar(self._cursor.executemany, sentencia, *args)
+
+    def _leer(self, metodo, *args):
+        inicio = time.perf_counter()
+        resultado = metodo(*args)
+        if self._actual is not None:
+            self._actual[3] += (time.perf_counter() - inicio) * 1000
+        return resultado
+
+    def fetchone(self):
+        fila = self._leer(self._cursor.fetchone)
+        if fila is not None and self._actual is not None:
+            self._actual[4] += 1
+        return fila
+
+    def fetchmany(self, *args):
+        filas = self._leer(self._cursor.fetchmany, *args)
+        if self._actual is not None:
+            self._actual[4] += len(filas)
+        return filas
+
+    def fetchall(self):
+        filas = self._leer(self._cursor.fetchall)
+        if self._actual is not None:
+            self._actual[4] += len(filas)
+        return filas
+
+    def nextset(self):
+        # Los conjuntos de un mismo lote cuentan como una sola sentencia
+        return self._leer(self._cursor.nextset)
+
+    def close(self):
+        self.terminar()
+        self._cursor.close()
+
+    def __del__(self):
+        try:
+            self.terminar()
+        except Exception:
+            pass
+
+
+class ConexionMedida:
+    def __init__(self, conexion, metricas):
+        self._conexion = conexion
+        self._metricas = metricas
+        self._cursores = weakref.WeakSet()
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def _terminar_cursores(self):
+        for cursor in list(self._cursores):
+            cursor.terminar()
+
+    def cursor(self):
+        cursor = CursorMedido(self._conexion.cursor(), self._metricas)
+        self._cursores.add(cursor)
+        return cursor
+
+    def commit(self):
+        self._terminar_cursores()
+        self._conexion.commit()
+
+    def rollback(self):
+        self._terminar_cursores()
+        self._conexion.rollback()
+
+    def close(self):
+        self._terminar_cursores()
+        self._conexion.close()
+
+
+def medir_fabrica(fabrica, metricas):
+    # Fabrica para PoolConexiones cuyas conexiones quedan medidas
+    def crear():
+        return ConexionMedida(fabrica(), metricas)
+    return crear
+
+def registrar_lentas_en(ruta, nivel=logging.WARNING):
+    # Escribe las consultas lentas en un archivo, una por linea
+    registro = logging.getLogger("tiendas.consultas_lentas")
+    manejador = logging.FileHandler(ruta, encoding="utf-8", delay=True)
+    manejador.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+    registro.addHandler(manejador)
+    registro.setLevel(nivel)
+    registro.propagate = False
+    return registro
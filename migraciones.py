@@ -0,0 +1,73 @@
+import os
+import re
+
+# =========================
+# MIGRACIONES DEL ESQUEMA
+# =========================
+# SQLQueryDB.tiendas.sql crea la base desde cero; los cambios posteriores
+# del esquema van como scripts numerados en la carpeta "migraciones"
+# (0001_descripcion.sql, 0002_...). La tabla schema_version registra cuales
+# ya se aplicaron, asi la aplicacion puede ejecutar al arrancar solo las
+# pendientes. Cada script se separa en lotes por las lineas "GO", igual que
+# en SSMS, y se aplica completo dentro de una transaccion.
+
+CARPETA_MIGRACIONES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migraciones")
+
+PATRON_ARCHIVO = re.compile(r"^(\d+)_(.+)\.sql$")
+PATRON_GO = re.compile(r"^\s*GO\s*;?\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+class ErrorMigracion(Exception):
+    pass
+
+
+def listar_migraciones(carpeta=CARPETA_MIGRACIONES):
+    # [(version, nombre, ruta)] ordenadas por version
+    migraciones = []
+    for archivo in os.listdir(carpeta):
+        coincidencia = PATRON_ARCHIVO.match(archivo)
+        if coincidencia:
+            migraciones.append((int(coincidencia.group(1)), coincidencia.group(2),
+                                os.path.join(carpeta, archivo)))
+    migraciones.sort()
+    return migraciones
+
+def separar_lotes(script):
+    return [lote.strip() for lote in PATRON_GO.split(script) if lote.strip()]
+
+def version_actual(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("""
+        IF OBJECT_ID('schema_version', 'U') IS NULL
+            CREATE TABLE schema_version (
+                version INT PRIMARY KEY,
+                nombre NVARCHAR(200),
+                aplicada DATETIME2 DEFAULT SYSDATETIME()
+            );
+    """)
+    cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+    version = cursor.fetchone()[0]
+    conexion.commit()
+    return version
+
+def aplicar_pendientes(conexion, carpeta=CARPETA_MIGRACIONES):
+    # Devuelve la lista de migraciones aplicadas en esta llamada
+    actual = version_actual(conexion)
+    aplicadas = []
+    for version, nombre, ruta in listar_migraciones(carpeta):
+        if version <= actual:
+            continue
+        with open(ruta, encoding="utf-8") as archivo:
+            lotes = separar_lotes(archivo.read())
+        cursor = conexion.cursor()
+        try:
+            for lote in lotes:
+                cursor.execute(lote)
+            cursor.execute("INSERT INTO schema_version (version, nombre) VALUES (?, ?)",
+                           (version, nombre))
+            conexion.commit()
+        except Exception as e:
+            conexion.rollback()
+            raise ErrorMigracion(f"No se pudo aplicar la migracion {version:04d} ({nombre}): {e}") from e
+        aplicadas.append((version, nombre))
+    return aplicadas
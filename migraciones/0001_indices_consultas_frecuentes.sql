@@ -0,0 +1,31 @@
+-- ============================================================
+-- INDICES PARA LAS CONSULTAS FRECUENTES DE LA APLICACION
+-- ============================================================
+-- Las tablas solo tenian clave primaria, asi que cada busqueda por DNI,
+-- por nombre de cliente o por fecha recorria la tabla completa.
+
+-- DNI unico: la verificacion de duplicados pasa a ser una busqueda por
+-- indice y la base impide duplicados aunque dos altas lleguen a la vez.
+-- Falla si ya hay DNIs repetidos; corregirlos antes de aplicar.
+CREATE UNIQUE INDEX UX_clientes_dni ON clientes (dni) WHERE dni IS NOT NULL;
+GO
+
+-- Nombre completo persistido e indexado: "nombre + ' ' + apellido = ?" no
+-- puede usar ningun indice, "nombre_completo = ?" si.
+ALTER TABLE clientes ADD nombre_completo AS (nombre + ' ' + apellido) PERSISTED;
+GO
+
+CREATE INDEX IX_clientes_nombre_completo ON clientes (nombre_completo);
+GO
+
+-- Listados de ventas y pedidos, de la mas reciente a la mas antigua
+CREATE INDEX IX_ventas_fecha ON ventas (fecha DESC, id_venta DESC) INCLUDE (id_cliente, total);
+CREATE INDEX IX_pedido_fecha ON pedido (fecha DESC, id_pedido DESC) INCLUDE (total);
+GO
+
+-- Claves foraneas que no son la primera columna de ninguna clave primaria
+CREATE INDEX IX_ventas_id_cliente ON ventas (id_cliente);
+CREATE INDEX IX_detalle_venta_id_producto ON detalle_venta (id_producto) INCLUDE (cantidad);
+CREATE INDEX IX_clienPedido_id_pedido ON clienPedido (id_pedido);
+CREATE INDEX IX_clienXproducto_id_producto ON clienXproducto (id_producto);
+GO
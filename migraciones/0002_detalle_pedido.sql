@@ -0,0 +1,20 @@
+-- ============================================================
+-- LINEAS DE PEDIDO
+-- ============================================================
+-- Hasta ahora un pedido solo guardaba la cabecera; los productos elegidos
+-- se perdian al grabarlo.
+CREATE TABLE detalle_pedido (
+    id_detalle INT IDENTITY(1,1) PRIMARY KEY,
+    id_pedido INT NOT NULL,
+    id_producto INT NOT NULL,
+    cantidad INT NOT NULL,
+    precio DECIMAL(10,2) NOT NULL,
+    subtotal DECIMAL(10,2) NOT NULL,
+    FOREIGN KEY (id_pedido) REFERENCES pedido(id_pedido),
+    FOREIGN KEY (id_producto) REFERENCES productos(id_producto)
+);
+GO
+
+CREATE INDEX IX_detalle_pedido_id_pedido ON detalle_pedido (id_pedido) INCLUDE (id_producto, cantidad);
+CREATE INDEX IX_detalle_pedido_id_producto ON detalle_pedido (id_producto);
+GO
@@ -0,0 +1,52 @@
+-- ============================================================
+-- RESUMENES PARA EL REPORTE GENERAL
+-- ============================================================
+-- El reporte sumaba y agrupaba ventas, pedidos y detalle_venta completos
+-- en cada clic. Estas vistas indexadas guardan los totales ya agrupados;
+-- SQL Server los corrige en la misma transaccion de cada INSERT, UPDATE o
+-- DELETE sobre las tablas base, venga de la aplicacion o de otro programa,
+-- asi el reporte solo lee unas pocas filas.
+-- (SUM sobre columnas que admiten NULL no se permite en una vista
+-- indexada, de ahi los ISNULL.)
+
+CREATE VIEW dbo.resumen_ventas_diarias WITH SCHEMABINDING AS
+    SELECT fecha, COUNT_BIG(*) AS ventas, SUM(ISNULL(total, 0)) AS ingresos
+    FROM dbo.ventas
+    GROUP BY fecha;
+GO
+
+CREATE UNIQUE CLUSTERED INDEX UX_resumen_ventas_diarias ON dbo.resumen_ventas_diarias (fecha);
+GO
+
+CREATE VIEW dbo.resumen_pedidos_diarios WITH SCHEMABINDING AS
+    SELECT fecha, COUNT_BIG(*) AS pedidos, SUM(ISNULL(total, 0)) AS monto
+    FROM dbo.pedido
+    GROUP BY fecha;
+GO
+
+CREATE UNIQUE CLUSTERED INDEX UX_resumen_pedidos_diarios ON dbo.resumen_pedidos_diarios (fecha);
+GO
+
+CREATE VIEW dbo.resumen_unidades_producto WITH SCHEMABINDING AS
+    SELECT id_producto, COUNT_BIG(*) AS lineas, SUM(ISNULL(cantidad, 0)) AS unidades
+    FROM dbo.detalle_venta
+    GROUP BY id_producto;
+GO
+
+CREATE UNIQUE CLUSTERED INDEX UX_resumen_unidades_producto ON dbo.resumen_unidades_producto (id_producto);
+CREATE INDEX IX_resumen_unidades_producto_unidades ON dbo.resumen_unidades_producto (unidades DESC);
+GO
+
+CREATE VIEW dbo.resumen_compras_cliente WITH SCHEMABINDING AS
+    SELECT id_cliente, COUNT_BIG(*) AS compras
+    FROM dbo.ventas
+    GROUP BY id_cliente;
+GO
+
+CREATE UNIQUE CLUSTERED INDEX UX_resumen_compras_cliente ON dbo.resumen_compras_cliente (id_cliente);
+CREATE INDEX IX_resumen_compras_cliente_compras ON dbo.resumen_compras_cliente (compras DESC);
+GO
+
+-- Productos con bajo stock: busqueda por indice en lugar de recorrer productos
+CREATE INDEX IX_productos_stock ON productos (stock) INCLUDE (nombre);
+GO
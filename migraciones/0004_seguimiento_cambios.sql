@@ -0,0 +1,64 @@
+-- ============================================================
+-- SEGUIMIENTO DE CAMBIOS PARA LA SINCRONIZACION
+-- ============================================================
+-- Cada terminal veia los cambios de las demas solo con "Actualizar Lista",
+-- que vuelve a leer la tabla entera. Una columna ROWVERSION toma un valor
+-- nuevo y creciente de la base en cada INSERT o UPDATE, venga de donde
+-- venga; la aplicacion recuerda hasta que version esta al dia y cada tanto
+-- pide solo las filas con una version mayor (consultas.cambios_desde).
+-- Los borrados no dejan fila: un trigger anota la clave en "eliminaciones"
+-- con su propia version. Solo hay triggers de DELETE: los INSERT y UPDATE
+-- con OUTPUT de consultas.py no admiten triggers sobre la misma accion.
+-- (Las filas viejas de eliminaciones se pueden borrar pasado un tiempo
+-- prudente; una terminal abierta desde antes vera esos borrados recien
+-- con "Actualizar Lista".)
+
+ALTER TABLE clientes ADD version ROWVERSION;
+ALTER TABLE productos ADD version ROWVERSION;
+ALTER TABLE ventas ADD version ROWVERSION;
+ALTER TABLE pedido ADD version ROWVERSION;
+GO
+
+CREATE INDEX IX_clientes_version ON clientes (version);
+CREATE INDEX IX_productos_version ON productos (version);
+CREATE INDEX IX_ventas_version ON ventas (version);
+CREATE INDEX IX_pedido_version ON pedido (version);
+GO
+
+CREATE TABLE eliminaciones (
+    id_eliminacion BIGINT IDENTITY(1,1) PRIMARY KEY,
+    tabla SYSNAME NOT NULL,
+    clave INT NOT NULL,
+    fecha DATETIME2 NOT NULL DEFAULT SYSDATETIME(),
+    version ROWVERSION
+);
+CREATE INDEX IX_eliminaciones_version ON eliminaciones (version) INCLUDE (tabla, clave);
+GO
+
+CREATE TRIGGER TR_clientes_eliminacion ON clientes AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO eliminaciones (tabla, clave) SELECT 'clientes', id_cliente FROM deleted;
+END;
+GO
+
+CREATE TRIGGER TR_productos_eliminacion ON productos AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO eliminaciones (tabla, clave) SELECT 'productos', id_producto FROM deleted;
+END;
+GO
+
+CREATE TRIGGER TR_ventas_eliminacion ON ventas AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO eliminaciones (tabla, clave) SELECT 'ventas', id_venta FROM deleted;
+END;
+GO
+
+CREATE TRIGGER TR_pedido_eliminacion ON pedido AFTER DELETE AS
+BEGIN
+    SET NOCOUNT ON;
+    INSERT INTO eliminaciones (tabla, clave) SELECT 'pedido', id_pedido FROM deleted;
+END;
+GO
@@ -0,0 +1,17 @@
+-- ============================================================
+-- CLAVES DE LAS OPERACIONES DEL DIARIO LOCAL
+-- ============================================================
+-- Las ventas y pedidos se anotan primero en un diario local de cada
+-- terminal y se envian por lotes (diario_operaciones.py). Cada operacion
+-- lleva una clave unica que se graba aqui en la misma transaccion que la
+-- venta o el pedido; si un lote llega dos veces (la confirmacion se perdio
+-- o el programa se corto antes de anotarla), la clave ya existe y la
+-- operacion no se repite.
+
+CREATE TABLE operaciones_aplicadas (
+    clave CHAR(32) NOT NULL PRIMARY KEY,
+    tipo VARCHAR(10) NOT NULL,
+    id_resultado INT NOT NULL,
+    aplicada DATETIME2 NOT NULL DEFAULT SYSDATETIME()
+);
+GO
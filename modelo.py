@@ -0,0 +1,106 @@
+import sys
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+
+# =========================
+# FILAS TIPADAS
+# =========================
+# Cada fila de clientes, productos, ventas y pedidos se guarda una sola vez,
+# como registro compacto: una tupla con nombres de campo (sin diccionario
+# por fila) con los valores de la base ya tipados: importes en Decimal con
+# dos decimales, fechas como date y claves como int, vengan de SQL Server
+# o de la base SQLite local (que devuelve float y texto).
+#
+# El cache, las tablas y los manejadores trabajan con estos valores; el
+# Treeview solo recibe el texto que se ve (texto()) y nunca se vuelve a
+# leer. Los textos que se repiten en muchas filas (categoria, marca, nombre
+# del cliente en ventas y pedidos) se internan: todas las filas comparten
+# la misma cadena en lugar de una copia cada una.
+
+Cliente = namedtuple("Cliente", "id_cliente nombre apellido dni telefono correo direccion")
+Producto = namedtuple("Producto", "id_producto nombre categoria marca precio stock")
+Venta = namedtuple("Venta", "id_venta cliente fecha total")
+Pedido = namedtuple("Pedido", "id_pedido fecha total cliente")
+
+CENTAVO = Decimal("0.01")
+
+
+def _internar(valor):
+    return sys.intern(valor) if isinstance(valor, str) else valor
+
+def _dinero(valor):
+    # SQL Server ya entrega DECIMAL(10,2); SQLite lo devuelve como float
+    if valor is None or isinstance(valor, Decimal):
+        return valor
+    return Decimal(str(valor)).quantize(CENTAVO)
+
+def _fecha(valor):
+    # Columnas DATE; SQLite las devuelve como texto, a veces con la hora
+    if isinstance(valor, str):
+        return date.fromisoformat(valor[:10])
+    if isinstance(valor, datetime):
+        return valor.date()
+    return valor
+
+# Conversion de cada columna (None: se guarda tal cual)
+MODELOS = {
+    "clientes": (Cliente, (None, None, None, None, None, None, None)),
+    "productos": (Producto, (None, None, _internar, _internar, _dinero, None)),
+    "ventas": (Venta, (None, _internar, _fecha, _dinero)),
+    "pedidos": (Pedido, (None, _fecha, _dinero, _internar)),
+}
+
+
+def _conversor(modelo, conversiones):
+    crear = modelo._make
+    columnas = [(indice, convertir) for indice, convertir in enumerate(conversiones) if convertir is not None]
+    if not columnas:
+        return crear
+
+    def convertir_fila(fila):
+        valores = list(fila)
+        for indice, convertir in columnas:
+            valores[indice] = convertir(valores[indice])
+        return crear(valores)
+    return convertir_fila
+
+CONVERSORES = {entidad: _conversor(*definicion) for entidad, definicion in MODELOS.items()}
+
+def registro(entidad, fila):
+    # Fila de la base (pyodbc.Row, tupla) -> registro tipado; None sigue None
+    return None if fila is None else CONVERSORES[entidad](fila)
+
+def registros(entidad, filas):
+    return list(map(CONVERSORES[entidad], filas))
+
+
+# -------------------------
+# TEXTO PARA MOSTRAR
+# -------------------------
+def texto(valor):
+    if valor is None:
+        return ""
+    if isinstance(valor, Decimal):
+        return f"S/.{valor:.2f}"
+    if isinstance(valor, datetime):
+        return valor.strftime("%Y-%m-%d %H:%M")
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+# -------------------------
+# REGISTROS DE LOS INDICES
+# -------------------------
+# (clave, etiqueta del combo, textos por los que se puede buscar) para
+# IndicePrefijos; los usan programa.py y benchmark.py.
+def registro_cliente(fila):
+    # El DNI distingue a dos clientes con el mismo nombre
+    return fila[0], f"{fila[1]} {fila[2]} - DNI {fila[3]}", (fila[1], fila[2], fila[3])
+
+def etiqueta_producto(nombre, precio, stock):
+    return f"{nombre} - S/.{precio:.2f} (Stock: {stock})"
+
+def registro_producto(fila):
+    return fila[0], etiqueta_producto(fila[1], fila[4], fila[5]), (fila[1], fila[3])
@@ -0,0 +1,235 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# =========================
+# POOL DE CONEXIONES
+# =========================
+# Reutiliza conexiones ya autenticadas en lugar de abrir una nueva por
+# cada consulta. Es independiente del driver: recibe una funcion "fabrica"
+# que crea una conexion nueva (pyodbc, sqlite3, etc).
+
+class ErrorPool(Exception):
+    pass
+
+
+class ConexionAgrupada:
+    # Envoltorio que devuelve la conexion al pool al cerrarla, de modo que
+    # el codigo existente (conexion.close()) siga funcionando sin cambios.
+
+    def __init__(self, pool, conexion):
+        self._pool = pool
+        self._conexion = conexion
+        self._devuelta = False
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def cursor(self):
+        return self._conexion.cursor()
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def close(self):
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.devolver(self._conexion)
+
+    def descartar(self):
+        # Para conexiones que quedaron en mal estado (error de red, etc)
+        if not self._devuelta:
+            self._devuelta = True
+            self._pool.devolver(self._conexion, descartar=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            try:
+                self._conexion.rollback()
+            except Exception:
+                self.descartar()
+                return False
+        self.close()
+        return False
+
+
+class PoolConexiones:
+    def __init__(self, fabrica, tamano_maximo=5, tiempo_espera=10.0,
+                 tiempo_inactividad=300.0, intervalo_verificacion=30.0,
+                 consulta_salud="SELECT 1"):
+        self._fabrica = fabrica
+        self.tamano_maximo = tamano_maximo
+        self.tiempo_espera = tiempo_espera
+        self.tiempo_inactividad = tiempo_inactividad
+        self.intervalo_verificacion = intervalo_verificacion
+        self.consulta_salud = consulta_salud
+
+        self._libres = deque()  # (conexion, momento_de_devolucion)
+        self._en_uso = 0
+        self._cerrado = False
+        self._condicion = threading.Condition()
+
+        self._solicitudes = 0
+        self._aciertos = 0
+        self._creadas = 0
+        self._descartadas = 0
+        self._expulsadas = 0
+        self._esperas = 0
+        self._tiempo_espera_total = 0.0
+
+    # -------------------------
+    # CHECKOUT / DEVOLUCIÓN
+    # -------------------------
+    def obtener(self):
+        inicio = time.monotonic()
+        limite = inicio + self.tiempo_espera
+        with self._condicion:
+            if self._cerrado:
+                raise ErrorPool("El pool de conexiones está cerrado")
+            self._solicitudes += 1
+            self._expulsar_inactivas()
+            esperado = False
+            while True:
+                if self._libres:
+                    conexion, devuelta_en = self._libres.pop()
+                    self._en_uso += 1
+                    break
+                if self._en_uso < self.tamano_maximo:
+                    conexion, devuelta_en = None, None
+                    self._en_uso += 1
+                    break
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    raise ErrorPool(
+                        f"No hay conexiones libres (máximo {self.tamano_maximo}) "
+                        f"tras esperar {self.tiempo_espera:g} s"
+                    )
+                if not esperado:
+                    esperado = True
+                    self._esperas += 1
+                self._condicion.wait(restante)
+            if esperado:
+                self._tiempo_espera_total += time.monotonic() - inicio
+
+        # La creacion y la verificacion de salud se hacen fuera del candado
+        # para no bloquear a otros hilos durante el viaje de red.
+        try:
+            if conexion is not None:
+                if self._verificar(conexion, devuelta_en):
+                    with self._condicion:
+                        self._aciertos += 1
+                    return ConexionAgrupada(self, conexion)
+                self._cerrar_silencioso(conexion)
+                with self._condicion:
+                    self._descartadas += 1
+            conexion = self._fabrica()
+            with self._condicion:
+                self._creadas += 1
+            return ConexionAgrupada(self, conexion)
+        except Exception:
+            with self._condicion:
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+    def devolver(self, conexion, descartar=False):
+        if not descartar:
+            try:
+                # Deja la conexion sin transacciones abiertas para el siguiente uso
+                conexion.rollback()
+            except Exception:
+                descartar = True
+        with self._condicion:
+            self._en_uso -= 1
+            if descartar:
+                self._descartadas += 1
+            cerrar = descartar or self._cerrado
+            if not cerrar:
+                self._libres.append((conexion, time.monotonic()))
+            self._condicion.notify()
+        if cerrar:
+            self._cerrar_silencioso(conexion)
+
+    @contextmanager
+    def conexion(self):
+        with self.obtener() as conexion:
+            yield conexion
+
+    # -------------------------
+    # SALUD E INACTIVIDAD
+    # -------------------------
+    def _verificar(self, conexion, devuelta_en):
+        # Solo se verifica si la conexion estuvo quieta un buen rato; una
+        # conexion usada hace milisegundos no necesita un viaje extra.
+        if time.monotonic() - devuelta_en < self.intervalo_verificacion:
+            return True
+        try:
+            cursor = conexion.cursor()
+            cursor.execute(self.consulta_salud)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _expulsar_inactivas(self):
+        # Llamar con el candado tomado. Las mas antiguas quedan a la izquierda.
+        ahora = time.monotonic()
+        while self._libres and ahora - self._libres[0][1] > self.tiempo_inactividad:
+            conexion, _ = self._libres.popleft()
+            self._expulsadas += 1
+            self._cerrar_silencioso(conexion)
+
+    def purgar_inactivas(self):
+        with self._condicion:
+            self._expulsar_inactivas()
+
+    def cerrar(self):
+        with self._condicion:
+            self._cerrado = True
+            libres = list(self._libres)
+            self._libres.clear()
+            self._condicion.notify_all()
+        for conexion, _ in libres:
+            self._cerrar_silencioso(conexion)
+
+    @staticmethod
+    def _cerrar_silencioso(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    # -------------------------
+    # ESTADÍSTICAS
+    # -------------------------
+    def estadisticas(self):
+        with self._condicion:
+            reutilizadas = self._aciertos
+            return {
+                "solicitudes": self._solicitudes,
+                "aciertos": reutilizadas,
+                "tasa_aciertos": reutilizadas / self._solicitudes if self._solicitudes else 0.0,
+                "creadas": self._creadas,
+                "descartadas": self._descartadas,
+                "expulsadas": self._expulsadas,
+                "esperas": self._esperas,
+                "tiempo_espera_total": self._tiempo_espera_total,
+                "en_uso": self._en_uso,
+                "libres": len(self._libres),
+                "tamano_maximo": self.tamano_maximo,
+            }
+
+    def resumen(self):
+        datos = self.estadisticas()
+        return (f"Pool BD: {datos['tasa_aciertos']:.0%} reutilizadas "
+                f"({datos['aciertos']}/{datos['solicitudes']}), "
+                f"{datos['creadas']} creadas, {datos['en_uso']} en uso, "
+                f"{datos['libres']} libres")
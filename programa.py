@@ -1,20 +1,111 @@
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-import pyodbc
+from tkinter import ttk, messagebox, filedialog
 from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from pool_conexiones import PoolConexiones
+from segundo_plano import EjecutorTk
+from tabla_virtual import TablaVirtual
+from cache_referencia import CacheReferencia
+from indice_prefijos import IndicePrefijos
+from combo_busqueda import ComboBusqueda
+from reporte import MotorReporte
+from tiendas_multiples import ReporteTiendas
+import tiendas_multiples
+import instrumentacion
+import instantanea
+import diario_operaciones
+import consultas
+import migraciones
+import importacion
+import exportacion
+from consultas import ErrorNegocio, ErrorStock
+from diario_operaciones import DiarioOperaciones
+from modelo import registro_cliente, registro_producto
+from validacion import cliente_desde_campos, producto_desde_campos
+
+# Momento de arranque, para medir cuanto tarda la ventana en ser usable
+INICIO_PROGRAMA = time.perf_counter()
 
 # =========================
 # CONEXIÓN A SQL SERVER
 # =========================
-def conectar_bd():
-    try:
-        conexion = pyodbc.connect(
-            'DRIVER={SQL Server};SERVER=localhost;DATABASE=tiendas;Trusted_Connection=yes;'
-        )
-        return conexion
-    except Exception as e:
-        messagebox.showerror("Error", f"No se pudo conectar a la base de datos:\n{e}")
-        return None
+CADENA_CONEXION = 'DRIVER={SQL Server};SERVER=localhost;DATABASE=tiendas;Trusted_Connection=yes;'
+
+# Con tiendas.json cada tienda usa su propia base; sin el, CADENA_CONEXION
+TIENDA_LOCAL, ORIGENES_TIENDAS = tiendas_multiples.cargar_configuracion(CADENA_CONEXION)
+
+# Tiempos de cada consulta; las que superan el umbral van al archivo
+UMBRAL_CONSULTA_LENTA_MS = 200
+ARCHIVO_CONSULTAS_LENTAS = "consultas_lentas.log"
+metricas = instrumentacion.Metricas(umbral_lenta_ms=UMBRAL_CONSULTA_LENTA_MS)
+instrumentacion.registrar_lentas_en(ARCHIVO_CONSULTAS_LENTAS)
+
+# Todas las funciones piden la conexion al pool; al cerrarla vuelve al pool
+# en lugar de cerrarse, asi no se repite el login en cada clic.
+pool = PoolConexiones(instrumentacion.medir_fabrica(
+    tiendas_multiples.fabrica_conexion(ORIGENES_TIENDAS[TIENDA_LOCAL]), metricas), tamano_maximo=5)
+
+# Reporte general: partes en paralelo y resultado guardado un minuto
+motor_reporte = MotorReporte(pool, vigencia=60.0, metricas=metricas)
+
+# Reporte de todas las tiendas; la local reutiliza el pool de arriba
+reporte_tiendas = ReporteTiendas(ORIGENES_TIENDAS, local=TIENDA_LOCAL, pool_local=pool)
+
+# Clientes y productos en memoria: alimentan sus tablas y los combos
+cache = CacheReferencia()
+
+# Indices para buscar clientes y productos mientras se escribe en los combos
+indice_clientes = IndicePrefijos()
+indice_productos = IndicePrefijos()
+
+def ejecutar_bd(funcion, *args, al_terminar=None, al_progreso=None, clave=None,
+                mensaje_error="Error en la base de datos", al_fallar=None):
+    # Ejecuta funcion(conexion, *args) en un hilo de fondo con una conexion
+    # del pool; al_terminar recibe el resultado ya en el hilo de Tk. Con
+    # al_progreso la funcion recibe notificar=... para resultados parciales.
+    # Sin al_fallar, los errores se muestran en un cuadro de mensaje.
+    def tarea(**kwargs):
+        with metricas.operacion(funcion.__name__), pool.conexion() as conexion:
+            return funcion(conexion, *args, **kwargs)
+
+    def mostrar_error(e):
+        if isinstance(e, ErrorStock):
+            # El stock que mostraba la ventana estaba desactualizado
+            for producto in e.productos:
+                cache.guardar("productos", producto)
+        if isinstance(e, ErrorNegocio):
+            messagebox.showwarning("Advertencia", str(e))
+        else:
+            messagebox.showerror("Error", f"{mensaje_error}:\n{e}")
+
+    return ejecutor.enviar(tarea, al_terminar=al_terminar, al_fallar=al_fallar or mostrar_error,
+                           al_progreso=al_progreso, clave=clave)
+
+def fuente_bd(nombre, contar, paginar):
+    # Funciones de carga para una TablaVirtual: el total y cada pagina se
+    # consultan en segundo plano; una pagina nueva reemplaza a la anterior
+    # si el usuario sigue desplazandose antes de que llegue.
+    def obtener_total(entregar):
+        ejecutar_bd(contar, al_terminar=entregar, clave=f"total_{nombre}",
+                    mensaje_error=f"Error al cargar {nombre}")
+
+    def obtener_pagina(desde, cantidad, entregar):
+        ejecutar_bd(paginar, desde, cantidad, al_terminar=entregar, clave=f"pagina_{nombre}",
+                    mensaje_error=f"Error al cargar {nombre}")
+
+    return obtener_total, obtener_pagina
+
+def fuente_cache(entidad, almacen=cache):
+    # Igual que fuente_bd, pero servida desde el cache de referencia (o
+    # desde las listas completas de ventas y pedidos), en su orden actual
+    def obtener_total(entregar):
+        entregar(almacen.total(entidad))
+
+    def obtener_pagina(desde, cantidad, entregar):
+        entregar(almacen.pagina(entidad, desde, cantidad))
+
+    return obtener_total, obtener_pagina
 
 # =========================
 # FUNCIONES CRUD MEJORADAS
@@ -22,179 +113,109 @@ def conectar_bd():
 
 # CLIENTES
 def cargar_clientes():
-    try:
-        for fila in tabla_clientes.get_children():
-            tabla_clientes.delete(fila)
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_cliente, nombre, apellido, dni, telefono, correo, direccion FROM clientes")
-            for fila in cursor.fetchall():
-                # Asegurar que todos los valores sean strings
-                fila_convertida = [str(valor) if valor is not None else "" for valor in fila]
-                tabla_clientes.insert("", tk.END, values=fila_convertida)
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar clientes:\n{e}")
+    ejecutar_bd(consultas.listar_clientes, clave="clientes", al_progreso=recibir_bloque,
+                mensaje_error="Error al cargar clientes")
+
+def datos_formulario_cliente():
+    # Mismas reglas que la importacion masiva; lanza ErrorNegocio si algo falta
+    return cliente_desde_campos(entry_nombre.get(), entry_apellido.get(), entry_dni.get(),
+                                entry_telefono.get(), entry_correo.get(), entry_direccion.get())
+
+def nombre_cliente(id_cliente):
+    # Nombre como lo muestran ventas y pedidos
+    fila = cache.obtener("clientes", id_cliente)
+    return f"{fila[1]} {fila[2]}" if fila is not None else "Sin cliente"
+
+def al_cambiar_cliente(anterior, nueva):
+    # Refleja un alta (solo nueva), modificacion (ambas) o baja (solo
+    # anterior) del cache en la tabla y en el indice de los combos, tocando
+    # unicamente esa fila. Sin ninguna de las dos es una recarga completa.
+    if anterior is None and nueva is None:
+        tabla_clientes.recargar()
+        cargar_clientes_combo()
+        return
+    if nueva is None:
+        tabla_clientes.eliminar_fila(anterior[0])
+        indice_clientes.quitar(anterior[0])
+    else:
+        if anterior is None:
+            tabla_clientes.insertar_fila(nueva, cache.posicion("clientes", nueva[0]))
+        else:
+            reflejar_cambio(tabla_clientes, "clientes", anterior, nueva)
+        indice_clientes.guardar(*registro_cliente(nueva))
+    combo_cliente_venta.filtrar()
+    combo_cliente_pedido.filtrar()
 
 def agregar_cliente():
     try:
         # Validaciones
-        if not all([entry_nombre.get(), entry_apellido.get(), entry_dni.get()]):
-            messagebox.showwarning("Advertencia", "Nombre, Apellido y DNI son obligatorios")
-            return
-        
-        if len(entry_dni.get()) != 8 or not entry_dni.get().isdigit():
-            messagebox.showwarning("Advertencia", "El DNI debe tener 8 dígitos numéricos")
+        try:
+            cliente = datos_formulario_cliente()
+        except ErrorNegocio as e:
+            messagebox.showwarning("Advertencia", str(e))
             return
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                # Verificar si el DNI ya existe
-                cursor.execute("SELECT id_cliente FROM clientes WHERE dni = ?", (entry_dni.get(),))
-                if cursor.fetchone():
-                    messagebox.showwarning("Advertencia", "Ya existe un cliente con este DNI")
-                    return
-                
-                cursor.execute("""
-                    INSERT INTO clientes (nombre, apellido, dni, telefono, correo, direccion)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (
-                    entry_nombre.get().strip().title(),
-                    entry_apellido.get().strip().title(),
-                    entry_dni.get(),
-                    entry_telefono.get() or None,
-                    entry_correo.get().lower() or None,
-                    entry_direccion.get() or None
-                ))
-                conexion.commit()
-                messagebox.showinfo("Éxito", "Cliente agregado correctamente.")
-                limpiar_campos_cliente()
-                cargar_clientes()
-                cargar_clientes_combo()
-                cargar_clientes_pedido_combo()
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo agregar el cliente:\n{e}")
-            finally:
-                conexion.close()
+
+        def al_terminar(fila):
+            messagebox.showinfo("Éxito", "Cliente agregado correctamente.")
+            limpiar_campos_cliente()
+            cache.guardar("clientes", fila)
+
+        ejecutar_bd(consultas.insertar_cliente, cliente, al_terminar=al_terminar,
+                    mensaje_error="No se pudo agregar el cliente")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def actualizar_cliente():
     try:
-        seleccionado = tabla_clientes.focus()
+        seleccionado = tabla_clientes.fila_seleccionada()
         if not seleccionado:
             messagebox.showwarning("Atención", "Selecciona un cliente para actualizar.")
             return
-        
-        if not all([entry_nombre.get(), entry_apellido.get(), entry_dni.get()]):
-            messagebox.showwarning("Advertencia", "Nombre, Apellido y DNI son obligatorios")
+
+        try:
+            cliente = datos_formulario_cliente()
+        except ErrorNegocio as e:
+            messagebox.showwarning("Advertencia", str(e))
             return
-        
-        id_cliente = tabla_clientes.item(seleccionado)['values'][0]
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                # Verificar si el DNI ya existe en otro cliente
-                cursor.execute("SELECT id_cliente FROM clientes WHERE dni = ? AND id_cliente != ?", 
-                              (entry_dni.get(), int(id_cliente)))
-                if cursor.fetchone():
-                    messagebox.showwarning("Advertencia", "Ya existe otro cliente con este DNI")
-                    return
-                
-                cursor.execute("""
-                    UPDATE clientes 
-                    SET nombre=?, apellido=?, dni=?, telefono=?, correo=?, direccion=?
-                    WHERE id_cliente=?
-                """, (
-                    entry_nombre.get().strip().title(),
-                    entry_apellido.get().strip().title(),
-                    entry_dni.get(),
-                    entry_telefono.get() or None,
-                    entry_correo.get().lower() or None,
-                    entry_direccion.get() or None,
-                    int(id_cliente)
-                ))
-                conexion.commit()
-                messagebox.showinfo("Éxito", "Cliente actualizado correctamente.")
-                limpiar_campos_cliente()
-                cargar_clientes()
-                cargar_clientes_combo()
-                cargar_clientes_pedido_combo()
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo actualizar el cliente:\n{e}")
-            finally:
-                conexion.close()
+
+        def al_terminar(fila):
+            messagebox.showinfo("Éxito", "Cliente actualizado correctamente.")
+            limpiar_campos_cliente()
+            cache.guardar("clientes", fila)
+
+        ejecutar_bd(consultas.actualizar_cliente, seleccionado.id_cliente, cliente,
+                    al_terminar=al_terminar, mensaje_error="No se pudo actualizar el cliente")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def eliminar_cliente():
     try:
-        seleccionado = tabla_clientes.focus()
+        seleccionado = tabla_clientes.fila_seleccionada()
         if not seleccionado:
             messagebox.showwarning("Atención", "Selecciona un cliente para eliminar.")
             return
-        
+
         if messagebox.askyesno("Confirmar", "¿Estás seguro de eliminar este cliente?"):
-            id_cliente = tabla_clientes.item(seleccionado)['values'][0]
-            conexion = conectar_bd()
-            if conexion:
-                cursor = conexion.cursor()
-                try:
-                    # Verificar si el cliente tiene ventas relacionadas
-                    cursor.execute("SELECT COUNT(*) FROM ventas WHERE id_cliente = ?", (int(id_cliente),))
-                    if cursor.fetchone()[0] > 0:
-                        messagebox.showwarning("Error", "No se puede eliminar el cliente porque tiene ventas registradas.")
-                        return
-                    
-                    # Verificar si el cliente tiene pedidos relacionados
-                    cursor.execute("SELECT COUNT(*) FROM clienPedido WHERE id_cliente = ?", (int(id_cliente),))
-                    if cursor.fetchone()[0] > 0:
-                        # Eliminar primero las relaciones en clienPedido
-                        cursor.execute("DELETE FROM clienPedido WHERE id_cliente = ?", (int(id_cliente),))
-                    
-                    # Verificar si el cliente tiene registros en clienXproducto
-                    cursor.execute("SELECT COUNT(*) FROM clienXproducto WHERE id_cliente = ?", (int(id_cliente),))
-                    if cursor.fetchone()[0] > 0:
-                        # Eliminar primero las relaciones en clienXproducto
-                        cursor.execute("DELETE FROM clienXproducto WHERE id_cliente = ?", (int(id_cliente),))
-                    
-                    # Ahora eliminar el cliente
-                    cursor.execute("DELETE FROM clientes WHERE id_cliente = ?", (int(id_cliente),))
-                    conexion.commit()
-                    messagebox.showinfo("Éxito", "Cliente eliminado correctamente.")
-                    cargar_clientes()
-                    cargar_clientes_combo()
-                    cargar_clientes_pedido_combo()
-                    
-                except Exception as e:
-                    conexion.rollback()
-                    if 'FK_' in str(e):
-                        messagebox.showerror("Error", 
-                            "No se puede eliminar el cliente porque tiene registros relacionados.\n"
-                            "Elimine primero los registros relacionados en otras tablas.")
-                    else:
-                        messagebox.showerror("Error", f"No se pudo eliminar el cliente:\n{str(e)}")
-                finally:
-                    conexion.close()
+            def al_terminar(_):
+                messagebox.showinfo("Éxito", "Cliente eliminado correctamente.")
+                cache.quitar("clientes", seleccionado.id_cliente)
+
+            ejecutar_bd(consultas.eliminar_cliente, seleccionado.id_cliente, al_terminar=al_terminar,
+                        mensaje_error="No se pudo eliminar el cliente")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def cargar_cliente_seleccionado(event):
     try:
-        seleccionado = tabla_clientes.focus()
+        seleccionado = tabla_clientes.fila_seleccionada()
         if seleccionado:
-            datos = tabla_clientes.item(seleccionado)['values']
             limpiar_campos_cliente()
-            entry_nombre.insert(0, datos[1])
-            entry_apellido.insert(0, datos[2])
-            entry_dni.insert(0, datos[3])
-            entry_telefono.insert(0, datos[4] if datos[4] else "")
-            entry_correo.insert(0, datos[5] if datos[5] else "")
-            entry_direccion.insert(0, datos[6] if datos[6] else "")
+            entry_nombre.insert(0, seleccionado.nombre)
+            entry_apellido.insert(0, seleccionado.apellido)
+            entry_dni.insert(0, seleccionado.dni)
+            entry_telefono.insert(0, seleccionado.telefono or "")
+            entry_correo.insert(0, seleccionado.correo or "")
+            entry_direccion.insert(0, seleccionado.direccion or "")
     except Exception as e:
         messagebox.showerror("Error", f"Error al cargar cliente seleccionado:\n{e}")
 
@@ -208,174 +229,100 @@ def limpiar_campos_cliente():
 
 # PRODUCTOS
 def cargar_productos():
-    try:
-        for fila in tabla_productos.get_children():
-            tabla_productos.delete(fila)
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_producto, nombre, categoria, marca, precio, stock FROM productos")
-            for fila in cursor.fetchall():
-                # Convertir todos los valores a strings
-                fila_convertida = [str(valor) if valor is not None else "" for valor in fila]
-                tabla_productos.insert("", tk.END, values=fila_convertida)
-            conexion.close()
+    ejecutar_bd(consultas.listar_productos, clave="productos", al_progreso=recibir_bloque,
+                mensaje_error="Error al cargar productos")
+
+def al_cambiar_producto(anterior, nueva):
+    # Igual que al_cambiar_cliente, para la tabla y el combo de productos
+    if anterior is None and nueva is None:
+        tabla_productos.recargar()
         cargar_productos_pedido_combo()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar productos:\n{e}")
+        return
+    if nueva is None:
+        tabla_productos.eliminar_fila(anterior[0])
+        indice_productos.quitar(anterior[0])
+    else:
+        if anterior is None:
+            tabla_productos.insertar_fila(nueva, cache.posicion("productos", nueva[0]))
+        else:
+            reflejar_cambio(tabla_productos, "productos", anterior, nueva)
+        indice_productos.guardar(*registro_producto(nueva))
+    combo_producto_pedido.filtrar()
+
+def datos_formulario_producto():
+    # Mismas reglas que la importacion masiva; lanza ErrorNegocio si algo falta
+    return producto_desde_campos(entry_prod_nombre.get(), entry_prod_categoria.get(),
+                                 entry_prod_marca.get(), entry_prod_precio.get(),
+                                 entry_prod_stock.get())
 
 def agregar_producto():
     try:
-        if not all([entry_prod_nombre.get(), entry_prod_precio.get()]):
-            messagebox.showwarning("Advertencia", "Nombre y Precio son obligatorios")
-            return
-        
         try:
-            precio = float(entry_prod_precio.get())
-            stock = int(entry_prod_stock.get() or 0)
-            if precio <= 0:
-                messagebox.showwarning("Advertencia", "El precio debe ser mayor a 0")
-                return
-            if stock < 0:
-                messagebox.showwarning("Advertencia", "El stock no puede ser negativo")
-                return
-        except ValueError:
-            messagebox.showwarning("Advertencia", "Precio y Stock deben ser valores numéricos")
+            producto = datos_formulario_producto()
+        except ErrorNegocio as e:
+            messagebox.showwarning("Advertencia", str(e))
             return
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                cursor.execute("""
-                    INSERT INTO productos (nombre, categoria, marca, precio, stock)
-                    VALUES (?, ?, ?, ?, ?)
-                """, (
-                    entry_prod_nombre.get().strip(),
-                    entry_prod_categoria.get().strip() or "General",
-                    entry_prod_marca.get().strip() or "Sin marca",
-                    precio,
-                    stock
-                ))
-                conexion.commit()
-                messagebox.showinfo("Éxito", "Producto agregado correctamente.")
-                limpiar_campos_producto()
-                cargar_productos()
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo agregar el producto:\n{e}")
-            finally:
-                conexion.close()
+
+        def al_terminar(fila):
+            messagebox.showinfo("Éxito", "Producto agregado correctamente.")
+            limpiar_campos_producto()
+            cache.guardar("productos", fila)
+
+        ejecutar_bd(consultas.insertar_producto, producto,
+                    al_terminar=al_terminar, mensaje_error="No se pudo agregar el producto")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def actualizar_producto():
     try:
-        seleccionado = tabla_productos.focus()
+        seleccionado = tabla_productos.fila_seleccionada()
         if not seleccionado:
             messagebox.showwarning("Atención", "Selecciona un producto para actualizar.")
             return
-        
-        if not all([entry_prod_nombre.get(), entry_prod_precio.get()]):
-            messagebox.showwarning("Advertencia", "Nombre y Precio son obligatorios")
-            return
-        
-        id_producto = tabla_productos.item(seleccionado)['values'][0]
-        
+
         try:
-            precio = float(entry_prod_precio.get())
-            stock = int(entry_prod_stock.get() or 0)
-        except ValueError:
-            messagebox.showwarning("Advertencia", "Precio y Stock deben ser valores numéricos")
+            producto = datos_formulario_producto()
+        except ErrorNegocio as e:
+            messagebox.showwarning("Advertencia", str(e))
             return
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                cursor.execute("""
-                    UPDATE productos 
-                    SET nombre=?, categoria=?, marca=?, precio=?, stock=?
-                    WHERE id_producto=?
-                """, (
-                    entry_prod_nombre.get().strip(),
-                    entry_prod_categoria.get().strip() or "General",
-                    entry_prod_marca.get().strip() or "Sin marca",
-                    precio,
-                    stock,
-                    int(id_producto)
-                ))
-                conexion.commit()
-                messagebox.showinfo("Éxito", "Producto actualizado correctamente.")
-                limpiar_campos_producto()
-                cargar_productos()
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo actualizar el producto:\n{e}")
-            finally:
-                conexion.close()
+
+        def al_terminar(fila):
+            messagebox.showinfo("Éxito", "Producto actualizado correctamente.")
+            limpiar_campos_producto()
+            cache.guardar("productos", fila)
+
+        ejecutar_bd(consultas.actualizar_producto, seleccionado.id_producto, producto,
+                    al_terminar=al_terminar, mensaje_error="No se pudo actualizar el producto")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def eliminar_producto():
     try:
-        seleccionado = tabla_productos.focus()
+        seleccionado = tabla_productos.fila_seleccionada()
         if not seleccionado:
             messagebox.showwarning("Atención", "Selecciona un producto para eliminar.")
             return
-        
+
         if messagebox.askyesno("Confirmar", "¿Estás seguro de eliminar este producto?"):
-            id_producto = tabla_productos.item(seleccionado)['values'][0]
-            conexion = conectar_bd()
-            if conexion:
-                cursor = conexion.cursor()
-                try:
-                    # Verificar si el producto tiene ventas relacionadas en detalle_venta
-                    cursor.execute("SELECT COUNT(*) FROM detalle_venta WHERE id_producto = ?", (int(id_producto),))
-                    if cursor.fetchone()[0] > 0:
-                        messagebox.showwarning("Error", "No se puede eliminar el producto porque tiene ventas registradas.")
-                        return
-                    
-                    # Verificar si el producto tiene registros en productoXpresentacion
-                    cursor.execute("SELECT COUNT(*) FROM productoXpresentacion WHERE id_producto = ?", (int(id_producto),))
-                    if cursor.fetchone()[0] > 0:
-                        # Eliminar primero las relaciones en productoXpresentacion
-                        cursor.execute("DELETE FROM productoXpresentacion WHERE id_producto = ?", (int(id_producto),))
-                    
-                    # Verificar si el producto tiene registros en clienXproducto
-                    cursor.execute("SELECT COUNT(*) FROM clienXproducto WHERE id_producto = ?", (int(id_producto),))
-                    if cursor.fetchone()[0] > 0:
-                        # Eliminar primero las relaciones en clienXproducto
-                        cursor.execute("DELETE FROM clienXproducto WHERE id_producto = ?", (int(id_producto),))
-                    
-                    # Ahora eliminar el producto
-                    cursor.execute("DELETE FROM productos WHERE id_producto = ?", (int(id_producto),))
-                    conexion.commit()
-                    messagebox.showinfo("Éxito", "Producto eliminado correctamente.")
-                    cargar_productos()
-                    
-                except Exception as e:
-                    conexion.rollback()
-                    if 'FK_' in str(e):
-                        messagebox.showerror("Error", 
-                            "No se puede eliminar el producto porque tiene registros relacionados.\n"
-                            "Elimine primero los registros relacionados en otras tablas.")
-                    else:
-                        messagebox.showerror("Error", f"No se pudo eliminar el producto:\n{str(e)}")
-                finally:
-                    conexion.close()
+            def al_terminar(_):
+                messagebox.showinfo("Éxito", "Producto eliminado correctamente.")
+                cache.quitar("productos", seleccionado.id_producto)
+
+            ejecutar_bd(consultas.eliminar_producto, seleccionado.id_producto, al_terminar=al_terminar,
+                        mensaje_error="No se pudo eliminar el producto")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def cargar_producto_seleccionado(event):
     try:
-        seleccionado = tabla_productos.focus()
+        seleccionado = tabla_productos.fila_seleccionada()
         if seleccionado:
-            datos = tabla_productos.item(seleccionado)['values']
             limpiar_campos_producto()
-            entry_prod_nombre.insert(0, datos[1])
-            entry_prod_categoria.insert(0, datos[2] if datos[2] else "")
-            entry_prod_marca.insert(0, datos[3] if datos[3] else "")
-            entry_prod_precio.insert(0, datos[4] if datos[4] else "")
-            entry_prod_stock.insert(0, datos[5] if datos[5] else "")
+            entry_prod_nombre.insert(0, seleccionado.nombre)
+            entry_prod_categoria.insert(0, seleccionado.categoria or "")
+            entry_prod_marca.insert(0, seleccionado.marca or "")
+            entry_prod_precio.insert(0, f"{seleccionado.precio:.2f}" if seleccionado.precio is not None else "")
+            entry_prod_stock.insert(0, str(seleccionado.stock) if seleccionado.stock is not None else "")
     except Exception as e:
         messagebox.showerror("Error", f"Error al cargar producto seleccionado:\n{e}")
 
@@ -388,82 +335,43 @@ def limpiar_campos_producto():
 
 # VENTAS
 def cargar_ventas():
-    try:
-        for fila in tabla_ventas.get_children():
-            tabla_ventas.delete(fila)
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("""
-                SELECT v.id_venta, 
-                       COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente, 
-                       v.fecha, v.total 
-                FROM ventas v 
-                LEFT JOIN clientes c ON v.id_cliente = c.id_cliente
-                ORDER BY v.fecha DESC
-            """)
-            for fila in cursor.fetchall():
-                fila_convertida = [str(valor) if valor is not None else "" for valor in fila]
-                tabla_ventas.insert("", tk.END, values=fila_convertida)
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar ventas:\n{e}")
+    recargar_lista("ventas", tabla_ventas)
 
 def crear_venta():
     try:
         if not combo_cliente_venta.get() or not entry_venta_total.get():
             messagebox.showwarning("Advertencia", "Cliente y Total son obligatorios")
             return
-        
-        try:
-            total = float(entry_venta_total.get())
-            if total <= 0:
-                messagebox.showwarning("Advertencia", "El total debe ser mayor a 0")
+        id_cliente = None
+        if combo_cliente_venta.get() != "Sin cliente":
+            id_cliente = combo_cliente_venta.clave()
+            if id_cliente is None:
+                messagebox.showwarning("Advertencia", "Elige un cliente de la lista")
                 return
-        except ValueError:
+
+        # Decimal: el importe se guarda tal como se escribio, sin redondeos de float
+        try:
+            total = Decimal(entry_venta_total.get().strip())
+        except InvalidOperation:
             messagebox.showwarning("Advertencia", "El total debe ser un valor numérico")
             return
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                # Obtener ID del cliente seleccionado
-                cliente_nombre = combo_cliente_venta.get()
-                id_cliente = None
-                if cliente_nombre != "Sin cliente":
-                    cursor.execute("SELECT id_cliente FROM clientes WHERE nombre + ' ' + apellido = ?", (cliente_nombre,))
-                    resultado = cursor.fetchone()
-                    if resultado:
-                        id_cliente = resultado[0]
-                
-                cursor.execute("""
-                    INSERT INTO ventas (id_cliente, fecha, total)
-                    VALUES (?, GETDATE(), ?)
-                """, (id_cliente, total))
-                conexion.commit()
-                messagebox.showinfo("Éxito", "Venta registrada correctamente.")
-                limpiar_campos_venta()
-                cargar_ventas()
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo registrar la venta:\n{e}")
-            finally:
-                conexion.close()
+        if not total.is_finite() or total <= 0:
+            messagebox.showwarning("Advertencia", "El total debe ser mayor a 0")
+            return
+
+        # Queda en el diario local; la fila aparece en la tabla al llegar a la base
+        diario.agregar_venta(id_cliente, nombre_cliente(id_cliente), total)
+        messagebox.showinfo("Éxito", "Venta anotada. Se confirmará al llegar a la base.")
+        limpiar_campos_venta()
+        reenviar_diario()
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def cargar_clientes_combo():
-    try:
-        combo_cliente_venta['values'] = []
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT nombre, apellido FROM clientes ORDER BY nombre")
-            clientes = [f"{fila[0]} {fila[1]}" for fila in cursor.fetchall()]
-            combo_cliente_venta['values'] = ["Sin cliente"] + clientes
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar clientes en combo:\n{e}")
+    # Un solo indice alimenta el combo de ventas y el de pedidos
+    indice_clientes.reemplazar(registro_cliente(fila) for fila in cache.clientes.values())
+    combo_cliente_venta.filtrar()
+    combo_cliente_pedido.filtrar()
 
 def limpiar_campos_venta():
     combo_cliente_venta.set("")
@@ -471,54 +379,134 @@ def limpiar_campos_venta():
 
 # PEDIDOS
 def cargar_pedidos():
-    try:
-        for fila in tabla_pedidos.get_children():
-            tabla_pedidos.delete(fila)
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("""
-                SELECT p.id_pedido, p.fecha, p.total, 
-                       COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
-                FROM pedido p
-                LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
-                LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
-                ORDER BY p.fecha DESC
-            """)
-            for fila in cursor.fetchall():
-                fila_convertida = [str(valor) if valor is not None else "" for valor in fila]
-                tabla_pedidos.insert("", tk.END, values=fila_convertida)
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar pedidos:\n{e}")
-
-def cargar_clientes_pedido_combo():
-    try:
-        combo_cliente_pedido['values'] = []
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_cliente, nombre, apellido FROM clientes ORDER BY nombre")
-            clientes = [(f"{fila[1]} {fila[2]}", fila[0]) for fila in cursor.fetchall()]
-            combo_cliente_pedido['values'] = ["Sin cliente"] + [cliente[0] for cliente in clientes]
-            combo_cliente_pedido.clientes_dict = {cliente[0]: cliente[1] for cliente in clientes}
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar clientes en combo pedido:\n{e}")
+    recargar_lista("pedidos", tabla_pedidos)
 
 def cargar_productos_pedido_combo():
-    try:
-        combo_producto_pedido['values'] = []
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            cursor.execute("SELECT id_producto, nombre, precio, stock FROM productos ORDER BY nombre")
-            productos = [(f"{fila[1]} - S/.{fila[2]:.2f} (Stock: {fila[3]})", fila[0], fila[2], fila[3]) for fila in cursor.fetchall()]
-            combo_producto_pedido['values'] = [producto[0] for producto in productos]
-            combo_producto_pedido.productos_dict = {producto[0]: (producto[1], producto[2], producto[3]) for producto in productos}
-            conexion.close()
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al cargar productos en combo pedido:\n{e}")
+    indice_productos.reemplazar(registro_producto(fila) for fila in cache.productos.values())
+    combo_producto_pedido.filtrar()
+
+# ORDEN POR COLUMNA
+# Un clic en un encabezado ordena la tabla por esa columna, en memoria y con
+# los valores originales (importes, fechas, numeros), no con el texto que se
+# ve. Clientes y productos ya estan completos en el cache. Ventas y pedidos
+# se leen por paginas en el orden de la base (los mas recientes primero):
+# al ordenarlos por primera vez se traen completos una sola vez a "listas"
+# y desde alli se ordenan y paginan sin volver a consultar; al volver al
+# orden original se descartan.
+listas = CacheReferencia(("ventas", "pedidos"))
+LISTAR_COMPLETA = {"ventas": consultas.listar_ventas, "pedidos": consultas.listar_pedidos}
+
+def ordenar_referencia(entidad, tabla, orden):
+    cache.ordenar(entidad, orden)
+    tabla.recargar()
+
+def reflejar_cambio(tabla, entidad, anterior, nueva):
+    # Ordenada por una columna, la fila modificada puede cambiar de lugar
+    if cache.orden(entidad) is None:
+        tabla.actualizar_fila(nueva)
+    else:
+        tabla.eliminar_fila(anterior[0])
+        tabla.insertar_fila(nueva, cache.posicion(entidad, nueva[0]))
+
+def ordenar_lista(entidad, tabla, fuente, orden):
+    if orden is None:
+        # Orden original: de nuevo por paginas desde la base
+        ejecutor.cancelar(f"lista_{entidad}")
+        listas.comenzar_carga(entidad)
+        tabla.cambiar_fuente(*fuente)
+    elif listas.cargado[entidad]:
+        listas.ordenar(entidad, orden)
+        tabla.recargar()
+    else:
+        traer_lista(entidad, tabla)
+
+def traer_lista(entidad, tabla):
+    # Una sola consulta, por bloques; al terminar se ordena por la columna
+    # elegida en ese momento
+    def recibir(parcial):
+        _, filas, primero, ultimo = parcial
+        if primero:
+            listas.comenzar_carga(entidad)
+        listas.agregar_bloque(entidad, filas)
+        if not ultimo:
+            estado.config(text=f"📥 Cargando {entidad} para ordenar... {listas.total(entidad):,} filas")
+            return
+        listas.terminar_carga(entidad)
+        if tabla.orden is not None:
+            listas.ordenar(entidad, tabla.orden)
+            tabla.cambiar_fuente(*fuente_cache(entidad, listas))
+        poner_estado(f"✅ {listas.total(entidad):,} {entidad} ordenadas en memoria")
+
+    ejecutar_bd(LISTAR_COMPLETA[entidad], al_progreso=recibir, clave=f"lista_{entidad}",
+                mensaje_error=f"Error al cargar {entidad}")
+
+def recargar_lista(entidad, tabla):
+    if tabla.orden is None:
+        tabla.recargar()
+    else:
+        traer_lista(entidad, tabla)
+
+# IMPORTACION MASIVA
+def importar_csv(entidad):
+    ruta = filedialog.askopenfilename(title=f"Importar {entidad} desde CSV",
+                                      filetypes=[("Archivos CSV", "*.csv"), ("Todos los archivos", "*.*")])
+    if not ruta:
+        return
+    if entidad == "clientes":
+        funcion, recargar = importacion.importar_clientes, cargar_clientes
+    else:
+        funcion, recargar = importacion.importar_productos, cargar_productos
+
+    def al_progreso(avance):
+        leidas, importadas, rechazadas = avance
+        estado.config(text=f"📥 Importando {entidad}: {leidas:,} leídas, "
+                           f"{importadas:,} importadas, {rechazadas:,} rechazadas")
+
+    def al_terminar(resumen):
+        messagebox.showinfo("Importación", f"Importación de {entidad} terminada\n\n{resumen.texto()}")
+        if resumen.importadas:
+            recargar()
+
+    ejecutar_bd(funcion, ruta, al_progreso=al_progreso, al_terminar=al_terminar,
+                clave=f"importar_{entidad}", mensaje_error=f"Error al importar {entidad}")
+
+# CARGA POR BLOQUES
+def recibir_bloque(parcial):
+    # Cada bloque de clientes o productos pasa al cache en cuanto llega; la
+    # tabla muestra las primeras filas sin esperar a las demas.
+    entidad, filas, primero, ultimo = parcial
+    if primero:
+        # Si se ven las filas de la instantanea, siguen a la vista (en gris)
+        # hasta que llega la carga completa y las reemplaza de una vez
+        tabla = tabla_clientes if entidad == "clientes" else tabla_productos
+        cache.comenzar_carga(entidad, conservar=tabla.desactualizada)
+    cache.agregar_bloque(entidad, filas)
+    if ultimo:
+        cache.terminar_carga(entidad)
+        poner_estado(f"✅ {cache.total(entidad):,} {entidad} cargados")
+    else:
+        estado.config(text=f"📥 Cargando {entidad}... {cache.recibidas(entidad):,} filas")
+
+def al_agregar_bloque(entidad, filas):
+    # Los ids llegan en orden: la tabla solo crece al final y el indice de
+    # los combos incorpora el bloque de una vez
+    if entidad == "clientes":
+        tabla_clientes.recargar()
+        indice_clientes.agregar_lote(registro_cliente(fila) for fila in filas)
+        combo_cliente_venta.filtrar()
+        combo_cliente_pedido.filtrar()
+    else:
+        tabla_productos.recargar()
+        indice_productos.agregar_lote(registro_producto(fila) for fila in filas)
+        combo_producto_pedido.filtrar()
+
+def al_cambiar_referencia(entidad, anterior, nueva):
+    # Nombres de clientes, productos y stock aparecen en el reporte
+    motor_reporte.invalidar()
+    if entidad == "clientes":
+        al_cambiar_cliente(anterior, nueva)
+    else:
+        al_cambiar_producto(anterior, nueva)
 
 def agregar_producto_pedido():
     try:
@@ -539,15 +527,16 @@ def agregar_producto_pedido():
             return
         
         # Obtener información del producto
-        producto_info = combo_producto_pedido.productos_dict.get(producto_seleccionado)
+        producto_info = cache.obtener("productos", combo_producto_pedido.clave())
         if not producto_info:
             messagebox.showwarning("Advertencia", "Producto no válido")
             return
         
-        id_producto, precio, stock = producto_info
+        id_producto, precio, stock = producto_info.id_producto, producto_info.precio, producto_info.stock
         
-        # Verificar stock
-        if cantidad > stock:
+        # Verificar stock, contando lo que ya se agregó de este producto
+        en_pedido = sum(linea[1] for linea in lineas_pedido.values() if linea[0] == id_producto)
+        if cantidad + en_pedido > stock:
             messagebox.showwarning("Advertencia", f"Stock insuficiente. Solo hay {stock} unidades disponibles")
             return
         
@@ -555,12 +544,13 @@ def agregar_producto_pedido():
         subtotal = precio * cantidad
         
         # Agregar a la tabla temporal
-        tabla_productos_pedido.insert("", tk.END, values=(
-            producto_seleccionado.split(" - ")[0],  # Solo el nombre
+        item = tabla_productos_pedido.insert("", tk.END, values=(
+            producto_info[1],  # Solo el nombre
             cantidad,
             f"S/.{precio:.2f}",
             f"S/.{subtotal:.2f}"
         ))
+        lineas_pedido[item] = (id_producto, cantidad, precio)
         
         # Actualizar total
         actualizar_total_pedido()
@@ -573,12 +563,8 @@ def agregar_producto_pedido():
 
 def actualizar_total_pedido():
     try:
-        total = 0.0
-        for item in tabla_productos_pedido.get_children():
-            valores = tabla_productos_pedido.item(item)['values']
-            subtotal_str = valores[3].replace("S/.", "").strip()
-            total += float(subtotal_str)
-        
+        # Desde las lineas tipadas, no desde el texto de la tabla
+        total = sum((cantidad * precio for _, cantidad, precio in lineas_pedido.values()), Decimal(0))
         entry_total_pedido.delete(0, tk.END)
         entry_total_pedido.insert(0, f"{total:.2f}")
     except Exception as e:
@@ -593,6 +579,7 @@ def eliminar_producto_pedido():
         
         for item in seleccionado:
             tabla_productos_pedido.delete(item)
+            lineas_pedido.pop(item, None)
         
         actualizar_total_pedido()
     except Exception as e:
@@ -602,6 +589,7 @@ def limpiar_pedido():
     try:
         for item in tabla_productos_pedido.get_children():
             tabla_productos_pedido.delete(item)
+        lineas_pedido.clear()
         combo_cliente_pedido.set("")
         entry_total_pedido.delete(0, tk.END)
         entry_cantidad_pedido.delete(0, tk.END)
@@ -614,173 +602,207 @@ def crear_pedido():
         if not tabla_productos_pedido.get_children():
             messagebox.showwarning("Advertencia", "Agrega al menos un producto al pedido")
             return
-        
-        try:
-            total = float(entry_total_pedido.get())
-            if total <= 0:
-                messagebox.showwarning("Advertencia", "El total debe ser mayor a 0")
+
+        # Asociar cliente si se seleccionó uno
+        id_cliente = None
+        if combo_cliente_pedido.get() not in ("Sin cliente", ""):
+            id_cliente = combo_cliente_pedido.clave()
+            if id_cliente is None:
+                messagebox.showwarning("Advertencia", "Elige un cliente de la lista")
                 return
-        except ValueError:
-            messagebox.showwarning("Advertencia", "Total no válido")
-            return
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                # Insertar pedido
-                cursor.execute("INSERT INTO pedido (fecha, total) VALUES (GETDATE(), ?)", total)
-                cursor.execute("SELECT @@IDENTITY")
-                id_pedido = cursor.fetchone()[0]
-                
-                # Asociar cliente si se seleccionó uno
-                cliente_nombre = combo_cliente_pedido.get()
-                if cliente_nombre != "Sin cliente" and cliente_nombre:
-                    id_cliente = combo_cliente_pedido.clientes_dict.get(cliente_nombre)
-                    if id_cliente:
-                        cursor.execute("INSERT INTO clienPedido (id_cliente, id_pedido) VALUES (?, ?)", 
-                                     (id_cliente, id_pedido))
-                
-                conexion.commit()
-                messagebox.showinfo("Éxito", f"Pedido #{id_pedido} creado correctamente")
-                limpiar_pedido()
-                cargar_pedidos()
-                
-            except Exception as e:
-                conexion.rollback()
-                messagebox.showerror("Error", f"No se pudo crear el pedido:\n{e}")
-            finally:
-                conexion.close()
+        cliente_nombre = nombre_cliente(id_cliente)
+
+        # El total se calcula en la base a partir de las lineas
+        lineas = [lineas_pedido[item] for item in tabla_productos_pedido.get_children()]
+
+        # Queda en el diario local y el stock se descuenta ya en pantalla; al
+        # llegar a la base se corrige con el stock real, y si la base lo
+        # rechaza se repone
+        clave = diario.agregar_pedido(id_cliente, cliente_nombre, lineas)
+        stock_reservado[clave] = consultas.cantidades_pedidas(lineas)
+        mover_stock(stock_reservado[clave], -1)
+        messagebox.showinfo("Éxito", "Pedido anotado. Se confirmará al llegar a la base.")
+        limpiar_pedido()
+        reenviar_diario()
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
 def ver_detalle_pedido():
     try:
-        seleccionado = tabla_pedidos.focus()
+        seleccionado = tabla_pedidos.fila_seleccionada()
         if not seleccionado:
             messagebox.showwarning("Advertencia", "Selecciona un pedido para ver el detalle")
             return
-        
-        id_pedido = tabla_pedidos.item(seleccionado)['values'][0]
-        
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            try:
-                # Obtener información del pedido
-                cursor.execute("""
-                    SELECT p.id_pedido, p.fecha, p.total, 
-                           COALESCE(c.nombre + ' ' + c.apellido, 'Sin cliente') as cliente
-                    FROM pedido p
-                    LEFT JOIN clienPedido cp ON p.id_pedido = cp.id_pedido
-                    LEFT JOIN clientes c ON cp.id_cliente = c.id_cliente
-                    WHERE p.id_pedido = ?
-                """, int(id_pedido))
-                pedido_info = cursor.fetchone()
-                
-                if not pedido_info:
-                    messagebox.showwarning("Advertencia", "Pedido no encontrado")
-                    return
-                
-                # Construir mensaje de detalle
-                detalle = f"📋 DETALLE DEL PEDIDO #{pedido_info[0]}\n\n"
-                detalle += f"📅 Fecha: {pedido_info[1]}\n"
-                detalle += f"👤 Cliente: {pedido_info[3]}\n"
-                detalle += f"💰 Total: S/.{pedido_info[2]:.2f}\n\n"
-                detalle += "ℹ️ Los detalles de productos se registran en el sistema"
-                
-                messagebox.showinfo(f"Detalle Pedido #{id_pedido}", detalle)
-                
-            except Exception as e:
-                messagebox.showerror("Error", f"No se pudo cargar el detalle:\n{e}")
-            finally:
-                conexion.close()
+
+        id_pedido = seleccionado.id_pedido
+
+        def mostrar(resultado):
+            pedido_info, lineas = resultado
+            if not pedido_info:
+                messagebox.showwarning("Advertencia", "Pedido no encontrado")
+                return
+
+            # Construir mensaje de detalle
+            detalle = f"📋 DETALLE DEL PEDIDO #{pedido_info[0]}\n\n"
+            detalle += f"📅 Fecha: {pedido_info[1]}\n"
+            detalle += f"👤 Cliente: {pedido_info[3]}\n"
+            detalle += f"💰 Total: S/.{pedido_info[2]:.2f}\n\n"
+            if lineas:
+                detalle += "🛒 Productos:\n"
+                for nombre, cantidad, precio, subtotal in lineas:
+                    detalle += f"   • {nombre}: {cantidad} x S/.{precio:.2f} = S/.{subtotal:.2f}\n"
+            else:
+                detalle += "ℹ️ Pedido registrado sin detalle de productos"
+
+            messagebox.showinfo(f"Detalle Pedido #{id_pedido}", detalle)
+
+        ejecutar_bd(consultas.obtener_pedido, id_pedido, al_terminar=mostrar, clave="detalle_pedido",
+                    mensaje_error="No se pudo cargar el detalle")
     except Exception as e:
         messagebox.showerror("Error", f"Error inesperado:\n{e}")
 
-# REPORTES
-def generar_reporte_ventas():
+# EXPORTACION
+def leer_fecha(texto):
+    # "" -> sin limite; lanza ErrorNegocio si no es AAAA-MM-DD
+    texto = texto.strip()
+    if not texto:
+        return None
     try:
-        conexion = conectar_bd()
-        if conexion:
-            cursor = conexion.cursor()
-            
-            # Ventas totales
-            cursor.execute("SELECT COUNT(*), SUM(total) FROM ventas")
-            total_ventas, total_ingresos = cursor.fetchone()
-            total_ingresos = total_ingresos or 0
-            
-            # Pedidos totales
-            cursor.execute("SELECT COUNT(*), SUM(total) FROM pedido")
-            total_pedidos, total_pedidos_monto = cursor.fetchone()
-            total_pedidos_monto = total_pedidos_monto or 0
-            
-            # Productos más vendidos
-            cursor.execute("""
-                SELECT TOP 5 p.nombre, SUM(dv.cantidad) as total_vendido
-                FROM detalle_venta dv
-                JOIN productos p ON dv.id_producto = p.id_producto
-                GROUP BY p.nombre
-                ORDER BY total_vendido DESC
-            """)
-            productos_mas_vendidos = cursor.fetchall()
-            
-            # Clientes más frecuentes
-            cursor.execute("""
-                SELECT TOP 5 c.nombre + ' ' + c.apellido as cliente, COUNT(*) as compras
-                FROM ventas v
-                JOIN clientes c ON v.id_cliente = c.id_cliente
-                WHERE c.id_cliente IS NOT NULL
-                GROUP BY c.nombre, c.apellido
-                ORDER BY compras DESC
-            """)
-            clientes_frecuentes = cursor.fetchall()
-            
-            # Productos con bajo stock
-            cursor.execute("""
-                SELECT TOP 5 nombre, stock 
-                FROM productos 
-                WHERE stock < 10 
-                ORDER BY stock ASC
-            """)
-            productos_bajo_stock = cursor.fetchall()
-            
-            conexion.close()
-            
-            # Mostrar reporte
-            reporte = f"""📊 REPORTE GENERAL 📊
+        return datetime.strptime(texto, "%Y-%m-%d").date()
+    except ValueError:
+        raise ErrorNegocio(f"Fecha no válida: {texto} (usa AAAA-MM-DD)")
+
+def dialogo_exportar(extractos):
+    dialogo = tk.Toplevel(ventana)
+    dialogo.title("📤 Exportar")
+    dialogo.transient(ventana)
+    dialogo.resizable(False, False)
+
+    tk.Label(dialogo, text="Datos:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
+    combo_extracto = ttk.Combobox(dialogo, values=extractos, state="readonly", width=18)
+    combo_extracto.set(extractos[0])
+    combo_extracto.grid(row=0, column=1, padx=5, pady=5, sticky="w")
+
+    tk.Label(dialogo, text="Desde (AAAA-MM-DD):").grid(row=1, column=0, padx=5, pady=5, sticky="e")
+    entry_desde = tk.Entry(dialogo, width=12)
+    entry_desde.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+    tk.Label(dialogo, text="Hasta (AAAA-MM-DD):").grid(row=2, column=0, padx=5, pady=5, sticky="e")
+    entry_hasta = tk.Entry(dialogo, width=12)
+    entry_hasta.grid(row=2, column=1, padx=5, pady=5, sticky="w")
+
+    formato = tk.StringVar(value="csv")
+    frame_formato = ttk.Frame(dialogo)
+    frame_formato.grid(row=3, column=0, columnspan=2, pady=5)
+    ttk.Radiobutton(frame_formato, text="CSV", variable=formato, value="csv").pack(side="left", padx=5)
+    boton_parquet = ttk.Radiobutton(frame_formato, text="Parquet", variable=formato, value="parquet")
+    boton_parquet.pack(side="left", padx=5)
+    if not exportacion.parquet_disponible():
+        boton_parquet.config(state="disabled")
+
+    def aceptar():
+        try:
+            desde, hasta = leer_fecha(entry_desde.get()), leer_fecha(entry_hasta.get())
+        except ErrorNegocio as e:
+            messagebox.showwarning("Advertencia", str(e), parent=dialogo)
+            return
+        extracto = combo_extracto.get()
+        ruta = filedialog.asksaveasfilename(parent=dialogo, title=f"Exportar {extracto}",
+                                            initialfile=f"{extracto}.{formato.get()}",
+                                            defaultextension=f".{formato.get()}")
+        if not ruta:
+            return
+        dialogo.destroy()
+        exportar_datos(extracto, ruta, formato.get(), desde, hasta)
+
+    tk.Button(dialogo, text="📤 Exportar", command=aceptar, bg="#76c893", width=15).grid(
+        row=4, column=0, columnspan=2, pady=10)
+
+def exportar_datos(extracto, ruta, formato, desde, hasta):
+    def al_progreso(filas):
+        estado.config(text=f"📤 Exportando {extracto}: {filas:,} filas escritas")
+
+    def al_terminar(resultado):
+        messagebox.showinfo("Exportación",
+                            f"{extracto} exportado a {ruta}\n\n"
+                            f"Filas: {resultado['filas']:,}\n"
+                            f"Tamaño: {resultado['bytes'] / 1e6:,.1f} MB\n"
+                            f"Tiempo: {resultado['segundos']:.1f} s "
+                            f"({resultado['filas_por_segundo']:,.0f} filas/s)")
+
+    ejecutar_bd(exportacion.exportar, extracto, ruta, formato, desde, hasta,
+                al_progreso=al_progreso, al_terminar=al_terminar, clave=f"exportar_{extracto}",
+                mensaje_error=f"Error al exportar {extracto}")
+
+# REPORTES
+def mostrar_reporte(datos, titulo="Reporte General"):
+    reporte = f"""📊 {titulo.upper()} 📊
 
 💰 VENTAS:
-   📈 Total Ventas: {total_ventas}
-   💵 Ingresos por Ventas: S/. {total_ingresos:,.2f}
+   📈 Total Ventas: {datos['total_ventas']}
+   💵 Ingresos por Ventas: S/. {datos['total_ingresos']:,.2f}
 
 📋 PEDIDOS:
-   📦 Total Pedidos: {total_pedidos}
-   💰 Monto en Pedidos: S/. {total_pedidos_monto:,.2f}
+   📦 Total Pedidos: {datos['total_pedidos']}
+   💰 Monto en Pedidos: S/. {datos['total_pedidos_monto']:,.2f}
 
 🏆 PRODUCTOS MÁS VENDIDOS:
 """
-            for i, producto in enumerate(productos_mas_vendidos, 1):
-                reporte += f"   {i}. {producto[0]}: {producto[1]} unidades\n"
-            
-            reporte += "\n👥 CLIENTES MÁS FRECUENTES:\n"
-            for i, cliente in enumerate(clientes_frecuentes, 1):
-                reporte += f"   {i}. {cliente[0]}: {cliente[1]} compras\n"
-            
-            if productos_bajo_stock:
-                reporte += "\n⚠️ PRODUCTOS CON BAJO STOCK:\n"
-                for producto in productos_bajo_stock:
-                    reporte += f"   • {producto[0]}: {producto[1]} unidades\n"
-            
-            messagebox.showinfo("Reporte General", reporte)
-    except Exception as e:
+    for i, producto in enumerate(datos['productos_mas_vendidos'], 1):
+        reporte += f"   {i}. {producto[0]}: {producto[1]} unidades\n"
+
+    reporte += "\n👥 CLIENTES MÁS FRECUENTES:\n"
+    for i, cliente in enumerate(datos['clientes_frecuentes'], 1):
+        reporte += f"   {i}. {cliente[0]}: {cliente[1]} compras\n"
+
+    if datos['productos_bajo_stock']:
+        reporte += "\n⚠️ PRODUCTOS CON BAJO STOCK:\n"
+        for producto in datos['productos_bajo_stock']:
+            reporte += f"   • {producto[0]}: {producto[1]} unidades\n"
+
+    if 'por_tienda' in datos:
+        reporte += "\n🏪 POR TIENDA:\n"
+        for tienda, totales in datos['por_tienda'].items():
+            reporte += (f"   • {tienda}: {totales['total_ventas']} ventas, "
+                        f"S/. {totales['total_ingresos']:,.2f} | "
+                        f"{totales['total_pedidos']} pedidos, S/. {totales['total_pedidos_monto']:,.2f}\n")
+        for tienda, error in datos['sin_respuesta']:
+            reporte += f"   ❌ {tienda}: sin respuesta ({error})\n"
+
+    messagebox.showinfo(titulo, reporte)
+
+def generar_reporte_ventas():
+    # Si el ultimo reporte sigue vigente se muestra sin consultar la base
+    datos = motor_reporte.en_cache()
+    if datos is not None:
+        mostrar_reporte(datos)
+        return
+
+    def al_fallar(e):
         messagebox.showerror("Error", f"Error al generar reporte:\n{e}")
 
+    def generar():
+        with metricas.operacion("reporte"):
+            return motor_reporte.generar()
+
+    # El motor toma sus propias conexiones del pool, una por consulta
+    ejecutor.enviar(generar, al_terminar=mostrar_reporte, al_fallar=al_fallar, clave="reporte")
+
+def generar_reporte_tiendas():
+    def al_terminar(datos):
+        mostrar_reporte(datos, "Reporte de Todas las Tiendas")
+
+    def al_fallar(e):
+        messagebox.showerror("Error", f"Error al generar el reporte de tiendas:\n{e}")
+
+    # Todas las tiendas a la vez; cada una con sus propias conexiones
+    ejecutor.enviar(reporte_tiendas.generar, al_terminar=al_terminar, al_fallar=al_fallar,
+                    clave="reporte_tiendas")
+
 # =========================
 # INTERFAZ GRÁFICA
 # =========================
 ventana = tk.Tk()
-ventana.title("🏪 Sistema de Gestión - Tiendas")
+ventana.title(f"🏪 Sistema de Gestión - Tiendas ({TIENDA_LOCAL})")
 ventana.geometry("1400x900")
 ventana.configure(bg="#f0f8ff")
 
@@ -833,21 +855,18 @@ tk.Button(frame_botones_cliente, text="✏️ Actualizar Cliente", command=actua
 tk.Button(frame_botones_cliente, text="🗑️ Eliminar Cliente", command=eliminar_cliente, bg="#ff595e", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_cliente, text="🧹 Limpiar Campos", command=limpiar_campos_cliente, bg="#8ac6fc", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_cliente, text="🔄 Actualizar Lista", command=cargar_clientes, bg="#1982c4", width=15).pack(side="left", padx=5)
+tk.Button(frame_botones_cliente, text="📥 Importar CSV", command=lambda: importar_csv("clientes"), bg="#9c89b8", width=15).pack(side="left", padx=5)
 
 frame_tabla_clientes = ttk.Frame(frame_clientes)
 frame_tabla_clientes.pack(fill="both", expand=True, padx=10, pady=5)
 
 columnas_clientes = ("ID", "Nombre", "Apellido", "DNI", "Teléfono", "Correo", "Dirección")
-tabla_clientes = ttk.Treeview(frame_tabla_clientes, columns=columnas_clientes, show="headings", height=12)
-for col in columnas_clientes:
-    tabla_clientes.heading(col, text=col)
-    tabla_clientes.column(col, width=120)
-
-scroll_clientes = ttk.Scrollbar(frame_tabla_clientes, orient="vertical", command=tabla_clientes.yview)
-tabla_clientes.configure(yscrollcommand=scroll_clientes.set)
-scroll_clientes.pack(side="right", fill="y")
+tabla_clientes = TablaVirtual(frame_tabla_clientes, columnas_clientes,
+                              *fuente_cache("clientes"),
+                              ancho_columna=120, alto=12,
+                              al_ordenar=lambda orden: ordenar_referencia("clientes", tabla_clientes, orden))
 tabla_clientes.pack(fill="both", expand=True)
-tabla_clientes.bind("<<TreeviewSelect>>", cargar_cliente_seleccionado)
+tabla_clientes.bind("<<SeleccionVirtual>>", cargar_cliente_seleccionado)
 
 # PESTAÑA PRODUCTOS (mantener igual)
 frame_productos = ttk.Frame(notebook)
@@ -884,21 +903,18 @@ tk.Button(frame_botones_producto, text="✏️ Actualizar Producto", command=act
 tk.Button(frame_botones_producto, text="🗑️ Eliminar Producto", command=eliminar_producto, bg="#ff595e", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_producto, text="🧹 Limpiar Campos", command=limpiar_campos_producto, bg="#8ac6fc", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_producto, text="🔄 Actualizar Lista", command=cargar_productos, bg="#1982c4", width=15).pack(side="left", padx=5)
+tk.Button(frame_botones_producto, text="📥 Importar CSV", command=lambda: importar_csv("productos"), bg="#9c89b8", width=15).pack(side="left", padx=5)
 
 frame_tabla_productos = ttk.Frame(frame_productos)
 frame_tabla_productos.pack(fill="both", expand=True, padx=10, pady=5)
 
 columnas_productos = ("ID", "Nombre", "Categoría", "Marca", "Precio", "Stock")
-tabla_productos = ttk.Treeview(frame_tabla_productos, columns=columnas_productos, show="headings", height=12)
-for col in columnas_productos:
-    tabla_productos.heading(col, text=col)
-    tabla_productos.column(col, width=120)
-
-scroll_productos = ttk.Scrollbar(frame_tabla_productos, orient="vertical", command=tabla_productos.yview)
-tabla_productos.configure(yscrollcommand=scroll_productos.set)
-scroll_productos.pack(side="right", fill="y")
+tabla_productos = TablaVirtual(frame_tabla_productos, columnas_productos,
+                               *fuente_cache("productos"),
+                               ancho_columna=120, alto=12,
+                               al_ordenar=lambda orden: ordenar_referencia("productos", tabla_productos, orden))
 tabla_productos.pack(fill="both", expand=True)
-tabla_productos.bind("<<TreeviewSelect>>", cargar_producto_seleccionado)
+tabla_productos.bind("<<SeleccionVirtual>>", cargar_producto_seleccionado)
 
 # PESTAÑA VENTAS (mantener igual)
 frame_ventas = ttk.Frame(notebook)
@@ -908,7 +924,7 @@ frame_form_venta = ttk.LabelFrame(frame_ventas, text="📝 Registrar Venta")
 frame_form_venta.pack(fill="x", padx=10, pady=5)
 
 tk.Label(frame_form_venta, text="Cliente*:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-combo_cliente_venta = ttk.Combobox(frame_form_venta, width=25, state="readonly")
+combo_cliente_venta = ComboBusqueda(frame_form_venta, indice_clientes, fijos=("Sin cliente",), width=25)
 combo_cliente_venta.grid(row=0, column=1, padx=5, pady=5)
 
 tk.Label(frame_form_venta, text="Total*:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
@@ -922,19 +938,18 @@ tk.Button(frame_botones_venta, text="💰 Registrar Venta", command=crear_venta,
 tk.Button(frame_botones_venta, text="🧹 Limpiar Campos", command=limpiar_campos_venta, bg="#ffca3a", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_venta, text="🔄 Actualizar Lista", command=cargar_ventas, bg="#1982c4", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_venta, text="📊 Generar Reporte", command=generar_reporte_ventas, bg="#9c89b8", width=15).pack(side="left", padx=5)
+if len(ORIGENES_TIENDAS) > 1:
+    tk.Button(frame_botones_venta, text="🌐 Reporte Tiendas", command=generar_reporte_tiendas, bg="#b8a9c9", width=15).pack(side="left", padx=5)
+tk.Button(frame_botones_venta, text="📤 Exportar", command=lambda: dialogo_exportar(("ventas", "detalle_venta")), bg="#8ac6fc", width=15).pack(side="left", padx=5)
 
 frame_tabla_ventas = ttk.Frame(frame_ventas)
 frame_tabla_ventas.pack(fill="both", expand=True, padx=10, pady=5)
 
 columnas_ventas = ("ID", "Cliente", "Fecha", "Total")
-tabla_ventas = ttk.Treeview(frame_tabla_ventas, columns=columnas_ventas, show="headings", height=12)
-for col in columnas_ventas:
-    tabla_ventas.heading(col, text=col)
-    tabla_ventas.column(col, width=150)
-
-scroll_ventas = ttk.Scrollbar(frame_tabla_ventas, orient="vertical", command=tabla_ventas.yview)
-tabla_ventas.configure(yscrollcommand=scroll_ventas.set)
-scroll_ventas.pack(side="right", fill="y")
+fuente_ventas = fuente_bd("ventas", consultas.contar_ventas, consultas.pagina_ventas)
+tabla_ventas = TablaVirtual(frame_tabla_ventas, columnas_ventas, *fuente_ventas,
+                            ancho_columna=150, alto=12,
+                            al_ordenar=lambda orden: ordenar_lista("ventas", tabla_ventas, fuente_ventas, orden))
 tabla_ventas.pack(fill="both", expand=True)
 
 # PESTAÑA PEDIDOS (mantener igual)
@@ -945,11 +960,11 @@ frame_form_pedido = ttk.LabelFrame(frame_pedidos, text="🛒 Crear Nuevo Pedido"
 frame_form_pedido.pack(fill="x", padx=10, pady=5)
 
 tk.Label(frame_form_pedido, text="Cliente:").grid(row=0, column=0, padx=5, pady=5, sticky="e")
-combo_cliente_pedido = ttk.Combobox(frame_form_pedido, width=25, state="readonly")
+combo_cliente_pedido = ComboBusqueda(frame_form_pedido, indice_clientes, fijos=("Sin cliente",), width=25)
 combo_cliente_pedido.grid(row=0, column=1, padx=5, pady=5)
 
 tk.Label(frame_form_pedido, text="Producto:").grid(row=0, column=2, padx=5, pady=5, sticky="e")
-combo_producto_pedido = ttk.Combobox(frame_form_pedido, width=30, state="readonly")
+combo_producto_pedido = ComboBusqueda(frame_form_pedido, indice_productos, width=30)
 combo_producto_pedido.grid(row=0, column=3, padx=5, pady=5)
 
 tk.Label(frame_form_pedido, text="Cantidad:").grid(row=0, column=4, padx=5, pady=5, sticky="e")
@@ -973,6 +988,7 @@ for col in columnas_productos_pedido:
 
 scroll_productos_pedido = ttk.Scrollbar(frame_tabla_productos_pedido, orient="vertical", command=tabla_productos_pedido.yview)
 tabla_productos_pedido.configure(yscrollcommand=scroll_productos_pedido.set)
+lineas_pedido = {}  # item de tabla_productos_pedido -> (id_producto, cantidad, precio)
 scroll_productos_pedido.pack(side="right", fill="y")
 tabla_productos_pedido.pack(fill="both", expand=True)
 
@@ -990,19 +1006,16 @@ tk.Button(frame_botones_pedido, text="✅ Crear Pedido", command=crear_pedido, b
 tk.Button(frame_botones_pedido, text="🧹 Limpiar Todo", command=limpiar_pedido, bg="#ffca3a", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_pedido, text="📋 Ver Detalle", command=ver_detalle_pedido, bg="#1982c4", width=15).pack(side="left", padx=5)
 tk.Button(frame_botones_pedido, text="🔄 Actualizar Lista", command=cargar_pedidos, bg="#9c89b8", width=15).pack(side="left", padx=5)
+tk.Button(frame_botones_pedido, text="📤 Exportar", command=lambda: dialogo_exportar(("pedidos", "detalle_pedido")), bg="#8ac6fc", width=15).pack(side="left", padx=5)
 
 frame_tabla_pedidos = ttk.Frame(frame_pedidos)
 frame_tabla_pedidos.pack(fill="both", expand=True, padx=10, pady=5)
 
 columnas_pedidos = ("ID", "Fecha", "Total", "Cliente")
-tabla_pedidos = ttk.Treeview(frame_tabla_pedidos, columns=columnas_pedidos, show="headings", height=12)
-for col in columnas_pedidos:
-    tabla_pedidos.heading(col, text=col)
-    tabla_pedidos.column(col, width=150)
-
-scroll_pedidos = ttk.Scrollbar(frame_tabla_pedidos, orient="vertical", command=tabla_pedidos.yview)
-tabla_pedidos.configure(yscrollcommand=scroll_pedidos.set)
-scroll_pedidos.pack(side="right", fill="y")
+fuente_pedidos = fuente_bd("pedidos", consultas.contar_pedidos, consultas.pagina_pedidos)
+tabla_pedidos = TablaVirtual(frame_tabla_pedidos, columnas_pedidos, *fuente_pedidos,
+                             ancho_columna=150, alto=12,
+                             al_ordenar=lambda orden: ordenar_lista("pedidos", tabla_pedidos, fuente_pedidos, orden))
 tabla_pedidos.pack(fill="both", expand=True)
 
 # BARRA DE ESTADO
@@ -1012,20 +1025,401 @@ estado = tk.Label(frame_estado, text="Sistema de Gestión Tiendas - Listo",
                  bd=1, relief=tk.SUNKEN, anchor=tk.W)
 estado.pack(fill="x")
 
+# TAREAS EN SEGUNDO PLANO
+# Mientras haya consultas en curso la barra de estado lo indica; al terminar
+# vuelve a mostrar el ultimo mensaje normal.
+mensaje_estado = estado.cget("text")
+
+def poner_estado(texto):
+    global mensaje_estado
+    mensaje_estado = texto
+    if not ejecutor.pendientes:
+        estado.config(text=texto)
+
+def texto_ultima_operacion():
+    ultima = metricas.ultima()
+    if not ultima:
+        return ""
+    texto = f"   ⏱️ {ultima['nombre']}: {ultima['total_ms']:,.0f} ms"
+    if ultima["consultas"]:
+        texto += (f" ({ultima['consultas']} consultas, {ultima['bd_ms']:,.0f} ms en BD, "
+                  f"{ultima['filas']:,} filas)")
+    return texto
+
+def mostrar_ocupado(pendientes):
+    if pendientes:
+        estado.config(text=f"⏳ Consultando base de datos... ({pendientes} en curso)")
+        ventana.config(cursor="watch")
+    else:
+        estado.config(text=mensaje_estado + texto_ultima_operacion())
+        ventana.config(cursor="")
+
+def error_en_segundo_plano(e):
+    messagebox.showerror("Error", f"Error inesperado:\n{e}")
+
+ejecutor = EjecutorTk(ventana, max_hilos=4, al_cambiar_ocupado=mostrar_ocupado,
+                      al_fallar=error_en_segundo_plano)
+
 # INICIALIZACIÓN
+def milisegundos_desde_inicio():
+    return (time.perf_counter() - INICIO_PROGRAMA) * 1000
+
+# CARGA POR PESTAÑA
+# Cada pestaña pide sus datos la primera vez que se abre, no todas al
+# arrancar. Las piezas compartidas (los clientes alimentan la tabla de
+# clientes y los combos de ventas y pedidos) se piden una sola vez.
+PIEZAS_PESTANA = (
+    ("clientes",),                          # 👥 Clientes
+    ("productos",),                         # 📦 Productos
+    ("clientes", "ventas"),                 # 💰 Ventas
+    ("clientes", "productos", "pedidos"),   # 📋 Pedidos
+)
+CARGAR_PIEZA = {
+    "clientes": cargar_clientes,
+    "productos": cargar_productos,
+    "ventas": cargar_ventas,
+    "pedidos": cargar_pedidos,
+}
+# Tras abrir una pestaña, la siguiente se carga sola si el sistema queda
+# sin consultas pendientes durante este tiempo (None para desactivar)
+PRECARGA_SIGUIENTE_MS = 1500
+
+piezas_cargadas = set()
+sistema_listo = False  # hasta terminar las migraciones no se consulta nada mas
+
+def activar_pestana(indice):
+    for pieza in PIEZAS_PESTANA[indice]:
+        if pieza not in piezas_cargadas:
+            piezas_cargadas.add(pieza)
+            CARGAR_PIEZA[pieza]()
+
+def precargar_pestana(indice):
+    if ejecutor.pendientes:
+        # El usuario sigue trabajando: se reintenta mas tarde
+        ventana.after(PRECARGA_SIGUIENTE_MS, precargar_pestana, indice)
+    else:
+        activar_pestana(indice)
+
+def al_cambiar_pestana(event=None):
+    if not sistema_listo:
+        return
+    indice = notebook.index(notebook.select())
+    activar_pestana(indice)
+    if PRECARGA_SIGUIENTE_MS is not None and indice + 1 < len(PIEZAS_PESTANA):
+        ventana.after(PRECARGA_SIGUIENTE_MS, precargar_pestana, indice + 1)
+
+def preparar_y_cargar(conexion, notificar):
+    # Aplica las migraciones pendientes del esquema (indices, columnas) antes
+    # de la primera consulta y trae los clientes, los datos de la pestaña
+    # que se ve al abrir. Devuelve las migraciones aplicadas y la version
+    # desde la que se sincroniza, tomada antes de leer nada.
+    aplicadas = migraciones.aplicar_pendientes(conexion)
+    marca = consultas.marca_cambios(conexion)
+    consultas.listar_clientes(conexion, notificar)
+    return aplicadas, marca
+
+# SINCRONIZACIÓN
+# Cada tanto se piden solo las filas que cambiaron desde la ultima vez
+# (columna version, migracion 0004) y se corrigen el cache y las tablas
+# abiertas; asi se ven los cambios de otros terminales sin recargar las
+# listas completas. Las pestañas aun no abiertas no se tocan: cuando se
+# carguen ya traeran los datos al dia.
+INTERVALO_SINCRONIZACION_MS = 15000
+TABLAS_SINCRONIZADAS = (
+    ("ventas", tabla_ventas),
+    ("pedidos", tabla_pedidos),
+)
+
+marca_sincronizacion = None  # version de la base hasta la que se esta al dia
+
+def cargas_en_curso():
+    # Mientras clientes o productos se cargan por bloques, un cambio puede
+    # haber quedado antes o despues de la lectura: se espera a que termine
+    return any(entidad in piezas_cargadas and not cache.cargado[entidad]
+               for entidad in ("clientes", "productos"))
+
+def consultar_cambios(desde):
+    with pool.conexion() as conexion:
+        return consultas.cambios_desde(conexion, desde)
+
+def sincronizar():
+    ventana.after(INTERVALO_SINCRONIZACION_MS, sincronizar)
+    if marca_sincronizacion is None or cargas_en_curso():
+        return
+    ejecutor.enviar(consultar_cambios, marca_sincronizacion, al_terminar=aplicar_cambios,
+                    al_fallar=lambda e: poner_estado(f"⚠️ No se pudo sincronizar: {e}"),
+                    clave="sincronizar", silenciosa=True)
+
+def aplicar_cambios(resultado):
+    global marca_sincronizacion
+    hasta, filas, eliminadas = resultado
+    if cargas_en_curso():
+        # Empezo una carga mientras se consultaba: se repite desde la misma marca
+        return
+    cambios = 0
+    for entidad in ("clientes", "productos"):
+        if entidad in piezas_cargadas:
+            cambios += cache.aplicar_cambios(entidad, filas[entidad], eliminadas[entidad])
+    for entidad, tabla in TABLAS_SINCRONIZADAS:
+        if listas.cargado[entidad]:
+            # Ordenada en memoria: se corrige la lista y se redibuja desde ella
+            cambio = listas.aplicar_cambios(entidad, filas[entidad], eliminadas[entidad])
+            if cambio:
+                tabla.recargar()
+            cambios += cambio
+        elif entidad in piezas_cargadas and not tabla.desactualizada:
+            cambios += tabla.aplicar_cambios(filas[entidad], eliminadas[entidad])
+    marca_sincronizacion = hasta
+    if cambios:
+        motor_reporte.invalidar()
+        poner_estado(f"🔄 {cambios} cambios sincronizados a las {datetime.now():%H:%M:%S}")
+
+# DIARIO DE VENTAS Y PEDIDOS
+# Ventas y pedidos se anotan en un diario local antes de ir a la base: el
+# registro no espera al servidor y no se pierde si la base no responde. Se
+# envian en segundo plano apenas se anotan y, si la base no responde, se
+# reintenta cada tanto; lo pendiente sobrevive a cerrar el programa.
+ARCHIVO_DIARIO = f"diario_{TIENDA_LOCAL}.log"
+INTERVALO_REENVIO_MS = 10000
+
+diario = DiarioOperaciones(ARCHIVO_DIARIO)
+reenviando = False
+# Stock descontado en pantalla por los pedidos de esta sesion que la base
+# aun no confirmo: clave del diario -> {id_producto: cantidad}
+stock_reservado = {}
+
+def enviar_diario():
+    with metricas.operacion("enviar_diario"), pool.conexion() as conexion:
+        return diario_operaciones.reenviar(conexion, diario)
+
+def reenviar_diario():
+    global reenviando
+    if reenviando or not sistema_listo or not len(diario):
+        return
+    reenviando = True
+    ejecutor.enviar(enviar_diario, al_terminar=al_reenviar, al_fallar=al_fallar_reenvio, silenciosa=True)
+
+def reenviar_periodico():
+    reenviar_diario()
+    ventana.after(INTERVALO_REENVIO_MS, reenviar_periodico)
+
+def mostrar_nueva(entidad, tabla, fila):
+    # Las ventas y pedidos se listan del mas reciente al mas antiguo (fecha
+    # e id); la sincronizacion pudo haberla traido antes
+    if listas.cargado[entidad]:
+        if listas.obtener(entidad, fila[0]) is None:
+            listas.guardar(entidad, fila)
+            tabla.recargar()
+    elif entidad in piezas_cargadas and tabla.indice_de(fila[0]) is None:
+        # Una operacion del diario puede llegar con la fecha de dias atras:
+        # va arriba solo si es la mas reciente; si no, su lugar lo da la base
+        primera = tabla.fila(0)
+        if tabla.orden is None and (tabla.total == 0 or
+                                    (primera is not None and (fila.fecha, fila[0]) > (primera.fecha, primera[0]))):
+            tabla.insertar_fila(fila, 0)
+        else:
+            tabla.recargar()
+
+def describir_operacion(tipo, datos):
+    if tipo == "venta":
+        return f"Venta de S/.{Decimal(datos['total']):.2f} a {datos['cliente']} del {datos['fecha']}"
+    return f"Pedido de {len(datos['lineas'])} productos para {datos['cliente']} del {datos['fecha']}"
+
+def mover_stock(cantidades, signo):
+    # Descuenta (signo -1) o repone (+1) en el cache el stock de un pedido
+    for id_producto, cantidad in cantidades.items():
+        producto = cache.obtener("productos", id_producto)
+        if producto is not None:
+            cache.guardar("productos", producto._replace(stock=producto.stock + signo * cantidad))
+
+def al_reenviar(resultado):
+    global reenviando
+    reenviando = False
+    aplicadas, rechazadas = resultado
+    for clave, tipo, fila in aplicadas:
+        stock_reservado.pop(clave, None)
+        if tipo == "venta":
+            mostrar_nueva("ventas", tabla_ventas, fila)
+        else:
+            pedido, productos = fila
+            mostrar_nueva("pedidos", tabla_pedidos, pedido)
+            # El stock descontado se refleja en la tabla y el combo de productos
+            for producto in productos:
+                cache.guardar("productos", producto)
+    if aplicadas:
+        motor_reporte.invalidar()
+        poner_estado(f"✅ {len(aplicadas)} operaciones enviadas a la base")
+    for clave, tipo, datos, error in rechazadas:
+        reservado = stock_reservado.pop(clave, None)
+        if isinstance(error, ErrorStock):
+            # El stock real de la base ya incluye todo lo confirmado
+            for producto in error.productos:
+                cache.guardar("productos", producto)
+        elif reservado:
+            mover_stock(reservado, 1)
+        messagebox.showwarning("Operación rechazada",
+                               f"La base rechazó esta operación del diario y no se registró:\n\n"
+                               f"{describir_operacion(tipo, datos)}\n\n{error}")
+    # Lo anotado mientras se enviaba sale ahora
+    reenviar_diario()
+
+def al_fallar_reenvio(e):
+    global reenviando
+    reenviando = False
+    poner_estado(f"📝 {len(diario)} operaciones sin enviar, se reintentará: {e}")
+
+# INSTANTÁNEA LOCAL
+# Lo ultimo que se vio, guardado en disco: se dibuja al abrir sin esperar a
+# la base y se reemplaza cuando llegan los datos reales.
+ARCHIVO_INSTANTANEA = f"instantanea_{TIENDA_LOCAL}.db"
+INTERVALO_INSTANTANEA_MS = 5 * 60 * 1000
+FILAS_RECIENTES = 100  # ventas y pedidos guardados (la primera pagina)
+
+TABLAS_INSTANTANEA = (
+    ("clientes", tabla_clientes),
+    ("productos", tabla_productos),
+    ("ventas", tabla_ventas),
+    ("pedidos", tabla_pedidos),
+)
+
+def mostrar_instantanea():
+    # Devuelve el momento del guardado mas antiguo, o None si no habia
+    datos = instantanea.leer(ARCHIVO_INSTANTANEA, TIENDA_LOCAL)
+    for entidad, tabla in TABLAS_INSTANTANEA:
+        if entidad not in datos:
+            continue
+        total, filas, _ = datos[entidad]
+        if entidad in ("clientes", "productos"):
+            # Tabla y combos salen del cache, como con los datos de la base
+            cache.reemplazar(entidad, filas)
+            tabla.marcar_desactualizada()
+        else:
+            tabla.precargar(total, filas, desactualizada=True)
+    return min((guardada_en for _, _, guardada_en in datos.values()), default=None)
+
+def datos_instantanea():
+    # Solo lo ya confirmado con la base; lo demas conserva lo guardado antes
+    datos = {}
+    for entidad, tabla in TABLAS_INSTANTANEA:
+        if tabla.desactualizada or entidad not in piezas_cargadas:
+            continue
+        if entidad in ("clientes", "productos"):
+            if cache.cargado[entidad]:
+                total = cache.total(entidad)
+                datos[entidad] = (total, [tuple(fila) for fila in cache.pagina(entidad, 0, total)])
+        elif tabla.total and tabla.orden is None:
+            # Solo en el orden de la base, el que se muestra al abrir
+            filas = []
+            for indice in range(min(tabla.total, FILAS_RECIENTES)):
+                fila = tabla.fila(indice)
+                if fila is None:
+                    break
+                filas.append(tuple(fila))
+            if filas:
+                datos[entidad] = (tabla.total, filas)
+    return datos
+
+def guardar_instantanea():
+    datos = datos_instantanea()
+    if datos:
+        ejecutor.enviar(instantanea.guardar, ARCHIVO_INSTANTANEA, TIENDA_LOCAL, datos,
+                        al_fallar=lambda e: poner_estado(f"⚠️ No se pudo guardar la instantánea: {e}"),
+                        clave="instantanea", silenciosa=True)
+    ventana.after(INTERVALO_INSTANTANEA_MS, guardar_instantanea)
+
+INTERVALO_REINTENTO_INICIO_MS = 10000
+
 def inicializar():
+    # Primero lo guardado en disco, despues la pestaña visible desde la
+    # base; las demas pestañas se cargan al abrirlas. Si la base no responde
+    # se sigue trabajando con la instantanea y el diario, y se reintenta
+    # cada tanto hasta que responda; recien ahi se envia lo anotado.
+    tiempos = {}
+    piezas_cargadas.add("clientes")
+    guardada_en = mostrar_instantanea()
+    if guardada_en is not None:
+        tiempos["instantanea"] = milisegundos_desde_inicio()
+        poner_estado(f"📦 Datos guardados el {datetime.fromtimestamp(guardada_en):%d/%m %H:%M} "
+                     f"(dibujados en {tiempos['instantanea']:.0f} ms) - actualizando desde la base...")
+
+    def al_progreso(parcial):
+        recibir_bloque(parcial)
+        if "interactivo" not in tiempos:
+            # Con el primer bloque de clientes en pantalla ya se puede trabajar
+            tiempos["interactivo"] = milisegundos_desde_inicio()
+            poner_estado(f"⏱️ Interactivo en {tiempos['interactivo']:.0f} ms - cargando el resto...")
+
+    def al_terminar(resultado):
+        global sistema_listo, marca_sincronizacion
+        aplicadas, marca_sincronizacion = resultado
+        texto = (f"Sistema cargado correctamente - Tienda: {TIENDA_LOCAL} | "
+                 f"⏱️ interactivo en {tiempos.get('interactivo', 0):.0f} ms, "
+                 f"completo en {milisegundos_desde_inicio():.0f} ms")
+        if aplicadas:
+            texto += f" | esquema actualizado a la versión {aplicadas[-1][0]}"
+        poner_estado(texto)
+        # Si el usuario cambio de pestaña mientras tanto, se carga ahora
+        sistema_listo = True
+        al_cambiar_pestana()
+        # Lo que quedo sin enviar en la sesion anterior (o mientras no habia base)
+        reenviar_diario()
+
+    fallos = []
+
+    def al_fallar(e):
+        # El cuadro de mensaje solo la primera vez; despues, en la barra de estado
+        if not fallos:
+            messagebox.showerror("Error", f"Error al inicializar el sistema:\n{e}")
+        fallos.append(e)
+        poner_estado(f"⚠️ Sin conexión con la base ({len(fallos)} intentos), "
+                     f"se reintentará en {INTERVALO_REINTENTO_INICIO_MS // 1000} s: {e}")
+        ventana.after(INTERVALO_REINTENTO_INICIO_MS, cargar)
+
+    def cargar():
+        try:
+            ejecutar_bd(preparar_y_cargar, al_progreso=al_progreso, al_terminar=al_terminar, clave="inicio",
+                        al_fallar=al_fallar)
+        except Exception as e:
+            al_fallar(e)
+
+    cargar()
+
+# POOL DE CONEXIONES
+def mostrar_estadisticas_pool(event=None):
+    estado.config(text=pool.resumen())
+
+def mostrar_metricas(event=None):
+    messagebox.showinfo("Tiempos de consultas",
+                        f"Funciones con más tiempo en la base:\n\n{metricas.informe()}\n\n"
+                        f"Consultas de más de {UMBRAL_CONSULTA_LENTA_MS} ms: {ARCHIVO_CONSULTAS_LENTAS}")
+
+def purgar_conexiones():
+    # Cierra las conexiones que llevan mucho tiempo sin usarse
+    pool.purgar_inactivas()
+    ventana.after(60000, purgar_conexiones)
+
+def cerrar_aplicacion():
     try:
-        cargar_clientes()
-        cargar_productos()
-        cargar_ventas()
-        cargar_pedidos()
-        cargar_clientes_combo()
-        cargar_clientes_pedido_combo()
-        cargar_productos_pedido_combo()
-        estado.config(text="Sistema cargado correctamente - Base de datos: tiendas")
-    except Exception as e:
-        messagebox.showerror("Error", f"Error al inicializar el sistema:\n{e}")
+        instantanea.guardar(ARCHIVO_INSTANTANEA, TIENDA_LOCAL, datos_instantanea())
+    except Exception:
+        pass  # sin instantanea la proxima apertura solo espera a la base
+    ejecutor.cerrar()
+    diario.cerrar()
+    motor_reporte.cerrar()
+    reporte_tiendas.cerrar()
+    pool.cerrar()
+    ventana.destroy()
+
+estado.bind("<Double-Button-1>", mostrar_estadisticas_pool)
+estado.bind("<Button-3>", mostrar_metricas)
+cache.suscribir(al_cambiar_referencia, al_agregar_bloque)
+notebook.bind("<<NotebookTabChanged>>", al_cambiar_pestana)
+ventana.protocol("WM_DELETE_WINDOW", cerrar_aplicacion)
 
 # Ejecutar inicialización
-ventana.after(100, inicializar)
+ventana.after_idle(inicializar)
+ventana.after(60000, purgar_conexiones)
+ventana.after(INTERVALO_INSTANTANEA_MS, guardar_instantanea)
+ventana.after(INTERVALO_SINCRONIZACION_MS, sincronizar)
+ventana.after(INTERVALO_REENVIO_MS, reenviar_periodico)
 ventana.mainloop()
\ No newline at end of file
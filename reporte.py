@@ -0,0 +1,76 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import consultas
+
+# =========================
+# MOTOR DEL REPORTE GENERAL
+# =========================
+# Las partes del reporte (consultas.PARTES_REPORTE) no dependen unas de
+# otras, asi que se ejecutan a la vez, cada una con su propia conexion del
+# pool: el reporte tarda lo que la parte mas lenta y no la suma de todas.
+# El resultado armado se guarda durante "vigencia" segundos; las escrituras
+# de esta aplicacion lo invalidan antes, y los cambios hechos desde otros
+# terminales se ven como maximo al vencer la vigencia.
+#
+# Con "metricas" (instrumentacion.Metricas), las consultas de las partes se
+# suman a la operacion abierta en el hilo que llama a generar().
+
+class MotorReporte:
+    def __init__(self, pool, partes=consultas.PARTES_REPORTE, vigencia=60.0, metricas=None):
+        self._pool = pool
+        self._partes = partes
+        self.vigencia = vigencia
+        self._metricas = metricas
+        self._hilos = ThreadPoolExecutor(max_workers=len(partes), thread_name_prefix="reporte")
+        self._candado = threading.Lock()
+        self._datos = None
+        self._generado = 0.0
+        self._version = 0  # aumenta con cada invalidacion
+
+    def en_cache(self):
+        # Reporte vigente o None; no consulta la base
+        with self._candado:
+            if self._datos is not None and time.monotonic() - self._generado < self.vigencia:
+                return self._datos
+            return None
+
+    def invalidar(self):
+        with self._candado:
+            self._datos = None
+            self._version += 1
+
+    def generar(self):
+        # Pensado para un hilo de fondo: espera a todas las partes
+        datos = self.en_cache()
+        if datos is not None:
+            return datos
+        with self._candado:
+            version = self._version
+
+        operacion = self._metricas.en_curso() if self._metricas is not None else None
+        futuros = [self._hilos.submit(self._ejecutar, parte, operacion) for parte in self._partes]
+        datos = {}
+        for futuro in futuros:
+            datos.update(futuro.result())
+
+        with self._candado:
+            # Si hubo una escritura mientras se consultaba, el resultado se
+            # entrega pero no se guarda: podria no incluirla.
+            if version == self._version:
+                self._datos = datos
+                self._generado = time.monotonic()
+        return datos
+
+    def _ejecutar(self, parte, operacion):
+        if operacion is None:
+            with self._pool.conexion() as conexion:
+                return parte(conexion)
+        # La conexion vuelve al pool (y sus consultas se registran) antes
+        # de soltar la operacion
+        with self._metricas.continuar(operacion), self._pool.conexion() as conexion:
+            return parte(conexion)
+
+    def cerrar(self):
+        self._hilos.shutdown(wait=False, cancel_futures=True)
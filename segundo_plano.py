@@ -0,0 +1,150 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# =========================
+# TAREAS EN SEGUNDO PLANO
+# =========================
+# Ejecuta el trabajo de base de datos en hilos de fondo y entrega los
+# resultados al hilo de Tk con after(), que es el unico que puede tocar
+# los widgets. Cada sondeo procesa resultados durante a lo sumo
+# "presupuesto_ms"; si quedan mas, sigue en el proximo turno del bucle de
+# Tk, asi una carga en muchos bloques no impide redibujar la ventana.
+# Las tareas silenciosas (sincronizacion periodica, instantanea) no cuentan
+# en "pendientes": la ventana no se muestra ocupada por ellas.
+
+class Tarea:
+    def __init__(self, clave, silenciosa=False):
+        self.clave = clave
+        self.silenciosa = silenciosa
+        self._cancelada = threading.Event()
+
+    def cancelar(self):
+        self._cancelada.set()
+
+    @property
+    def cancelada(self):
+        return self._cancelada.is_set()
+
+
+class EjecutorTk:
+    def __init__(self, raiz, max_hilos=4, al_cambiar_ocupado=None, al_fallar=None,
+                 intervalo_ms=30, presupuesto_ms=15):
+        self._raiz = raiz
+        self._hilos = ThreadPoolExecutor(max_workers=max_hilos, thread_name_prefix="bd")
+        self._resultados = queue.Queue()
+        self._vigentes = {}  # clave -> ultima tarea enviada con esa clave
+        self._pendientes = 0
+        self._visibles = 0  # pendientes sin contar las silenciosas
+        self._sondeando = False
+        self._cerrado = False
+        self._ultimo_ocupado = 0
+        self.al_cambiar_ocupado = al_cambiar_ocupado
+        self.al_fallar = al_fallar
+        self.intervalo_ms = intervalo_ms
+        self.presupuesto_ms = presupuesto_ms
+
+    @property
+    def pendientes(self):
+        return self._visibles
+
+    def enviar(self, funcion, *args, al_terminar=None, al_fallar=None, al_progreso=None, clave=None,
+               silenciosa=False):
+        # Llamar siempre desde el hilo de Tk. Si se indica una clave, la
+        # tarea anterior con la misma clave queda cancelada: su resultado se
+        # descarta y, si aun no empezo, ni siquiera se ejecuta.
+        # Con al_progreso, la funcion recibe ademas notificar=... para
+        # entregar resultados parciales antes de terminar.
+        if self._cerrado:
+            return None
+        tarea = Tarea(clave, silenciosa)
+        if clave is not None:
+            anterior = self._vigentes.get(clave)
+            if anterior is not None:
+                anterior.cancelar()
+            self._vigentes[clave] = tarea
+
+        self._pendientes += 1
+        if not silenciosa:
+            self._visibles += 1
+        self._hilos.submit(self._ejecutar, tarea, funcion, args,
+                           al_terminar, al_fallar or self.al_fallar, al_progreso)
+        self._notificar_ocupado()
+        if not self._sondeando:
+            self._sondeando = True
+            self._raiz.after(self.intervalo_ms, self._sondear)
+        return tarea
+
+    def cancelar(self, clave):
+        tarea = self._vigentes.pop(clave, None)
+        if tarea is not None:
+            tarea.cancelar()
+
+    def cerrar(self):
+        self._cerrado = True
+        for tarea in self._vigentes.values():
+            tarea.cancelar()
+        self._hilos.shutdown(wait=False, cancel_futures=True)
+
+    # -------------------------
+    # HILO DE FONDO
+    # -------------------------
+    def _ejecutar(self, tarea, funcion, args, al_terminar, al_fallar, al_progreso):
+        if tarea.cancelada:
+            self._resultados.put((tarea, None, None, True))
+            return
+        try:
+            if al_progreso is not None:
+                def notificar(valor):
+                    if not tarea.cancelada:
+                        self._resultados.put((tarea, al_progreso, valor, False))
+                resultado = funcion(*args, notificar=notificar)
+            else:
+                resultado = funcion(*args)
+            self._resultados.put((tarea, al_terminar, resultado, True))
+        except Exception as e:
+            self._resultados.put((tarea, al_fallar, e, True))
+
+    # -------------------------
+    # HILO DE TK
+    # -------------------------
+    def _sondear(self):
+        if self._cerrado:
+            return
+        limite = time.perf_counter() + self.presupuesto_ms / 1000
+        agotado = False
+        while True:
+            if time.perf_counter() >= limite:
+                agotado = True
+                break
+            try:
+                tarea, retorno, valor, final = self._resultados.get_nowait()
+            except queue.Empty:
+                break
+            if final:
+                self._pendientes -= 1
+                if not tarea.silenciosa:
+                    self._visibles -= 1
+                if tarea.clave is not None and self._vigentes.get(tarea.clave) is tarea:
+                    del self._vigentes[tarea.clave]
+            if tarea.cancelada or retorno is None:
+                continue
+            try:
+                retorno(valor)
+            except Exception as e:
+                if self.al_fallar is not None and retorno is not self.al_fallar:
+                    self.al_fallar(e)
+        self._notificar_ocupado()
+        if agotado:
+            # Quedan resultados en la cola: se sigue apenas Tk redibuje
+            self._raiz.after(1, self._sondear)
+        elif self._pendientes > 0:
+            self._raiz.after(self.intervalo_ms, self._sondear)
+        else:
+            self._sondeando = False
+
+    def _notificar_ocupado(self):
+        if self.al_cambiar_ocupado is not None and self._visibles != self._ultimo_ocupado:
+            self._ultimo_ocupado = self._visibles
+            self.al_cambiar_ocupado(self._visibles)
@@ -0,0 +1,472 @@
+import argparse
+import asyncio
+import json
+import re
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from functools import partial
+from urllib.parse import urlsplit, parse_qs
+
+import consultas
+from consultas import ErrorNegocio, ErrorStock
+from pool_conexiones import PoolConexiones, ErrorPool
+from reporte import MotorReporte
+from validacion import cliente_desde_campos, producto_desde_campos
+
+# =========================
+# SERVICIO HTTP / JSON
+# =========================
+# La misma capa de datos que usa la ventana (consultas.py), sin Tkinter,
+# expuesta como JSON para un front-end web o para varias cajas a la vez.
+# Un solo hilo con asyncio atiende todas las conexiones HTTP; cada consulta
+# corre en un hilo de trabajo con una conexion del pool, y hay tantos
+# hilos como conexiones, asi ninguna peticion espera un hilo teniendo una
+# conexion libre ni al reves.
+#
+#   python servicio_http.py --sqlite tiendas_prueba.db --ejemplos
+#   python servicio_http.py --odbc "DRIVER={SQL Server};SERVER=...;DATABASE=tiendas;..."
+#
+# Rutas:
+#   GET  /clientes?desde=0&cantidad=50     POST /clientes
+#   PUT  /clientes/{id}                    DELETE /clientes/{id}
+#   GET  /productos?desde=0&cantidad=50    POST /productos
+#   PUT  /productos/{id}                   DELETE /productos/{id}
+#   GET  /ventas?desde=0&cantidad=50       POST /ventas    {"id_cliente", "total"}
+#   GET  /pedidos?desde=0&cantidad=50      POST /pedidos   {"id_cliente", "lineas": [{"id_producto", "cantidad"}]}
+#   GET  /pedidos/{id}
+#   GET  /reporte
+#   GET  /salud
+# Los importes (precio, total, subtotal) van y vienen como texto decimal,
+# "19.90", para no perder centavos.
+
+POR_PAGINA = 50
+MAX_POR_PAGINA = 500
+MAX_CUERPO = 1024 * 1024
+
+# Nombres de las columnas de cada fila, en el orden de consultas.py
+COLUMNAS = {
+    "clientes": ("id_cliente", "nombre", "apellido", "dni", "telefono", "correo", "direccion"),
+    "productos": ("id_producto", "nombre", "categoria", "marca", "precio", "stock"),
+    "ventas": ("id_venta", "cliente", "fecha", "total"),
+    "pedidos": ("id_pedido", "fecha", "total", "cliente"),
+    "lineas_pedido": ("producto", "cantidad", "precio", "subtotal"),
+    "productos_mas_vendidos": ("nombre", "total_vendido"),
+    "clientes_frecuentes": ("cliente", "compras"),
+    "productos_bajo_stock": ("nombre", "stock"),
+}
+
+TEXTOS_ESTADO = {
+    200: "OK", 201: "Created", 204: "No Content", 400: "Bad Request", 404: "Not Found",
+    405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+    500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+class ErrorPeticion(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def a_diccionario(columnas, fila):
+    return dict(zip(columnas, fila))
+
+def _a_json(valor):
+    # Importes como texto ("19.90"): un float de JSON perderia centavos
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    try:
+        return list(valor)  # pyodbc.Row
+    except TypeError:
+        raise TypeError(f"No se puede convertir a JSON: {valor!r}")
+
+def _entero(valor, nombre, minimo=0):
+    try:
+        numero = int(valor)
+    except (TypeError, ValueError):
+        raise ErrorPeticion(400, f"{nombre} debe ser un número entero")
+    if numero < minimo:
+        raise ErrorPeticion(400, f"{nombre} debe ser al menos {minimo}")
+    return numero
+
+
+# OPERACIONES DE VARIOS PASOS
+# Corren en el hilo de trabajo con una sola conexion
+def _pagina(conexion, contar, pagina, desde, cantidad):
+    return contar(conexion), pagina(conexion, desde, cantidad)
+
+def _crear_venta(conexion, id_cliente, total):
+    cliente_nombre = "Sin cliente"
+    if id_cliente is not None:
+        cliente_nombre = consultas.nombre_cliente(conexion, id_cliente)
+        if cliente_nombre is None:
+            raise ErrorNegocio(f"No existe el cliente {id_cliente}")
+    return consultas.registrar_venta(conexion, id_cliente, cliente_nombre, total)
+
+def _crear_pedido(conexion, id_cliente, cantidades):
+    # Los precios salen de la base, no del cuerpo de la peticion
+    precios = consultas.precios_productos(conexion, cantidades)
+    faltantes = [str(id_producto) for id_producto in cantidades if id_producto not in precios]
+    if faltantes:
+        raise ErrorNegocio(f"No existen los productos: {', '.join(faltantes)}")
+    lineas = [(id_producto, cantidad, precios[id_producto])
+              for id_producto, cantidad in cantidades.items()]
+    (id_pedido, *_), _ = consultas.registrar_pedido(conexion, id_cliente, None, lineas)
+    return consultas.obtener_pedido(conexion, id_pedido)
+
+
+class ServicioTiendas:
+    def __init__(self, pool, max_por_pagina=MAX_POR_PAGINA):
+        self.pool = pool
+        self.max_por_pagina = max_por_pagina
+        self.motor_reporte = MotorReporte(pool)
+        self._hilos = ThreadPoolExecutor(max_workers=pool.tamano_maximo, thread_name_prefix="servicio")
+        self._servidor = None
+        # (metodo, patron, manejador); los grupos del patron son argumentos
+        self._rutas = [
+            ("GET", r"/clientes", self.listar_clientes),
+            ("POST", r"/clientes", self.crear_cliente),
+            ("PUT", r"/clientes/(\d+)", self.actualizar_cliente),
+            ("DELETE", r"/clientes/(\d+)", self.eliminar_cliente),
+            ("GET", r"/productos", self.listar_productos),
+            ("POST", r"/productos", self.crear_producto),
+            ("PUT", r"/productos/(\d+)", self.actualizar_producto),
+            ("DELETE", r"/productos/(\d+)", self.eliminar_producto),
+            ("GET", r"/ventas", self.listar_ventas),
+            ("POST", r"/ventas", self.crear_venta),
+            ("GET", r"/pedidos", self.listar_pedidos),
+            ("POST", r"/pedidos", self.crear_pedido),
+            ("GET", r"/pedidos/(\d+)", self.ver_pedido),
+            ("GET", r"/reporte", self.ver_reporte),
+            ("GET", r"/salud", self.ver_salud),
+        ]
+        self._rutas = [(metodo, re.compile(patron + r"/?"), manejador)
+                       for metodo, patron, manejador in self._rutas]
+
+    # -------------------------
+    # ARRANQUE / CIERRE
+    # -------------------------
+    async def iniciar(self, host="127.0.0.1", puerto=8080):
+        self._servidor = await asyncio.start_server(self._atender, host, puerto)
+        return self._servidor
+
+    async def cerrar(self):
+        if self._servidor is not None:
+            self._servidor.close()
+            await self._servidor.wait_closed()
+        self.motor_reporte.cerrar()
+        self._hilos.shutdown(wait=True)
+        self.pool.cerrar()
+
+    async def en_bd(self, funcion, *args):
+        # Ejecuta funcion(conexion, *args) en un hilo de trabajo
+        bucle = asyncio.get_running_loop()
+        return await bucle.run_in_executor(self._hilos, partial(self._con_conexion, funcion, *args))
+
+    def _con_conexion(self, funcion, *args):
+        with self.pool.conexion() as conexion:
+            return funcion(conexion, *args)
+
+    # -------------------------
+    # HTTP
+    # -------------------------
+    async def _atender(self, lector, escritor):
+        try:
+            while True:
+                try:
+                    peticion = await self._leer_peticion(lector)
+                except ErrorPeticion as e:
+                    self._responder(escritor, e.estado, {"error": str(e)}, False)
+                    await escritor.drain()
+                    break
+                if peticion is None:
+                    break
+                metodo, ruta, version, encabezados, cuerpo = peticion
+                estado, datos = await self._despachar(metodo, ruta, cuerpo)
+                seguir = (version == "HTTP/1.1"
+                          and encabezados.get("connection", "").lower() != "close")
+                self._responder(escritor, estado, datos, seguir)
+                await escritor.drain()
+                if not seguir:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _leer_peticion(self, lector):
+        linea = await lector.readline()
+        if not linea:
+            return None  # el cliente cerro la conexion
+        try:
+            metodo, ruta, version = linea.decode("latin-1").split()
+        except ValueError:
+            raise ErrorPeticion(400, "Línea de petición inválida")
+        encabezados = {}
+        while True:
+            linea = await lector.readline()
+            if linea in (b"\r\n", b"\n", b""):
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            encabezados[nombre.strip().lower()] = valor.strip()
+        largo = _entero(encabezados.get("content-length", 0), "Content-Length")
+        if largo > MAX_CUERPO:
+            raise ErrorPeticion(413, "El cuerpo de la petición es demasiado grande")
+        cuerpo = await lector.readexactly(largo) if largo else b""
+        return metodo.upper(), ruta, version, encabezados, cuerpo
+
+    def _responder(self, escritor, estado, datos, seguir):
+        cuerpo = b"" if datos is None else json.dumps(
+            datos, default=_a_json, ensure_ascii=False).encode("utf-8")
+        encabezados = [
+            f"HTTP/1.1 {estado} {TEXTOS_ESTADO.get(estado, '')}",
+            "Content-Type: application/json; charset=utf-8",
+            f"Content-Length: {len(cuerpo)}",
+            "Connection: " + ("keep-alive" if seguir else "close"),
+            # Para el front-end web servido desde otro origen
+            "Access-Control-Allow-Origin: *",
+            "Access-Control-Allow-Methods: GET, POST, PUT, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers: Content-Type",
+        ]
+        escritor.write(("\r\n".join(encabezados) + "\r\n\r\n").encode("latin-1") + cuerpo)
+
+    async def _despachar(self, metodo, ruta, cuerpo):
+        partes = urlsplit(ruta)
+        parametros = {clave: valores[-1] for clave, valores in parse_qs(partes.query).items()}
+        try:
+            encontrada = False
+            for metodo_ruta, patron, manejador in self._rutas:
+                coincidencia = patron.fullmatch(partes.path)
+                if not coincidencia:
+                    continue
+                encontrada = True
+                if metodo == "OPTIONS":
+                    return 204, None
+                if metodo_ruta != metodo:
+                    continue
+                argumentos = [int(grupo) for grupo in coincidencia.groups()]
+                if metodo in ("POST", "PUT"):
+                    argumentos.append(self._leer_json(cuerpo))
+                else:
+                    argumentos.append(parametros)
+                return await manejador(*argumentos)
+            if encontrada:
+                return 405, {"error": f"Método {metodo} no permitido en {partes.path}"}
+            return 404, {"error": f"No existe la ruta {partes.path}"}
+        except ErrorPeticion as e:
+            return e.estado, {"error": str(e)}
+        except ErrorStock as e:
+            return 409, {"error": str(e),
+                         "productos": [a_diccionario(COLUMNAS["productos"], fila) for fila in e.productos]}
+        except ErrorNegocio as e:
+            return 409, {"error": str(e)}
+        except ErrorPool as e:
+            return 503, {"error": str(e)}
+        except Exception as e:
+            traceback.print_exc()
+            return 500, {"error": f"Error inesperado: {e}"}
+
+    @staticmethod
+    def _leer_json(cuerpo):
+        try:
+            datos = json.loads(cuerpo or b"{}")
+        except ValueError:
+            raise ErrorPeticion(400, "El cuerpo no es JSON válido")
+        if not isinstance(datos, dict):
+            raise ErrorPeticion(400, "Se esperaba un objeto JSON")
+        return datos
+
+    # -------------------------
+    # PAGINACIÓN
+    # -------------------------
+    async def _listar(self, entidad, contar, pagina, parametros):
+        desde = _entero(parametros.get("desde", 0), "desde")
+        cantidad = min(_entero(parametros.get("cantidad", POR_PAGINA), "cantidad", 1),
+                       self.max_por_pagina)
+        total, filas = await self.en_bd(_pagina, contar, pagina, desde, cantidad)
+        return 200, {
+            "total": total,
+            "desde": desde,
+            "cantidad": len(filas),
+            "filas": [a_diccionario(COLUMNAS[entidad], fila) for fila in filas],
+        }
+
+    # -------------------------
+    # CLIENTES
+    # -------------------------
+    @staticmethod
+    def _cliente(datos):
+        # validacion.py recibe textos: un DNI puede llegar como numero JSON
+        campos = {campo: None if valor is None else str(valor) for campo, valor in datos.items()}
+        try:
+            return cliente_desde_campos(**campos)
+        except TypeError:
+            raise ErrorPeticion(400, "Campos de cliente desconocidos")
+        except ErrorNegocio as e:
+            raise ErrorPeticion(400, str(e))
+
+    async def listar_clientes(self, parametros):
+        return await self._listar("clientes", consultas.contar_clientes,
+                                  consultas.pagina_clientes, parametros)
+
+    async def crear_cliente(self, datos):
+        fila = await self.en_bd(consultas.insertar_cliente, self._cliente(datos))
+        self.motor_reporte.invalidar()
+        return 201, a_diccionario(COLUMNAS["clientes"], fila)
+
+    async def actualizar_cliente(self, id_cliente, datos):
+        fila = await self.en_bd(consultas.actualizar_cliente, id_cliente, self._cliente(datos))
+        self.motor_reporte.invalidar()
+        return 200, a_diccionario(COLUMNAS["clientes"], fila)
+
+    async def eliminar_cliente(self, id_cliente, parametros):
+        await self.en_bd(consultas.eliminar_cliente, id_cliente)
+        self.motor_reporte.invalidar()
+        return 204, None
+
+    # -------------------------
+    # PRODUCTOS
+    # -------------------------
+    @staticmethod
+    def _producto(datos):
+        campos = {campo: datos.get(campo) for campo in ("nombre", "categoria", "marca", "precio", "stock")}
+        # validacion.py recibe textos, como llegan de un Entry
+        campos = {campo: None if valor is None else str(valor) for campo, valor in campos.items()}
+        try:
+            return producto_desde_campos(**campos)
+        except ErrorNegocio as e:
+            raise ErrorPeticion(400, str(e))
+
+    async def listar_productos(self, parametros):
+        return await self._listar("productos", consultas.contar_productos,
+                                  consultas.pagina_productos, parametros)
+
+    async def crear_producto(self, datos):
+        fila = await self.en_bd(consultas.insertar_producto, self._producto(datos))
+        self.motor_reporte.invalidar()
+        return 201, a_diccionario(COLUMNAS["productos"], fila)
+
+    async def actualizar_producto(self, id_producto, datos):
+        fila = await self.en_bd(consultas.actualizar_producto, id_producto, self._producto(datos))
+        self.motor_reporte.invalidar()
+        return 200, a_diccionario(COLUMNAS["productos"], fila)
+
+    async def eliminar_producto(self, id_producto, parametros):
+        await self.en_bd(consultas.eliminar_producto, id_producto)
+        self.motor_reporte.invalidar()
+        return 204, None
+
+    # -------------------------
+    # VENTAS
+    # -------------------------
+    async def listar_ventas(self, parametros):
+        return await self._listar("ventas", consultas.contar_ventas,
+                                  consultas.pagina_ventas, parametros)
+
+    async def crear_venta(self, datos):
+        id_cliente = datos.get("id_cliente")
+        if id_cliente is not None:
+            id_cliente = _entero(id_cliente, "id_cliente", 1)
+        try:
+            total = Decimal(str(datos.get("total")))
+        except InvalidOperation:
+            raise ErrorPeticion(400, "El total debe ser un valor numérico")
+        if not total.is_finite() or total <= 0:
+            raise ErrorPeticion(400, "El total debe ser mayor a 0")
+        fila = await self.en_bd(_crear_venta, id_cliente, total)
+        self.motor_reporte.invalidar()
+        return 201, a_diccionario(COLUMNAS["ventas"], fila)
+
+    # -------------------------
+    # PEDIDOS
+    # -------------------------
+    async def listar_pedidos(self, parametros):
+        return await self._listar("pedidos", consultas.contar_pedidos,
+                                  consultas.pagina_pedidos, parametros)
+
+    async def crear_pedido(self, datos):
+        id_cliente = datos.get("id_cliente")
+        if id_cliente is not None:
+            id_cliente = _entero(id_cliente, "id_cliente", 1)
+        lineas = datos.get("lineas")
+        if not isinstance(lineas, list) or not lineas:
+            raise ErrorPeticion(400, "El pedido no tiene productos")
+        cantidades = {}
+        for linea in lineas:
+            if not isinstance(linea, dict):
+                raise ErrorPeticion(400, "Cada línea debe tener id_producto y cantidad")
+            id_producto = _entero(linea.get("id_producto"), "id_producto", 1)
+            cantidades[id_producto] = (cantidades.get(id_producto, 0)
+                                       + _entero(linea.get("cantidad"), "cantidad", 1))
+        pedido, lineas = await self.en_bd(_crear_pedido, id_cliente, cantidades)
+        self.motor_reporte.invalidar()
+        return 201, self._pedido(pedido, lineas)
+
+    async def ver_pedido(self, id_pedido, parametros):
+        pedido, lineas = await self.en_bd(consultas.obtener_pedido, id_pedido)
+        if pedido is None:
+            raise ErrorPeticion(404, f"No existe el pedido {id_pedido}")
+        return 200, self._pedido(pedido, lineas)
+
+    @staticmethod
+    def _pedido(pedido, lineas):
+        datos = a_diccionario(COLUMNAS["pedidos"], pedido)
+        datos["lineas"] = [a_diccionario(COLUMNAS["lineas_pedido"], linea) for linea in lineas]
+        return datos
+
+    # -------------------------
+    # REPORTE Y SALUD
+    # -------------------------
+    async def ver_reporte(self, parametros):
+        datos = self.motor_reporte.en_cache()
+        if datos is None:
+            bucle = asyncio.get_running_loop()
+            datos = await bucle.run_in_executor(self._hilos, self.motor_reporte.generar)
+        return 200, {clave: ([a_diccionario(COLUMNAS[clave], fila) for fila in valor]
+                             if clave in COLUMNAS else valor)
+                     for clave, valor in datos.items()}
+
+    async def ver_salud(self, parametros):
+        return 200, self.pool.estadisticas()
+
+
+def crear_pool(argumentos):
+    if argumentos.sqlite:
+        import sqlite_local
+        conexion = sqlite_local.conectar(argumentos.sqlite)
+        sqlite_local.crear_esquema(conexion, con_ejemplos=argumentos.ejemplos)
+        conexion.close()
+        return PoolConexiones(partial(sqlite_local.conectar, argumentos.sqlite),
+                              tamano_maximo=argumentos.conexiones)
+    import pyodbc
+    return PoolConexiones(partial(pyodbc.connect, argumentos.odbc),
+                          tamano_maximo=argumentos.conexiones)
+
+async def principal(argumentos):
+    servicio = ServicioTiendas(crear_pool(argumentos))
+    servidor = await servicio.iniciar(argumentos.host, argumentos.puerto)
+    print(f"Servicio escuchando en http://{argumentos.host}:{argumentos.puerto}")
+    try:
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        await servicio.cerrar()
+
+if __name__ == "__main__":
+    analizador = argparse.ArgumentParser(description="Servicio HTTP/JSON de tiendas")
+    origen = analizador.add_mutually_exclusive_group(required=True)
+    origen.add_argument("--odbc", help="cadena de conexion ODBC a SQL Server")
+    origen.add_argument("--sqlite", help="archivo SQLite local (se crea si no existe)")
+    analizador.add_argument("--ejemplos", action="store_true",
+                            help="con --sqlite, carga filas de ejemplo si la base esta vacia")
+    analizador.add_argument("--host", default="127.0.0.1")
+    analizador.add_argument("--puerto", type=int, default=8080)
+    analizador.add_argument("--conexiones", type=int, default=5, help="tamaño del pool")
+    try:
+        asyncio.run(principal(analizador.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,321 @@
+import re
+import sqlite3
+from decimal import Decimal
+
+# =========================
+# BASE LOCAL SQLITE
+# =========================
+# Sustituto de SQL Server para probar sin servidor (servicio_http.py
+# --sqlite). Las consultas de consultas.py se escriben en T-SQL; el cursor
+# de este modulo traduce al vuelo el subconjunto que usan (OUTPUT INSERTED,
+# TOP, OFFSET/FETCH, concatenacion con +, GETDATE, NOEXPAND, versiones de
+# fila) y acepta los mismos parametros que pyodbc, asi la capa de datos no
+# cambia.
+# Las tablas temporales #... (importacion de clientes) no tienen
+# equivalente y no se traducen.
+
+_OUTPUT = re.compile(r"\bOUTPUT\s+(INSERTED\.\w+(?:\s*,\s*INSERTED\.\w+)*)\s*", re.IGNORECASE)
+_TOP = re.compile(r"\bSELECT\s+TOP\s+(\d+)\s+", re.IGNORECASE)
+_PAGINA = re.compile(r"\bOFFSET\s+\?\s+ROWS\s+FETCH\s+NEXT\s+\?\s+ROWS\s+ONLY\b", re.IGNORECASE)
+_NOEXPAND = re.compile(r"\s+WITH\s*\(\s*NOEXPAND\s*\)", re.IGNORECASE)
+_CONCATENAR = re.compile(r"\+\s*' '\s*\+")
+_GETDATE = re.compile(r"\bGETDATE\(\)", re.IGNORECASE)
+_VERSION_ACTIVA = re.compile(r"\bCAST\(\s*MIN_ACTIVE_ROWVERSION\(\)\s+AS\s+BIGINT\s*\)", re.IGNORECASE)
+_VERSION_PARAMETRO = re.compile(r"\bCAST\(\s*CAST\(\s*\?\s+AS\s+BIGINT\s*\)\s+AS\s+BINARY\(8\)\s*\)",
+                                re.IGNORECASE)
+
+
+def traducir(consulta):
+    # Devuelve (consulta_sqlite, invertir) donde invertir indica que los dos
+    # ultimos parametros (desde, cantidad) van como LIMIT ? OFFSET ?
+    consulta = _NOEXPAND.sub("", consulta)
+    consulta = _CONCATENAR.sub("|| ' ' ||", consulta)
+    consulta = _GETDATE.sub("DATE('now')", consulta)
+    # SQLite escribe de a una transaccion: todo lo leido ya esta confirmado
+    consulta = _VERSION_ACTIVA.sub("(SELECT valor + 1 FROM contador_version)", consulta)
+    consulta = _VERSION_PARAMETRO.sub("?", consulta)
+    consulta, invertir = _PAGINA.subn("LIMIT ? OFFSET ?", consulta)
+
+    salida = _OUTPUT.search(consulta)
+    if salida:
+        columnas = salida.group(1).replace("INSERTED.", "")
+        consulta = consulta[:salida.start()] + consulta[salida.end():]
+        consulta = consulta.rstrip().rstrip(";") + f" RETURNING {columnas}"
+
+    limite = _TOP.search(consulta)
+    if limite:
+        consulta = consulta[:limite.start()] + "SELECT " + consulta[limite.end():]
+        consulta = consulta.rstrip().rstrip(";") + f" LIMIT {limite.group(1)}"
+    return consulta, bool(invertir)
+
+def _valor(valor):
+    # Decimal viaja como texto y las columnas NUMERIC lo guardan como numero.
+    # Se convierte aqui y no con sqlite3.register_adapter, que cambiaria a
+    # todo el que use sqlite3 en el proceso (instantanea.py, por ejemplo).
+    return str(valor) if isinstance(valor, Decimal) else valor
+
+def _parametros(parametros):
+    # pyodbc acepta un valor suelto en lugar de una tupla
+    if parametros is None:
+        return ()
+    if isinstance(parametros, (list, tuple)):
+        return tuple(map(_valor, parametros))
+    return (_valor(parametros),)
+
+
+class CursorLocal:
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.fast_executemany = False  # sin efecto en SQLite
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def execute(self, consulta, *parametros):
+        if len(parametros) == 1:
+            parametros = _parametros(parametros[0])
+        else:
+            parametros = _parametros(parametros)
+        consulta, invertir = traducir(consulta)
+        if invertir:
+            parametros = parametros[:-2] + (parametros[-1], parametros[-2])
+        self._cursor.execute(consulta, parametros)
+        return self
+
+    def executemany(self, consulta, filas):
+        consulta, _ = traducir(consulta)
+        self._cursor.executemany(consulta, (_parametros(fila) for fila in filas))
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchmany(self, tamano):
+        return self._cursor.fetchmany(tamano)
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def nextset(self):
+        return False
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+
+class ConexionLocal:
+    def __init__(self, conexion):
+        self._conexion = conexion
+
+    def cursor(self):
+        return CursorLocal(self._conexion.cursor())
+
+    def commit(self):
+        self._conexion.commit()
+
+    def rollback(self):
+        self._conexion.rollback()
+
+    def close(self):
+        self._conexion.close()
+
+
+def conectar(ruta, espera=5.0):
+    # Una conexion por hilo a la vez (la reparte PoolConexiones); WAL deja
+    # leer mientras otra conexion escribe.
+    conexion = sqlite3.connect(ruta, timeout=espera, check_same_thread=False)
+    conexion.execute("PRAGMA journal_mode=WAL")
+    conexion.execute("PRAGMA foreign_keys=ON")
+    return ConexionLocal(conexion)
+
+
+# ESQUEMA
+# Las tablas de SQLQueryDB.tiendas.sql con las migraciones ya aplicadas.
+# Los resumenes son vistas comunes: SQLite no tiene vistas indexadas.
+ESQUEMA = """
+    CREATE TABLE IF NOT EXISTS clientes (
+        id_cliente INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        apellido TEXT,
+        dni TEXT,
+        telefono TEXT,
+        correo TEXT,
+        direccion TEXT,
+        nombre_completo TEXT GENERATED ALWAYS AS (nombre || ' ' || apellido) STORED,
+        version INTEGER
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS UX_clientes_dni ON clientes (dni) WHERE dni IS NOT NULL;
+    CREATE INDEX IF NOT EXISTS IX_clientes_nombre_completo ON clientes (nombre_completo);
+
+    CREATE TABLE IF NOT EXISTS productos (
+        id_producto INTEGER PRIMARY KEY AUTOINCREMENT,
+        nombre TEXT,
+        categoria TEXT,
+        marca TEXT,
+        precio NUMERIC,
+        stock INTEGER,
+        version INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS IX_productos_stock ON productos (stock);
+
+    CREATE TABLE IF NOT EXISTS presentacion (
+        id_presentacion INTEGER PRIMARY KEY AUTOINCREMENT,
+        tipo TEXT,
+        descripcion TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS pedido (
+        id_pedido INTEGER PRIMARY KEY AUTOINCREMENT,
+        fecha TEXT,
+        total NUMERIC,
+        version INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS IX_pedido_fecha ON pedido (fecha DESC, id_pedido DESC);
+
+    CREATE TABLE IF NOT EXISTS clienPedido (
+        id_cliente INTEGER REFERENCES clientes (id_cliente),
+        id_pedido INTEGER REFERENCES pedido (id_pedido),
+        PRIMARY KEY (id_cliente, id_pedido)
+    );
+    CREATE INDEX IF NOT EXISTS IX_clienPedido_id_pedido ON clienPedido (id_pedido);
+
+    CREATE TABLE IF NOT EXISTS productoXpresentacion (
+        id_producto INTEGER REFERENCES productos (id_producto),
+        id_presentacion INTEGER REFERENCES presentacion (id_presentacion),
+        PRIMARY KEY (id_producto, id_presentacion)
+    );
+
+    CREATE TABLE IF NOT EXISTS clienXproducto (
+        id_cliente INTEGER,
+        id_producto INTEGER REFERENCES productos (id_producto),
+        cantidad INTEGER,
+        fecha TEXT,
+        PRIMARY KEY (id_cliente, id_producto)
+    );
+
+    CREATE TABLE IF NOT EXISTS ventas (
+        id_venta INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_cliente INTEGER REFERENCES clientes (id_cliente),
+        fecha TEXT DEFAULT (DATE('now')),
+        total NUMERIC,
+        version INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS IX_ventas_fecha ON ventas (fecha DESC, id_venta DESC);
+    CREATE INDEX IF NOT EXISTS IX_ventas_id_cliente ON ventas (id_cliente);
+
+    CREATE TABLE IF NOT EXISTS detalle_venta (
+        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_venta INTEGER REFERENCES ventas (id_venta),
+        id_producto INTEGER REFERENCES productos (id_producto),
+        cantidad INTEGER,
+        subtotal NUMERIC
+    );
+    CREATE INDEX IF NOT EXISTS IX_detalle_venta_id_producto ON detalle_venta (id_producto);
+
+    CREATE TABLE IF NOT EXISTS detalle_pedido (
+        id_detalle INTEGER PRIMARY KEY AUTOINCREMENT,
+        id_pedido INTEGER NOT NULL REFERENCES pedido (id_pedido),
+        id_producto INTEGER NOT NULL REFERENCES productos (id_producto),
+        cantidad INTEGER NOT NULL,
+        precio NUMERIC NOT NULL,
+        subtotal NUMERIC NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS IX_detalle_pedido_id_pedido ON detalle_pedido (id_pedido);
+    CREATE INDEX IF NOT EXISTS IX_detalle_pedido_id_producto ON detalle_pedido (id_producto);
+
+    CREATE TABLE IF NOT EXISTS operaciones_aplicadas (
+        clave TEXT NOT NULL PRIMARY KEY,
+        tipo TEXT NOT NULL,
+        id_resultado INTEGER NOT NULL,
+        aplicada TEXT DEFAULT (DATETIME('now'))
+    );
+
+    CREATE VIEW IF NOT EXISTS resumen_ventas_diarias AS
+        SELECT fecha, COUNT(*) AS ventas, SUM(IFNULL(total, 0)) AS ingresos
+        FROM ventas GROUP BY fecha;
+    CREATE VIEW IF NOT EXISTS resumen_pedidos_diarios AS
+        SELECT fecha, COUNT(*) AS pedidos, SUM(IFNULL(total, 0)) AS monto
+        FROM pedido GROUP BY fecha;
+    CREATE VIEW IF NOT EXISTS resumen_unidades_producto AS
+        SELECT id_producto, COUNT(*) AS lineas, SUM(IFNULL(cantidad, 0)) AS unidades
+        FROM detalle_venta GROUP BY id_producto;
+    CREATE VIEW IF NOT EXISTS resumen_compras_cliente AS
+        SELECT id_cliente, COUNT(*) AS compras
+        FROM ventas GROUP BY id_cliente;
+"""
+
+# SEGUIMIENTO DE CAMBIOS (migracion 0004)
+# SQLite no tiene ROWVERSION: un contador global y triggers que asignan el
+# valor siguiente a cada fila insertada o modificada. El WHEN evita que el
+# trigger de UPDATE se dispare con la propia asignacion de la version.
+TABLAS_CON_VERSION = {"clientes": "id_cliente", "productos": "id_producto",
+                      "ventas": "id_venta", "pedido": "id_pedido"}
+
+SEGUIMIENTO = """
+    CREATE TABLE IF NOT EXISTS contador_version (valor INTEGER NOT NULL);
+    INSERT INTO contador_version SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM contador_version);
+
+    CREATE TABLE IF NOT EXISTS eliminaciones (
+        id_eliminacion INTEGER PRIMARY KEY AUTOINCREMENT,
+        tabla TEXT NOT NULL,
+        clave INTEGER NOT NULL,
+        fecha TEXT DEFAULT (DATETIME('now')),
+        version INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS IX_eliminaciones_version ON eliminaciones (version);
+""" + "".join(f"""
+    CREATE INDEX IF NOT EXISTS IX_{tabla}_version ON {tabla} (version);
+    CREATE TRIGGER IF NOT EXISTS TR_{tabla}_version_alta AFTER INSERT ON {tabla} BEGIN
+        UPDATE contador_version SET valor = valor + 1;
+        UPDATE {tabla} SET version = (SELECT valor FROM contador_version) WHERE {clave} = NEW.{clave};
+    END;
+    CREATE TRIGGER IF NOT EXISTS TR_{tabla}_version_cambio AFTER UPDATE ON {tabla}
+    WHEN NEW.version IS OLD.version BEGIN
+        UPDATE contador_version SET valor = valor + 1;
+        UPDATE {tabla} SET version = (SELECT valor FROM contador_version) WHERE {clave} = NEW.{clave};
+    END;
+    CREATE TRIGGER IF NOT EXISTS TR_{tabla}_eliminacion AFTER DELETE ON {tabla} BEGIN
+        UPDATE contador_version SET valor = valor + 1;
+        INSERT INTO eliminaciones (tabla, clave, version)
+        VALUES ('{tabla}', OLD.{clave}, (SELECT valor FROM contador_version));
+    END;
+""" for tabla, clave in TABLAS_CON_VERSION.items())
+
+# Algunas filas de SQLQueryDB.tiendas.sql para tener algo que mostrar
+CLIENTES_EJEMPLO = [
+    ("Luis", "Torres", "70581234", "987654321", "luis.torres@gmail.com", "Av. Los Incas 123"),
+    ("María", "Lopez", "70981235", "945672123", "maria.lopez@hotmail.com", "Calle Cusco 234"),
+    ("Carlos", "Perez", "71981236", "912345678", "carlos.perez@yahoo.com", "Jr. Grau 321"),
+    ("Lucía", "Gomez", "72981237", "911223344", "lucia.gomez@gmail.com", "Av. Los Andes 456"),
+    ("Pedro", "Ramos", "73981238", "999888777", "pedro.ramos@gmail.com", "Calle Lima 654"),
+]
+PRODUCTOS_EJEMPLO = [
+    ("Laptop HP Pavilion", "Computadora", "HP", 2800.00, 10),
+    ("Mouse Logitech M90", "Periférico", "Logitech", 45.00, 50),
+    ("Teclado Redragon Kumara", "Periférico", "Redragon", 150.00, 25),
+    ("Monitor Samsung 24\"", "Pantalla", "Samsung", 600.00, 15),
+    ("SSD Kingston 480GB", "Almacenamiento", "Kingston", 200.00, 30),
+    ("Procesador Ryzen 5 5600G", "Componente", "AMD", 950.00, 8),
+]
+
+def crear_esquema(conexion, con_ejemplos=False):
+    # conexion: la de conectar(); no hace nada si las tablas ya existen
+    nativa = conexion._conexion
+    nativa.executescript(ESQUEMA)
+    # Archivos creados antes de la columna version
+    for tabla in TABLAS_CON_VERSION:
+        columnas = [fila[1] for fila in nativa.execute(f"PRAGMA table_info({tabla})")]
+        if "version" not in columnas:
+            nativa.execute(f"ALTER TABLE {tabla} ADD COLUMN version INTEGER")
+    nativa.executescript(SEGUIMIENTO)
+    if con_ejemplos and not nativa.execute("SELECT 1 FROM clientes LIMIT 1").fetchone():
+        nativa.executemany("""
+            INSERT INTO clientes (nombre, apellido, dni, telefono, correo, direccion)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, CLIENTES_EJEMPLO)
+        nativa.executemany("""
+            INSERT INTO productos (nombre, categoria, marca, precio, stock)
+            VALUES (?, ?, ?, ?, ?)
+        """, PRODUCTOS_EJEMPLO)
+    nativa.commit()
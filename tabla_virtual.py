@@ -0,0 +1,411 @@
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+
+import modelo
+
+# =========================
+# TABLA VIRTUAL (PAGINADA)
+# =========================
+# Treeview que solo crea los items visibles en pantalla. Las filas se piden
+# por paginas a una fuente de datos a medida que el usuario se desplaza, de
+# modo que el tamaño de la tabla no afecta ni al tiempo de dibujo ni a la
+# memoria de Tk.
+#
+# La fuente se entrega como dos funciones asincronas:
+#   obtener_total(entregar)                  -> entregar(total)
+#   obtener_pagina(desde, cantidad, entregar) -> entregar(filas)
+# "entregar" debe llamarse en el hilo de Tk (por ejemplo desde EjecutorTk).
+# Las filas conservan sus valores tipados; el Treeview solo recibe el texto
+# de las filas visibles (modelo.texto).
+#
+# Con al_ordenar, un clic en un encabezado alterna orden ascendente,
+# descendente y el original de la fuente, y avisa al_ordenar(orden) con
+# (indice_columna, descendente) o None; ordenar es tarea de la fuente.
+
+class TablaVirtual(ttk.Frame):
+    def __init__(self, padre, columnas, obtener_total, obtener_pagina,
+                 ancho_columna=120, alto=12, tamano_pagina=100, paginas_en_memoria=10,
+                 al_ordenar=None):
+        super().__init__(padre)
+        self.columnas = columnas
+        self._obtener_total = obtener_total
+        self._obtener_pagina = obtener_pagina
+        self.tamano_pagina = tamano_pagina
+        self.paginas_en_memoria = paginas_en_memoria
+
+        self.total = 0
+        self.inicio = 0              # indice de la primera fila visible
+        self.visibles = alto         # cantidad de filas que caben en pantalla
+        self._paginas = OrderedDict()  # numero de pagina -> lista de filas (LRU)
+        self._pedido_en_curso = None   # (primera_pagina, ultima_pagina)
+        self._generacion = 0
+        self._version_paginas = 0
+        self._clave_seleccionada = None
+        self._fila_seleccionada = None
+        self.desactualizada = False  # filas guardadas, aun sin confirmar con la fuente
+        self.orden = None  # (indice_columna, descendente) elegido en los encabezados
+        self._al_ordenar = al_ordenar
+
+        self.arbol = ttk.Treeview(self, columns=columnas, show="headings",
+                                  height=alto, selectmode="browse")
+        for indice, col in enumerate(columnas):
+            self.arbol.heading(col, text=col)
+            if al_ordenar is not None:
+                self.arbol.heading(col, command=lambda indice=indice: self._clic_encabezado(indice))
+            self.arbol.column(col, width=ancho_columna)
+        self.arbol.tag_configure("desactualizada", foreground="gray55")
+
+        self.barra = ttk.Scrollbar(self, orient="vertical", command=self._desplazar)
+        self.barra.pack(side="right", fill="y")
+        self.arbol.pack(fill="both", expand=True)
+
+        self.arbol.bind("<<TreeviewSelect>>", self._al_seleccionar)
+        self.arbol.bind("<Configure>", self._al_redimensionar)
+        self.arbol.bind("<MouseWheel>", self._rueda)
+        self.arbol.bind("<Button-4>", lambda e: self._mover(-3))
+        self.arbol.bind("<Button-5>", lambda e: self._mover(3))
+        self.arbol.bind("<Up>", lambda e: self._mover_seleccion(-1))
+        self.arbol.bind("<Down>", lambda e: self._mover_seleccion(1))
+        self.arbol.bind("<Prior>", lambda e: self._mover(-self.visibles))
+        self.arbol.bind("<Next>", lambda e: self._mover(self.visibles))
+        self.arbol.bind("<Home>", lambda e: self._ir_a(0))
+        self.arbol.bind("<End>", lambda e: self._ir_a(self.total))
+
+    # -------------------------
+    # API PUBLICA
+    # -------------------------
+    def recargar(self):
+        # Descarta todo lo cacheado y vuelve a pedir el total y la vista actual
+        self._generacion += 1
+        self._descartar_paginas(0)
+        generacion = self._generacion
+        self._obtener_total(lambda total: self._recibir_total(generacion, total))
+
+    def precargar(self, total, filas, desde=0, desactualizada=False):
+        # Usa datos ya traidos por otra consulta (o guardados en una
+        # instantanea, con desactualizada=True) en lugar de pedir el total y
+        # la primera pagina
+        self._generacion += 1
+        self._descartar_paginas(0)
+        self.total = total
+        self.desactualizada = desactualizada
+        self._guardar_filas(desde, filas)
+        self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+        self._dibujar()
+
+    def cambiar_fuente(self, obtener_total, obtener_pagina):
+        # Otra fuente para las mismas columnas (la lista ordenada en memoria
+        # en lugar de la base, por ejemplo); se vuelve a pedir todo
+        self._obtener_total = obtener_total
+        self._obtener_pagina = obtener_pagina
+        self.recargar()
+
+    def marcar_desactualizada(self):
+        # Las filas se ven en gris hasta que la fuente entregue el proximo total
+        self.desactualizada = True
+        self._dibujar()
+
+    def fila(self, indice):
+        pagina = self._paginas.get(indice // self.tamano_pagina)
+        if pagina is None:
+            return None
+        posicion = indice % self.tamano_pagina
+        return pagina[posicion] if posicion < len(pagina) else None
+
+    def indice_de(self, clave):
+        # Posicion de la fila si esta en alguna pagina en memoria, o None
+        return self._buscar(clave)
+
+    def fila_seleccionada(self):
+        return self._fila_seleccionada
+
+    def limpiar_seleccion(self):
+        self._clave_seleccionada = None
+        self._fila_seleccionada = None
+        self.arbol.selection_remove(self.arbol.selection())
+
+    # -------------------------
+    # CAMBIOS PUNTUALES
+    # -------------------------
+    # Tras un alta, modificacion o baja se corrige solo la fila afectada en
+    # las paginas cacheadas, sin volver a consultar la tabla completa.
+    def insertar_fila(self, fila, indice=None):
+        # indice: posicion que ocupa la fila en el orden de la consulta
+        # (por defecto al final, como un id nuevo en una tabla ordenada por id)
+        indice = self.total if indice is None else indice
+        self._reemplazar_tramo(indice, self.total + 1, lambda filas, posicion: filas.insert(posicion, fila))
+        self.total += 1
+        self._dibujar()
+
+    def actualizar_fila(self, fila):
+        indice = self._buscar(fila[0])
+        if indice is not None:
+            pagina = self._paginas[indice // self.tamano_pagina]
+            pagina[indice % self.tamano_pagina] = fila
+        if fila[0] == self._clave_seleccionada:
+            self._fila_seleccionada = fila
+        self._dibujar()
+
+    def eliminar_fila(self, clave):
+        indice = self._buscar(clave)
+        if indice is None:
+            # No esta en memoria: no se sabe que paginas se corren, se descartan
+            self._descartar_paginas(0)
+        else:
+            self._reemplazar_tramo(indice, self.total - 1, lambda filas, posicion: filas.pop(posicion))
+        self.total = max(0, self.total - 1)
+        if clave == self._clave_seleccionada:
+            self.limpiar_seleccion()
+        self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+        self._dibujar()
+
+    def aplicar_cambios(self, filas, eliminadas=()):
+        # Cambios traidos por la sincronizacion. Las filas que estan en
+        # memoria se corrigen en su lugar; si alguna no esta (un alta de otro
+        # terminal, o una fila de una pagina no cargada) no se sabe en que
+        # posicion va, y se vuelve a pedir el total y la vista actual.
+        # Devuelve cuantas filas cambiaron.
+        cambios = 0
+        recargar = False
+        for fila in filas:
+            indice = self._buscar(fila[0])
+            if indice is None:
+                recargar = True
+                cambios += 1
+                continue
+            pagina = self._paginas[indice // self.tamano_pagina]
+            if tuple(pagina[indice % self.tamano_pagina]) != tuple(fila):
+                pagina[indice % self.tamano_pagina] = fila
+                if fila[0] == self._clave_seleccionada:
+                    self._fila_seleccionada = fila
+                cambios += 1
+        for clave in eliminadas:
+            if recargar or self._buscar(clave) is None:
+                recargar = True
+            else:
+                self.eliminar_fila(clave)
+            cambios += 1
+        if recargar:
+            self.recargar()
+        elif cambios:
+            self._dibujar()
+        return cambios
+
+    def _buscar(self, clave):
+        for numero, pagina in self._paginas.items():
+            for posicion, fila in enumerate(pagina):
+                if fila[0] == clave:
+                    return numero * self.tamano_pagina + posicion
+        return None
+
+    def _reemplazar_tramo(self, indice, nuevo_total, cambio):
+        # Aplica el cambio sobre las paginas cacheadas contiguas desde la del
+        # indice; como las filas siguientes se corren una posicion, las
+        # paginas que quedan despues de un hueco ya no son validas.
+        primera = indice // self.tamano_pagina
+        if primera not in self._paginas:
+            self._descartar_paginas(primera)
+            return
+        ultima = primera
+        while ultima + 1 in self._paginas:
+            ultima += 1
+        filas = []
+        for numero in range(primera, ultima + 1):
+            filas.extend(self._paginas[numero])
+        cambio(filas, indice - primera * self.tamano_pagina)
+        self._descartar_paginas(primera)
+        for numero in range(primera, ultima + 1):
+            inicio = (numero - primera) * self.tamano_pagina
+            pagina = filas[inicio:inicio + self.tamano_pagina]
+            # Una pagina incompleta que no es la ultima de la tabla perdio
+            # filas que viven en la pagina siguiente: hay que volver a pedirla
+            if len(pagina) == self.tamano_pagina or (numero + 1) * self.tamano_pagina >= nuevo_total:
+                self._paginas[numero] = pagina
+
+    def _descartar_paginas(self, desde_pagina):
+        for numero in [n for n in self._paginas if n >= desde_pagina]:
+            del self._paginas[numero]
+        # Las paginas que estaban en camino ya no coinciden con las posiciones
+        self._version_paginas += 1
+        self._pedido_en_curso = None
+
+    # -------------------------
+    # CARGA DE DATOS
+    # -------------------------
+    def _recibir_total(self, generacion, total):
+        if generacion != self._generacion:
+            return
+        self.total = total
+        self.desactualizada = False
+        self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+        self._dibujar()
+
+    def _recibir_filas(self, version, primera_pagina, ultima_pagina, filas):
+        if version != self._version_paginas:
+            return
+        if self._pedido_en_curso == (primera_pagina, ultima_pagina):
+            self._pedido_en_curso = None
+        desde = primera_pagina * self.tamano_pagina
+        self._guardar_filas(desde, filas)
+        # Si llegaron menos filas de las esperadas la tabla se achico mientras tanto
+        esperadas = min(self.total, (ultima_pagina + 1) * self.tamano_pagina) - desde
+        if len(filas) < esperadas:
+            self.total = desde + len(filas)
+        self._dibujar()
+
+    def _guardar_filas(self, desde, filas):
+        # "desde" siempre es el inicio de una pagina
+        primera = desde // self.tamano_pagina
+        for inicio in range(0, len(filas), self.tamano_pagina):
+            self._guardar_pagina(primera + inicio // self.tamano_pagina,
+                                 list(filas[inicio:inicio + self.tamano_pagina]))
+
+    def _guardar_pagina(self, numero, filas):
+        self._paginas[numero] = filas
+        self._paginas.move_to_end(numero)
+        while len(self._paginas) > self.paginas_en_memoria:
+            self._paginas.popitem(last=False)
+
+    def _pedir_faltantes(self):
+        if self.total == 0:
+            return
+        # Se piden las paginas visibles y una pantalla de margen a cada lado
+        margen = self.visibles
+        primera = max(0, self.inicio - margen) // self.tamano_pagina
+        ultima = min(self.total - 1, self.inicio + self.visibles + margen) // self.tamano_pagina
+        faltantes = [n for n in range(primera, ultima + 1) if n not in self._paginas]
+        for numero in range(primera, ultima + 1):
+            if numero in self._paginas:
+                self._paginas.move_to_end(numero)
+        if not faltantes:
+            return
+        rango = (faltantes[0], faltantes[-1])
+        if self._pedido_en_curso is not None and \
+                self._pedido_en_curso[0] <= rango[0] and rango[1] <= self._pedido_en_curso[1]:
+            return
+        self._pedido_en_curso = rango
+        version = self._version_paginas
+        desde = rango[0] * self.tamano_pagina
+        cantidad = (rango[1] - rango[0] + 1) * self.tamano_pagina
+        self._obtener_pagina(desde, cantidad,
+                             lambda filas: self._recibir_filas(version, rango[0], rango[1], filas))
+
+    # -------------------------
+    # DIBUJO
+    # -------------------------
+    @staticmethod
+    def formatear(fila):
+        return [modelo.texto(valor) for valor in fila]
+
+    def _dibujar(self):
+        existentes = self.arbol.get_children()
+        cantidad = max(0, min(self.visibles, self.total - self.inicio))
+        seleccion = None
+        etiquetas = ("desactualizada",) if self.desactualizada else ()
+        for i in range(cantidad):
+            iid = f"f{i}"
+            fila = self.fila(self.inicio + i)
+            if fila is None:
+                valores = ["…", "Cargando..."]
+            else:
+                valores = self.formatear(fila)
+                if fila[0] == self._clave_seleccionada:
+                    seleccion = iid
+                    self._fila_seleccionada = fila
+            if i < len(existentes):
+                self.arbol.item(iid, values=valores, tags=etiquetas)
+            else:
+                self.arbol.insert("", tk.END, iid=iid, values=valores, tags=etiquetas)
+        for iid in existentes[cantidad:]:
+            self.arbol.delete(iid)
+
+        actual = self.arbol.selection()
+        if seleccion is None and actual:
+            self.arbol.selection_remove(actual)
+        elif seleccion is not None and actual != (seleccion,):
+            self.arbol.selection_set(seleccion)
+
+        if self.total:
+            self.barra.set(self.inicio / self.total, (self.inicio + cantidad) / self.total)
+        else:
+            self.barra.set(0, 1)
+        self._pedir_faltantes()
+
+    # -------------------------
+    # ORDEN
+    # -------------------------
+    def _clic_encabezado(self, indice):
+        if self.orden is None or self.orden[0] != indice:
+            self.orden = (indice, False)
+        elif not self.orden[1]:
+            self.orden = (indice, True)
+        else:
+            self.orden = None
+        for numero, col in enumerate(self.columnas):
+            flecha = ""
+            if self.orden is not None and self.orden[0] == numero:
+                flecha = " ▼" if self.orden[1] else " ▲"
+            self.arbol.heading(col, text=col + flecha)
+        self.inicio = 0
+        self._al_ordenar(self.orden)
+
+    # -------------------------
+    # DESPLAZAMIENTO
+    # -------------------------
+    def _ir_a(self, indice):
+        indice = max(0, min(int(indice), self.total - self.visibles))
+        if indice != self.inicio:
+            self.inicio = indice
+            self._dibujar()
+        return "break"
+
+    def _mover(self, filas):
+        return self._ir_a(self.inicio + filas)
+
+    def _desplazar(self, accion, cantidad, unidad=None):
+        if accion == "moveto":
+            self._ir_a(float(cantidad) * self.total)
+        elif accion == "scroll":
+            paso = self.visibles if unidad == "pages" else 1
+            self._mover(int(cantidad) * paso)
+
+    def _rueda(self, event):
+        return self._mover(-3 if event.delta > 0 else 3)
+
+    def _mover_seleccion(self, paso):
+        actual = self.arbol.selection()
+        if not actual:
+            return None
+        indice = self.inicio + self.arbol.index(actual[0]) + paso
+        if indice < 0 or indice >= self.total:
+            return "break"
+        if indice < self.inicio:
+            self._ir_a(indice)
+        elif indice >= self.inicio + self.visibles:
+            self._ir_a(indice - self.visibles + 1)
+        fila = self.fila(indice)
+        if fila is not None:
+            self.arbol.selection_set(f"f{indice - self.inicio}")
+            self.arbol.focus(f"f{indice - self.inicio}")
+        return "break"
+
+    def _al_redimensionar(self, event):
+        alto_fila = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        visibles = max(1, (event.height - alto_fila - 5) // alto_fila)
+        if visibles != self.visibles:
+            self.visibles = visibles
+            self.inicio = max(0, min(self.inicio, self.total - self.visibles))
+            self._dibujar()
+
+    def _al_seleccionar(self, event):
+        actual = self.arbol.selection()
+        if not actual:
+            return
+        fila = self.fila(self.inicio + self.arbol.index(actual[0]))
+        if fila is None or fila[0] == self._clave_seleccionada:
+            # Seleccion provocada al redibujar la misma fila: no se notifica
+            return
+        self._clave_seleccionada = fila[0]
+        self._fila_seleccionada = fila
+        self.event_generate("<<SeleccionVirtual>>")
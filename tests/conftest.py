@@ -0,0 +1,36 @@
+import os
+import sys
+from functools import partial
+
+import pytest
+
+# Los modulos viven en la raiz del repositorio, sin paquete
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import sqlite_local
+from pool_conexiones import PoolConexiones
+
+# =========================
+# PRUEBAS SOBRE SQLITE
+# =========================
+# Cada prueba usa su propia base SQLite local (sqlite_local.py) con el
+# esquema completo y los clientes y productos de ejemplo.
+
+
+@pytest.fixture
+def ruta_bd(tmp_path):
+    ruta = str(tmp_path / "tiendas.db")
+    conexion = sqlite_local.conectar(ruta)
+    sqlite_local.crear_esquema(conexion, con_ejemplos=True)
+    conexion.close()
+    return ruta
+
+@pytest.fixture
+def conexion(ruta_bd):
+    conexion = sqlite_local.conectar(ruta_bd)
+    yield conexion
+    conexion.close()
+
+@pytest.fixture
+def pool(ruta_bd):
+    return PoolConexiones(partial(sqlite_local.conectar, ruta_bd), tamano_maximo=2)
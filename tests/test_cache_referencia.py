@@ -0,0 +1,149 @@
+from decimal import Decimal
+
+from cache_referencia import CacheReferencia
+from modelo import Producto
+
+
+def producto(id_producto, nombre, precio="10.00", stock=5):
+    return Producto(id_producto, nombre, "General", "Sin marca", Decimal(precio), stock)
+
+def ids(filas):
+    return [fila[0] for fila in filas]
+
+
+class Oyente:
+    def __init__(self):
+        self.avisos = []  # (entidad, id anterior, id nuevo)
+        self.bloques = []
+
+    def __call__(self, entidad, anterior, nueva):
+        self.avisos.append((entidad, anterior and anterior[0], nueva and nueva[0]))
+
+    def al_agregar_bloque(self, entidad, filas):
+        self.bloques.append(ids(filas))
+
+
+# -------------------------
+# CARGA Y CAMBIOS
+# -------------------------
+def test_reemplazar_y_paginar_por_id():
+    cache = CacheReferencia()
+    cache.reemplazar("productos", [producto(3, "C"), producto(1, "A"), producto(2, "B")])
+    assert cache.cargado["productos"]
+    assert cache.total("productos") == 3
+    assert ids(cache.pagina("productos", 1, 5)) == [2, 3]
+    assert cache.obtener("productos", 1).nombre == "A"
+    assert cache.obtener("productos", 9) is None
+
+def test_guardar_y_quitar_avisan_la_fila_afectada():
+    cache = CacheReferencia()
+    oyente = Oyente()
+    cache.suscribir(oyente)
+    cache.reemplazar("productos", [producto(1, "A"), producto(5, "E")])
+    cache.guardar("productos", producto(3, "C"))
+    cache.guardar("productos", producto(3, "C", stock=2))
+    assert cache.quitar("productos", 1).nombre == "A"
+    assert cache.quitar("productos", 1) is None
+    assert oyente.avisos == [("productos", None, None), ("productos", None, 3),
+                             ("productos", 3, 3), ("productos", 1, None)]
+    assert ids(cache.pagina("productos", 0, 10)) == [3, 5]
+    assert cache.posicion("productos", 5) == 1
+
+def test_carga_por_bloques():
+    cache = CacheReferencia()
+    por_bloques, completa = Oyente(), Oyente()
+    cache.suscribir(por_bloques, por_bloques.al_agregar_bloque)
+    cache.suscribir(completa)
+    cache.reemplazar("clientes", [(9, "Viejo")])
+    completa.avisos.clear()
+
+    cache.comenzar_carga("clientes")
+    assert not cache.cargado["clientes"] and cache.total("clientes") == 0
+    cache.agregar_bloque("clientes", [(1, "Ana"), (2, "Luis")])
+    cache.agregar_bloque("clientes", [(4, "Eva"), (2, "Luis")])
+    cache.terminar_carga("clientes")
+
+    assert cache.cargado["clientes"]
+    assert ids(cache.pagina("clientes", 0, 10)) == [1, 2, 4]
+    assert por_bloques.bloques == [[1, 2], [4, 2]]
+    # Quien no recibe bloques solo se entera al vaciarse y al terminar
+    assert completa.avisos == [("clientes", None, None), ("clientes", None, None)]
+
+def test_carga_que_conserva_las_filas_actuales():
+    # Filas de la instantanea a la vista mientras llega la carga completa
+    cache = CacheReferencia()
+    por_bloques = Oyente()
+    cache.suscribir(por_bloques, por_bloques.al_agregar_bloque)
+    cache.reemplazar("clientes", [(1, "Ana"), (9, "Viejo")])
+    por_bloques.avisos.clear()
+
+    cache.comenzar_carga("clientes", conservar=True)
+    cache.agregar_bloque("clientes", [(1, "Ana"), (2, "Luis")])
+    assert not cache.cargado["clientes"]
+    assert ids(cache.pagina("clientes", 0, 10)) == [1, 9]
+    assert cache.recibidas("clientes") == 2
+    # Una escritura durante la carga vale para las dos versiones
+    cache.guardar("clientes", (5, "Eva"))
+    cache.agregar_bloque("clientes", [(4, "Rosa"), (5, "Eva vieja")])
+    cache.terminar_carga("clientes")
+
+    assert cache.cargado["clientes"]
+    assert ids(cache.pagina("clientes", 0, 10)) == [1, 2, 4, 5]
+    assert cache.obtener("clientes", 5)[1] == "Eva"
+    assert por_bloques.bloques == []
+    assert por_bloques.avisos == [("clientes", None, 5), ("clientes", None, None)]
+
+def test_aplicar_cambios_solo_avisa_lo_distinto():
+    cache = CacheReferencia()
+    oyente = Oyente()
+    cache.reemplazar("productos", [producto(1, "A"), producto(2, "B"), producto(3, "C")])
+    cache.suscribir(oyente)
+    cambios = cache.aplicar_cambios("productos",
+                                    [producto(1, "A"),               # ya aplicado en esta ventana
+                                     producto(2, "B", stock=0),      # otro terminal lo vendio
+                                     producto(7, "G")],              # alta de otro terminal
+                                    eliminadas=[3, 99])
+    assert cambios == 3
+    assert oyente.avisos == [("productos", 2, 2), ("productos", None, 7), ("productos", 3, None)]
+    assert ids(cache.pagina("productos", 0, 10)) == [1, 2, 7]
+    assert cache.obtener("productos", 2).stock == 0
+
+
+# -------------------------
+# ORDEN POR COLUMNA
+# -------------------------
+PRECIO, CATEGORIA = 4, 2
+
+def test_ordenar_importes_por_valor_y_no_por_texto():
+    cache = CacheReferencia()
+    cache.reemplazar("productos", [producto(1, "A", "1200.00"), producto(2, "B", "45.00"),
+                                   producto(3, "C", "9.50")])
+    cache.ordenar("productos", (PRECIO, False))
+    assert ids(cache.pagina("productos", 0, 10)) == [3, 2, 1]
+    cache.ordenar("productos", (PRECIO, True))
+    assert ids(cache.pagina("productos", 0, 10)) == [1, 2, 3]
+    assert ids(cache.pagina("productos", 1, 1)) == [2]
+    assert cache.posicion("productos", 3) == 2
+    cache.ordenar("productos", None)
+    assert ids(cache.pagina("productos", 0, 10)) == [1, 2, 3]
+
+def test_textos_sin_mayusculas_y_vacios_al_final():
+    cache = CacheReferencia()
+    cache.reemplazar("productos", [producto(1, "A")._replace(categoria="beta"),
+                                   producto(2, "B")._replace(categoria=None),
+                                   producto(3, "C")._replace(categoria="Alfa")])
+    cache.ordenar("productos", (CATEGORIA, False))
+    assert ids(cache.pagina("productos", 0, 10)) == [3, 1, 2]
+    cache.ordenar("productos", (CATEGORIA, True))
+    assert ids(cache.pagina("productos", 0, 10)) == [2, 1, 3]
+
+def test_los_cambios_mantienen_el_orden():
+    cache = CacheReferencia()
+    cache.reemplazar("productos", [producto(1, "A", "10.00"), producto(2, "B", "20.00")])
+    cache.ordenar("productos", (PRECIO, False))
+    cache.guardar("productos", producto(1, "A", "30.00"))
+    cache.guardar("productos", producto(3, "C", "15.00"))
+    assert ids(cache.pagina("productos", 0, 10)) == [3, 2, 1]
+    assert cache.posicion("productos", 1) == 2
+    cache.quitar("productos", 2)
+    assert ids(cache.pagina("productos", 0, 10)) == [3, 1]
@@ -0,0 +1,109 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import consultas
+from consultas import ErrorOperacion, ErrorStock
+
+
+def contar(conexion, tabla):
+    cursor = conexion.cursor()
+    cursor.execute(f"SELECT COUNT(*) FROM {tabla}")
+    return cursor.fetchone()[0]
+
+
+# -------------------------
+# PEDIDOS
+# -------------------------
+def test_registrar_pedido_descuenta_stock(conexion):
+    pedido, productos = consultas.registrar_pedido(conexion, 1, "Luis Torres",
+                                                   [(2, 3, Decimal("45.00")), (3, 1, Decimal("150.00"))])
+    assert pedido.total == Decimal("285.00")
+    assert pedido.cliente == "Luis Torres"
+    assert {fila.id_producto: fila.stock for fila in productos} == {2: 47, 3: 24}
+
+def test_registrar_pedido_sin_stock_no_graba_nada(conexion):
+    with pytest.raises(ErrorStock) as error:
+        consultas.registrar_pedido(conexion, 1, "Luis Torres",
+                                   [(2, 1, Decimal("45.00")), (6, 5, Decimal("950.00")), (6, 4, Decimal("950.00"))])
+    assert "Procesador Ryzen 5 5600G (quedan 8)" in str(error.value)
+    assert {fila.id_producto: fila.stock for fila in error.value.productos} == {2: 50, 6: 8}
+    assert contar(conexion, "pedido") == 0
+    assert contar(conexion, "detalle_pedido") == 0
+    assert contar(conexion, "clienPedido") == 0
+
+def test_insertar_pedido_fallido_restablece_el_cursor(conexion):
+    cursor = conexion.cursor()
+    with pytest.raises(Exception):
+        consultas.insertar_pedido(cursor, None, "Sin cliente", [(999, 1, Decimal("10.00"))])
+    conexion.rollback()
+    assert cursor.fast_executemany is False
+
+
+# -------------------------
+# OPERACIONES DEL DIARIO
+# -------------------------
+def operaciones_de_prueba():
+    return [
+        ("a" * 32, "venta", (5, "Pedro Ramos", Decimal("5.00"), date(2025, 3, 1))),
+        ("b" * 32, "pedido", (1, "Luis Torres", [(2, 2, Decimal("45.00"))], date(2025, 3, 1))),
+    ]
+
+def test_aplicar_operaciones_no_repite(conexion):
+    primera = consultas.aplicar_operaciones(conexion, operaciones_de_prueba())
+    venta = primera["a" * 32]
+    assert venta.cliente == "Pedro Ramos"
+    assert venta.total == Decimal("5.00")
+    assert venta.fecha == date(2025, 3, 1)
+    # Reenvio del mismo lote, como si no hubiera llegado la confirmacion
+    segunda = consultas.aplicar_operaciones(conexion, operaciones_de_prueba())
+    assert segunda == {"a" * 32: None, "b" * 32: None}
+    assert contar(conexion, "ventas") == 1
+    assert contar(conexion, "pedido") == 1
+    assert consultas.listar_productos(conexion)[1].stock == 48
+
+def test_aplicar_operaciones_deshace_el_lote(conexion):
+    operaciones = operaciones_de_prueba() + [
+        ("c" * 32, "pedido", (None, "Sin cliente", [(6, 9, Decimal("950.00"))], None)),
+    ]
+    with pytest.raises(ErrorOperacion) as error:
+        consultas.aplicar_operaciones(conexion, operaciones)
+    assert error.value.clave == "c" * 32
+    assert isinstance(error.value.error, ErrorStock)
+    assert contar(conexion, "ventas") == 0
+    assert contar(conexion, "pedido") == 0
+    assert contar(conexion, "operaciones_aplicadas") == 0
+
+
+# -------------------------
+# SINCRONIZACION
+# -------------------------
+def test_cambios_desde(conexion, ruta_bd):
+    import sqlite_local
+    desde = consultas.marca_cambios(conexion)
+    assert consultas.cambios_desde(conexion, desde)[0] == desde
+
+    otra = sqlite_local.conectar(ruta_bd)
+    try:
+        consultas.actualizar_producto(otra, 2, {"nombre": "Mouse", "categoria": "Periférico",
+                                                "marca": "Logitech", "precio": Decimal("40.00"), "stock": 5})
+        nuevo = consultas.insertar_cliente(otra, {"nombre": "Ana", "apellido": "Diaz", "dni": "12345678",
+                                                  "telefono": None, "correo": None, "direccion": None})
+        consultas.eliminar_cliente(otra, 5)
+        consultas.registrar_venta(otra, None, "Sin cliente", Decimal("7.50"))
+    finally:
+        otra.close()
+
+    hasta, filas, eliminadas = consultas.cambios_desde(conexion, desde)
+    assert hasta > desde
+    assert [(fila.id_producto, fila.precio, fila.stock) for fila in filas["productos"]] == [(2, Decimal("40.00"), 5)]
+    assert [fila.id_cliente for fila in filas["clientes"]] == [nuevo.id_cliente]
+    assert [fila.total for fila in filas["ventas"]] == [Decimal("7.50")]
+    assert filas["pedidos"] == []
+    assert eliminadas["clientes"] == [5]
+
+    # Sin cambios nuevos no hay nada que aplicar
+    siguiente, filas, eliminadas = consultas.cambios_desde(conexion, hasta)
+    assert siguiente == hasta
+    assert not any(filas.values()) and not any(eliminadas.values())
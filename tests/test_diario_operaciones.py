@@ -0,0 +1,42 @@
+from decimal import Decimal
+
+import pytest
+
+import diario_operaciones
+from diario_operaciones import DiarioOperaciones
+
+
+@pytest.fixture
+def diario(tmp_path):
+    diario = DiarioOperaciones(str(tmp_path / "diario.log"))
+    yield diario
+    diario.cerrar()
+
+
+def test_reenviar_rechaza_solo_la_operacion_imposible(conexion, diario):
+    diario.agregar_venta(None, "Sin cliente", Decimal("5.00"))
+    imposible = diario.agregar_pedido(None, "Sin cliente", [(999, 1, Decimal("10.00"))])  # producto inexistente
+    diario.agregar_venta(None, "Sin cliente", Decimal("7.00"))
+
+    aplicadas, rechazadas = diario_operaciones.reenviar(conexion, diario)
+
+    assert [resultado.total for _, _, resultado in aplicadas] == [Decimal("5.00"), Decimal("7.00")]
+    assert [(clave, tipo) for clave, tipo, _, _ in rechazadas] == [(imposible, "pedido")]
+    assert len(diario) == 0
+
+def test_reenviar_rechaza_un_registro_ilegible(conexion, diario):
+    diario._agregar("venta", {"cliente": "Sin cliente", "total": "no es un numero", "fecha": "2025-03-01"})
+    diario.agregar_venta(None, "Sin cliente", Decimal("7.00"))
+
+    aplicadas, rechazadas = diario_operaciones.reenviar(conexion, diario)
+
+    assert len(aplicadas) == 1
+    assert "ilegibles" in str(rechazadas[0][3])
+    assert len(diario) == 0
+
+def test_reenviar_sin_conexion_deja_todo_pendiente(conexion, diario):
+    diario.agregar_venta(None, "Sin cliente", Decimal("5.00"))
+    conexion.close()
+    with pytest.raises(Exception):
+        diario_operaciones.reenviar(conexion, diario)
+    assert len(diario) == 1
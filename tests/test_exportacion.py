@@ -0,0 +1,52 @@
+import csv
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import consultas
+import exportacion
+from consultas import ErrorNegocio
+
+
+@pytest.fixture
+def con_ventas(conexion):
+    consultas.aplicar_operaciones(conexion, [
+        ("a" * 32, "venta", (1, "Luis Torres", Decimal("19.90"), date(2025, 1, 15))),
+        ("b" * 32, "venta", (None, "Sin cliente", Decimal("5.00"), date(2025, 2, 1))),
+        ("c" * 32, "pedido", (2, "María Lopez", [(2, 3, Decimal("45.00"))], date(2025, 2, 3))),
+    ])
+    return conexion
+
+def test_exportar_csv_por_bloques(con_ventas, tmp_path):
+    ruta = tmp_path / "ventas.csv"
+    avances = []
+    resumen = exportacion.exportar(con_ventas, "ventas", str(ruta), "csv",
+                                   notificar=avances.append, filas_por_bloque=1)
+    assert resumen["filas"] == 2
+    assert avances == [1, 2]
+    with open(ruta, newline="", encoding="utf-8-sig") as archivo:
+        filas = list(csv.reader(archivo))
+    assert filas[0] == ["id_venta", "cliente", "fecha", "total"]
+    assert [fila[1] for fila in filas[1:]] == ["Luis Torres", "Sin cliente"]
+
+def test_exportar_filtra_por_fecha(con_ventas, tmp_path):
+    resumen = exportacion.exportar(con_ventas, "ventas", str(tmp_path / "febrero.csv"), "csv",
+                                   desde=date(2025, 2, 1), hasta=date(2025, 2, 28))
+    assert resumen["filas"] == 1
+
+def test_exportar_parquet_con_fechas_de_texto(con_ventas, tmp_path):
+    # SQLite, como el driver {SQL Server}, entrega las fechas como texto
+    pyarrow_parquet = pytest.importorskip("pyarrow.parquet")
+    ruta = tmp_path / "pedidos.parquet"
+    exportacion.exportar(con_ventas, "detalle_pedido", str(ruta), "parquet")
+    tabla = pyarrow_parquet.read_table(ruta).to_pylist()
+    assert tabla == [{"id_detalle": 1, "id_pedido": 1, "fecha": date(2025, 2, 3), "id_producto": 2,
+                      "producto": "Mouse Logitech M90", "cantidad": 3,
+                      "precio": Decimal("45.00"), "subtotal": Decimal("135.00")}]
+
+def test_exportar_extracto_desconocido(conexion, tmp_path):
+    with pytest.raises(ErrorNegocio):
+        exportacion.exportar(conexion, "facturas", str(tmp_path / "x.csv"), "csv")
+    with pytest.raises(ErrorNegocio):
+        exportacion.exportar(conexion, "ventas", str(tmp_path / "x.xlsx"), "xlsx")
@@ -0,0 +1,75 @@
+import pytest
+
+import importacion
+from consultas import ErrorNegocio
+
+
+def escribir(ruta, texto):
+    ruta.write_text(texto, encoding="utf-8")
+    return str(ruta)
+
+def test_leer_csv_detecta_separador_y_omite_vacias(tmp_path):
+    ruta = escribir(tmp_path / "productos.csv",
+                    "Nombre;Precio;Stock\nTeclado;30.00;4\n;;\nMonitor;500;\n")
+    filas = list(importacion.leer_csv(ruta, importacion.COLUMNAS_PRODUCTOS, ("nombre", "precio")))
+    assert filas == [(2, {"nombre": "Teclado", "precio": "30.00", "stock": "4"}),
+                     (4, {"nombre": "Monitor", "precio": "500", "stock": ""})]
+
+def test_leer_csv_sin_columnas_obligatorias(tmp_path):
+    ruta = escribir(tmp_path / "clientes.csv", "nombre,telefono\nAna,999\n")
+    with pytest.raises(ErrorNegocio, match="apellido, dni"):
+        list(importacion.leer_csv(ruta, importacion.COLUMNAS_CLIENTES, ("nombre", "apellido", "dni")))
+
+def test_en_lotes():
+    assert list(importacion.en_lotes(range(5), 2)) == [[0, 1], [2, 3], [4]]
+    assert list(importacion.en_lotes([], 2)) == []
+
+def test_importar_productos_por_lotes(conexion, tmp_path):
+    ruta = escribir(tmp_path / "productos.csv",
+                    "nombre,categoria,marca,precio,stock\n"
+                    "Teclado,Perifericos,Redragon,30.00,4\n"
+                    "Sin precio,Perifericos,X,,1\n"
+                    "Monitor,Monitores,LG,500,2\n"
+                    "Parlante,Audio,JBL,80,1\n")
+    avances = []
+    resumen = importacion.importar_productos(conexion, ruta, avances.append, tamano_lote=2)
+    assert (resumen.leidas, resumen.importadas, resumen.invalidas) == (4, 3, 1)
+    assert resumen.errores[0][0] == 3
+    assert avances == [(2, 1, 1), (4, 3, 1)]
+    cursor = conexion.cursor()
+    cursor.execute("SELECT COUNT(*) FROM productos WHERE nombre IN ('Teclado', 'Monitor', 'Parlante')")
+    assert cursor.fetchone()[0] == 3
+
+
+class ConexionFallida:
+    # SQL Server: las tablas #temporales no existen en SQLite
+    def __init__(self):
+        self.ejecutadas = []
+        self.deshechas = 0
+        self.fast_executemany = False
+
+    def cursor(self):
+        return self
+
+    def execute(self, sentencia, *parametros):
+        self.ejecutadas.append(" ".join(sentencia.split()))
+
+    def executemany(self, sentencia, filas):
+        raise RuntimeError("conexion perdida")
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        self.deshechas += 1
+
+def test_importar_clientes_fallido_limpia_y_propaga(tmp_path):
+    ruta = escribir(tmp_path / "clientes.csv",
+                    "nombre,apellido,dni\nAna,Rios,12345678\n")
+    conexion = ConexionFallida()
+    with pytest.raises(RuntimeError, match="conexion perdida"):
+        importacion.importar_clientes(conexion, ruta, lambda avance: None)
+    assert conexion.deshechas == 1
+    assert conexion.fast_executemany is False
+    assert conexion.ejecutadas[0] == importacion.ELIMINAR_TEMPORAL_CLIENTES
+    assert conexion.ejecutadas[-1] == importacion.ELIMINAR_TEMPORAL_CLIENTES
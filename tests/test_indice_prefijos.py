@@ -0,0 +1,68 @@
+import pytest
+
+from indice_prefijos import IndicePrefijos, normalizar
+
+
+def cliente(clave, nombre, apellido, dni):
+    return clave, f"{nombre} {apellido} - DNI {dni}", (nombre, apellido, dni)
+
+@pytest.fixture
+def indice():
+    indice = IndicePrefijos()
+    indice.reemplazar([
+        cliente(1, "Luis", "Torres", "70581234"),
+        cliente(2, "María", "López", "70981235"),
+        cliente(3, "Lucía", "Gomez", "72981237"),
+        cliente(4, "Carlos", "Perez", "71981236"),
+    ])
+    return indice
+
+
+def test_normalizar_sin_tildes_ni_mayusculas():
+    assert normalizar("PÉREZ Muñoz") == "perez munoz"
+    assert normalizar(70581234) == "70581234"
+
+def test_buscar_por_prefijo_de_cualquier_palabra(indice):
+    assert [clave for _, clave in indice.buscar_registros("lu")] == [3, 1]
+    assert [clave for _, clave in indice.buscar_registros("7098")] == [2]
+    assert indice.buscar("tor") == ["Luis Torres - DNI 70581234"]
+    assert indice.buscar("xyz") == []
+
+def test_todas_las_palabras_deben_coincidir(indice):
+    assert [clave for _, clave in indice.buscar_registros("lu to")] == [1]
+    assert indice.buscar("lu pe") == []
+
+def test_tildes_y_mayusculas_se_ignoran(indice):
+    assert indice.buscar("MARIA lop") == indice.buscar("maría LÓP") == ["María López - DNI 70981235"]
+    assert [clave for _, clave in indice.buscar_registros("lucia")] == [3]
+
+def test_sin_texto_devuelve_los_primeros_en_orden(indice):
+    assert indice.buscar("", limite=2) == ["Carlos Perez - DNI 71981236", "Lucía Gomez - DNI 72981237"]
+    assert len(indice.buscar("l", limite=1)) == 1
+
+def test_guardar_y_quitar(indice):
+    indice.guardar(*cliente(5, "Lucas", "Ramos", "73981238"))
+    assert [clave for _, clave in indice.buscar_registros("luc")] == [5, 3]
+    # Un cambio reemplaza las palabras anteriores
+    indice.guardar(*cliente(5, "Pedro", "Ramos", "73981238"))
+    assert [clave for _, clave in indice.buscar_registros("luc")] == [3]
+    assert indice.buscar("ped") == ["Pedro Ramos - DNI 73981238"]
+    indice.quitar(5)
+    indice.quitar(5)
+    assert indice.buscar("ram") == []
+    assert len(indice) == 4
+
+def test_agregar_lote_en_orden(indice):
+    indice.agregar_lote([cliente(6, "Ana", "Diaz", "12345678"), cliente(1, "Luis", "Tapia", "70581234")])
+    assert indice.buscar("", limite=2) == ["Ana Diaz - DNI 12345678", "Carlos Perez - DNI 71981236"]
+    assert indice.buscar("torres") == []
+    assert indice.etiqueta(1) == "Luis Tapia - DNI 70581234"
+
+def test_etiquetas_repetidas_guardan_cada_clave():
+    indice = IndicePrefijos()
+    indice.reemplazar([(1, "Juan Perez", ("Juan", "Perez")), (2, "Juan Perez", ("Juan", "Perez"))])
+    assert indice.clave("Juan Perez") is None
+    assert indice.claves("Juan Perez") == [1, 2]
+    assert sorted(clave for _, clave in indice.buscar_registros("juan")) == [1, 2]
+    indice.quitar(1)
+    assert indice.clave("Juan Perez") == 2
@@ -0,0 +1,40 @@
+from datetime import date
+from decimal import Decimal
+
+import instantanea
+
+
+def test_guardar_y_leer_conserva_los_tipos(tmp_path):
+    ruta = str(tmp_path / "instantanea.db")
+    instantanea.guardar(ruta, "tienda1", {
+        "productos": (2, [(1, "Laptop HP", "Laptops", "HP", Decimal("2800.50"), 3),
+                          (2, "Mouse", "Perifericos", "Logitech", Decimal("45.00"), 50)]),
+        "ventas": (120, [(7, "Luis Torres", date(2025, 3, 1), Decimal("19.90"))]),
+    })
+    datos = instantanea.leer(ruta, "tienda1")
+    assert set(datos) == {"productos", "ventas"}
+    total, filas, guardada_en = datos["productos"]
+    assert total == 2 and guardada_en > 0
+    assert filas[0].precio == Decimal("2800.50") and filas[1].precio == Decimal("45.00")
+    total, filas, _ = datos["ventas"]
+    assert total == 120
+    assert filas[0].fecha == date(2025, 3, 1) and filas[0].total == Decimal("19.90")
+
+def test_guardar_conserva_las_entidades_que_no_vienen(tmp_path):
+    ruta = str(tmp_path / "instantanea.db")
+    instantanea.guardar(ruta, "tienda1", {"clientes": (1, [(1, "Ana", "Rios", "12345678", None, None, None)])})
+    instantanea.guardar(ruta, "tienda1", {"pedidos": (0, [])})
+    datos = instantanea.leer(ruta, "tienda1")
+    assert datos["clientes"][1][0].nombre == "Ana"
+    assert datos["pedidos"][:2] == (0, [])
+
+def test_otra_tienda_o_sin_archivo(tmp_path):
+    ruta = str(tmp_path / "instantanea.db")
+    assert instantanea.leer(ruta, "tienda1") == {}
+    instantanea.guardar(ruta, "tienda1", {"pedidos": (0, [])})
+    assert instantanea.leer(ruta, "tienda2") == {}
+
+def test_archivo_danado_se_ignora(tmp_path):
+    ruta = tmp_path / "instantanea.db"
+    ruta.write_bytes(b"esto no es una base SQLite" * 100)
+    assert instantanea.leer(str(ruta), "tienda1") == {}
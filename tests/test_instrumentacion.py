@@ -0,0 +1,64 @@
+import logging
+from functools import partial
+
+import pytest
+
+import instrumentacion
+import sqlite_local
+from instrumentacion import Histograma, Metricas
+
+
+def test_histograma_percentiles_con_error_acotado():
+    histograma = Histograma()
+    for ms in range(1, 101):
+        histograma.agregar(float(ms))
+    assert histograma.cantidad == 100
+    assert histograma.promedio == pytest.approx(50.5)
+    assert histograma.maximo == 100.0
+    for p in (50, 95, 99):
+        assert histograma.percentil(p) == pytest.approx(p, rel=0.1)
+    assert histograma.percentil(100) == 100.0
+    assert Histograma().percentil(50) == 0.0
+
+def contar_clientes(conexion):
+    cursor = conexion.cursor()
+    cursor.execute("SELECT id_cliente FROM clientes")
+    return len(cursor.fetchall())
+
+def test_consultas_medidas_por_funcion(ruta_bd):
+    metricas = Metricas()
+    conexion = instrumentacion.medir_fabrica(partial(sqlite_local.conectar, ruta_bd), metricas)()
+    try:
+        with metricas.operacion("cargar") as operacion:
+            contar_clientes(conexion)
+            contar_clientes(conexion)
+    finally:
+        conexion.close()
+    fila, = metricas.resumen()
+    assert fila["nombre"] == f"{__name__}.contar_clientes"
+    assert fila["ejecuciones"] == 2
+    assert fila["filas"] == 10
+    assert (operacion["consultas"], operacion["filas"]) == (2, 10)
+    assert metricas.ultima() is operacion
+    assert metricas.resumen(por="sentencia")[0]["nombre"] == "SELECT id_cliente FROM clientes"
+    metricas.reiniciar()
+    assert metricas.resumen() == [] and metricas.ultima() is None
+
+def test_consultas_lentas_al_registro(caplog):
+    metricas = Metricas(umbral_lenta_ms=50.0, registro_lentas=logging.getLogger("pruebas.lentas"))
+    with caplog.at_level(logging.WARNING, logger="pruebas.lentas"):
+        metricas.registrar("SELECT  1", "consultas.rapida", 1.0, 2.0, 1)
+        metricas.registrar("SELECT\n 2", "consultas.lenta", 40.0, 20.0, 3)
+    mensaje, = [registro.getMessage() for registro in caplog.records]
+    assert "consultas.lenta" in mensaje and "SELECT 2" in mensaje
+
+def test_operaciones_anidadas_vuelven_a_la_anterior():
+    metricas = Metricas()
+    with metricas.operacion("externa") as externa:
+        with metricas.operacion("interna") as interna:
+            metricas.registrar("SELECT 1", "f", 1.0, 0.0, 1)
+        metricas.registrar("SELECT 2", "f", 1.0, 0.0, 1)
+        assert metricas.en_curso() is externa
+    assert (externa["consultas"], interna["consultas"]) == (1, 1)
+    assert metricas.en_curso() is None
+    assert externa["total_ms"] >= 0
@@ -0,0 +1,72 @@
+import pytest
+
+import migraciones
+from migraciones import ErrorMigracion
+
+
+class ConexionGrabada:
+    # Registra lo que se ejecuta; la base real es SQL Server (T-SQL)
+    def __init__(self, version=0, falla_con=None):
+        self.version = version
+        self.falla_con = falla_con
+        self.ejecutadas = []
+        self.confirmaciones = 0
+        self.deshechas = 0
+
+    def cursor(self):
+        return self
+
+    def execute(self, sentencia, parametros=None):
+        if self.falla_con and self.falla_con in sentencia:
+            raise RuntimeError("sintaxis incorrecta")
+        self.ejecutadas.append(sentencia if parametros is None else parametros)
+
+    def fetchone(self):
+        return (self.version,)
+
+    def commit(self):
+        self.confirmaciones += 1
+
+    def rollback(self):
+        self.deshechas += 1
+
+
+@pytest.fixture
+def carpeta(tmp_path):
+    (tmp_path / "0001_primera.sql").write_text("CREATE TABLE a (x INT)\nGO\nCREATE INDEX ix ON a (x)\n",
+                                               encoding="utf-8")
+    (tmp_path / "0002_segunda.sql").write_text("ALTER TABLE a ADD y INT;\n", encoding="utf-8")
+    (tmp_path / "0010_decima.sql").write_text("SELECT 10\n", encoding="utf-8")
+    (tmp_path / "notas.txt").write_text("no es una migracion", encoding="utf-8")
+    return str(tmp_path)
+
+
+def test_las_migraciones_del_repositorio_son_correlativas():
+    versiones = [version for version, _, _ in migraciones.listar_migraciones()]
+    assert versiones == list(range(1, len(versiones) + 1))
+
+def test_listar_ordena_por_numero(carpeta):
+    assert [(version, nombre) for version, nombre, _ in migraciones.listar_migraciones(carpeta)] == \
+        [(1, "primera"), (2, "segunda"), (10, "decima")]
+
+def test_separar_lotes_por_go():
+    script = "CREATE VIEW v AS SELECT 1\nGO\n  go ;\nCREATE INDEX ix ON v (x)\nGO\n-- GOTO no separa\n"
+    assert migraciones.separar_lotes(script) == [
+        "CREATE VIEW v AS SELECT 1", "CREATE INDEX ix ON v (x)", "-- GOTO no separa"]
+
+def test_aplicar_solo_las_pendientes(carpeta):
+    conexion = ConexionGrabada(version=1)
+    assert migraciones.aplicar_pendientes(conexion, carpeta) == [(2, "segunda"), (10, "decima")]
+    assert "ALTER TABLE a ADD y INT;" in conexion.ejecutadas
+    assert "CREATE TABLE a (x INT)" not in conexion.ejecutadas
+    assert (2, "segunda") in conexion.ejecutadas and (10, "decima") in conexion.ejecutadas
+    # Una transaccion por migracion, ademas de la de schema_version
+    assert conexion.confirmaciones == 3
+
+def test_una_migracion_fallida_se_deshace_y_detiene_las_demas(carpeta):
+    conexion = ConexionGrabada(version=0, falla_con="CREATE INDEX")
+    with pytest.raises(ErrorMigracion, match="0001 \\(primera\\)"):
+        migraciones.aplicar_pendientes(conexion, carpeta)
+    assert conexion.deshechas == 1
+    assert (1, "primera") not in conexion.ejecutadas
+    assert "ALTER TABLE a ADD y INT;" not in conexion.ejecutadas
@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from pool_conexiones import ErrorPool, PoolConexiones
+
+
+def memoria():
+    return sqlite3.connect(":memory:", check_same_thread=False)
+
+def esta_cerrada(conexion):
+    try:
+        conexion.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        return True
+    return False
+
+
+def test_reutiliza_la_conexion_devuelta():
+    pool = PoolConexiones(memoria)
+    primera = pool.obtener()
+    nativa = primera._conexion
+    primera.close()
+    primera.close()  # cerrar dos veces no la devuelve dos veces
+    segunda = pool.obtener()
+    assert segunda._conexion is nativa
+    datos = pool.estadisticas()
+    assert (datos["creadas"], datos["aciertos"], datos["en_uso"], datos["libres"]) == (1, 1, 1, 0)
+
+def test_close_devuelve_sin_transaccion_abierta():
+    pool = PoolConexiones(memoria)
+    conexion = pool.obtener()
+    conexion.execute("CREATE TABLE t (x INTEGER)")
+    conexion.commit()
+    conexion.execute("INSERT INTO t VALUES (1)")
+    conexion.close()  # sin commit: se deshace al volver al pool
+    with pool.conexion() as otra:
+        assert otra.execute("SELECT COUNT(*) FROM t").fetchone()[0] == 0
+
+def test_error_dentro_del_with_deshace_y_devuelve():
+    pool = PoolConexiones(memoria)
+    with pytest.raises(ZeroDivisionError):
+        with pool.conexion():
+            1 / 0
+    assert pool.estadisticas()["en_uso"] == 0
+    assert pool.estadisticas()["libres"] == 1
+
+def test_descartar_cierra_la_conexion():
+    pool = PoolConexiones(memoria)
+    conexion = pool.obtener()
+    nativa = conexion._conexion
+    conexion.descartar()
+    assert esta_cerrada(nativa)
+    assert pool.estadisticas()["descartadas"] == 1
+    assert pool.estadisticas()["libres"] == 0
+
+def test_sin_conexiones_libres_espera_y_falla():
+    pool = PoolConexiones(memoria, tamano_maximo=1, tiempo_espera=0.05)
+    ocupada = pool.obtener()
+    with pytest.raises(ErrorPool):
+        pool.obtener()
+    assert pool.estadisticas()["esperas"] == 1
+    ocupada.close()
+
+def test_la_espera_termina_al_devolver_una():
+    pool = PoolConexiones(memoria, tamano_maximo=1, tiempo_espera=5)
+    ocupada = pool.obtener()
+    threading.Timer(0.05, ocupada.close).start()
+    with pool.conexion() as conexion:
+        assert conexion._conexion is ocupada._conexion
+
+def test_expulsa_las_conexiones_inactivas():
+    pool = PoolConexiones(memoria, tiempo_inactividad=0.01)
+    conexion = pool.obtener()
+    nativa = conexion._conexion
+    conexion.close()
+    time.sleep(0.02)
+    with pool.conexion() as nueva:
+        assert nueva._conexion is not nativa
+    assert esta_cerrada(nativa)
+    assert pool.estadisticas()["expulsadas"] == 1
+
+def test_verifica_la_salud_tras_el_intervalo():
+    pool = PoolConexiones(memoria, intervalo_verificacion=0.01)
+    conexion = pool.obtener()
+    nativa = conexion._conexion
+    conexion.close()
+    nativa.close()  # se corto mientras estaba libre
+    time.sleep(0.02)
+    with pool.conexion() as nueva:
+        assert nueva._conexion is not nativa
+        assert nueva.execute("SELECT 1").fetchone() == (1,)
+    datos = pool.estadisticas()
+    assert (datos["descartadas"], datos["creadas"]) == (1, 2)
+
+def test_sin_verificar_antes_del_intervalo():
+    consultas = []
+    pool = PoolConexiones(memoria, intervalo_verificacion=60)
+    with pool.conexion() as conexion:
+        conexion.set_trace_callback(consultas.append)
+    with pool.conexion():
+        pass
+    assert "SELECT 1" not in consultas
+
+def test_cerrar_el_pool():
+    pool = PoolConexiones(memoria)
+    en_uso = pool.obtener()
+    libre = pool.obtener()
+    nativa_libre = libre._conexion
+    libre.close()
+    pool.cerrar()
+    assert esta_cerrada(nativa_libre)
+    with pytest.raises(ErrorPool):
+        pool.obtener()
+    # La que estaba en uso se cierra al devolverla
+    nativa = en_uso._conexion
+    en_uso.close()
+    assert esta_cerrada(nativa)
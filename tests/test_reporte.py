@@ -0,0 +1,41 @@
+from functools import partial
+
+import pytest
+
+import consultas
+import instrumentacion
+import sqlite_local
+from pool_conexiones import PoolConexiones
+from reporte import MotorReporte
+
+
+@pytest.fixture
+def metricas():
+    return instrumentacion.Metricas()
+
+@pytest.fixture
+def motor(ruta_bd, metricas):
+    pool = PoolConexiones(instrumentacion.medir_fabrica(partial(sqlite_local.conectar, ruta_bd), metricas),
+                          tamano_maximo=len(consultas.PARTES_REPORTE))
+    motor = MotorReporte(pool, metricas=metricas)
+    yield motor
+    motor.cerrar()
+    pool.cerrar()
+
+def test_generar_igual_al_reporte_secuencial(motor, conexion):
+    assert motor.generar() == consultas.reporte_general(conexion)
+
+def test_generar_guarda_hasta_invalidar(motor):
+    assert motor.en_cache() is None
+    datos = motor.generar()
+    assert motor.en_cache() is datos
+    assert motor.generar() is datos
+    motor.invalidar()
+    assert motor.en_cache() is None
+
+def test_consultas_de_las_partes_en_la_operacion(motor, metricas):
+    with metricas.operacion("reporte") as operacion:
+        motor.generar()
+    # Cada parte corre en un hilo del motor y hace una consulta
+    assert operacion["consultas"] == len(consultas.PARTES_REPORTE)
+    assert metricas.ultima() is operacion
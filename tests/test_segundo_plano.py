@@ -0,0 +1,112 @@
+import threading
+import time
+
+import pytest
+
+from segundo_plano import EjecutorTk
+
+
+class RaizManual:
+    # Hace de ventana de Tk: guarda los after() y los ejecuta en este hilo
+    def __init__(self):
+        self.programadas = []
+        self.esperas_ms = []
+
+    def after(self, ms, funcion, *args):
+        self.esperas_ms.append(ms)
+        self.programadas.append((funcion, args))
+
+    def procesar(self, listo, limite=5.0):
+        fin = time.monotonic() + limite
+        while not listo():
+            if time.monotonic() > fin:
+                raise AssertionError("el ejecutor no entrego los resultados")
+            programadas, self.programadas = self.programadas, []
+            for funcion, args in programadas:
+                funcion(*args)
+            time.sleep(0.002)
+
+
+@pytest.fixture
+def raiz():
+    return RaizManual()
+
+@pytest.fixture
+def ejecutor(raiz):
+    ejecutor = EjecutorTk(raiz, max_hilos=2)
+    yield ejecutor
+    ejecutor.cerrar()
+
+
+def test_entrega_el_resultado_en_el_hilo_de_tk(raiz, ejecutor):
+    recibidos = []
+    ejecutor.enviar(lambda a, b: (a + b, threading.current_thread().name), 2, 3,
+                    al_terminar=lambda valor: recibidos.append((valor, threading.current_thread())))
+    raiz.procesar(lambda: recibidos)
+    (suma, hilo_trabajo), hilo_entrega = recibidos[0]
+    assert suma == 5
+    assert hilo_trabajo.startswith("bd")
+    assert hilo_entrega is threading.main_thread()
+
+def test_los_errores_van_a_al_fallar(raiz):
+    generales, propios = [], []
+    ejecutor = EjecutorTk(raiz, al_fallar=generales.append)
+    ejecutor.enviar(lambda: 1 / 0)
+    ejecutor.enviar(lambda: {}["x"], al_fallar=propios.append)
+    raiz.procesar(lambda: generales and propios)
+    assert isinstance(generales[0], ZeroDivisionError)
+    assert isinstance(propios[0], KeyError)
+    ejecutor.cerrar()
+
+def test_la_misma_clave_cancela_la_tarea_anterior(raiz, ejecutor):
+    liberar = threading.Event()
+    recibidos = []
+    ejecutor.enviar(lambda: liberar.wait(5) and "vieja", al_terminar=recibidos.append, clave="lista")
+    ejecutor.enviar(lambda: liberar.wait(5) and "nueva", al_terminar=recibidos.append, clave="lista")
+    liberar.set()
+    raiz.procesar(lambda: ejecutor.pendientes == 0)
+    assert recibidos == ["nueva"]
+
+def test_avance_por_bloques(raiz, ejecutor):
+    avances, final = [], []
+
+    def contar(hasta, notificar):
+        for numero in range(hasta):
+            notificar(numero)
+        return "listo"
+
+    ejecutor.enviar(contar, 5, al_progreso=avances.append, al_terminar=final.append)
+    raiz.procesar(lambda: final)
+    assert avances == [0, 1, 2, 3, 4]
+    assert final == ["listo"]
+
+def test_un_sondeo_no_pasa_del_presupuesto(raiz):
+    ejecutor = EjecutorTk(raiz, presupuesto_ms=5)
+    entregados = []
+
+    def lento(valor):
+        time.sleep(0.002)
+        entregados.append(valor)
+
+    ejecutor.enviar(lambda notificar: [notificar(i) for i in range(20)], al_progreso=lento)
+    raiz.procesar(lambda: len(entregados) == 20)
+    # Con resultados en cola el siguiente sondeo va en cuanto Tk redibuje
+    assert 1 in raiz.esperas_ms
+    ejecutor.cerrar()
+
+def test_avisa_si_esta_ocupado_sin_contar_las_silenciosas(raiz):
+    estados = []
+    ejecutor = EjecutorTk(raiz, al_cambiar_ocupado=estados.append)
+    liberar = threading.Event()
+    ejecutor.enviar(liberar.wait, 5, silenciosa=True)
+    assert estados == [] and ejecutor.pendientes == 0
+    ejecutor.enviar(liberar.wait, 5)
+    assert estados == [1]
+    liberar.set()
+    raiz.procesar(lambda: estados[-1] == 0)
+    assert estados == [1, 0]
+    ejecutor.cerrar()
+
+def test_cerrado_no_acepta_tareas(raiz, ejecutor):
+    ejecutor.cerrar()
+    assert ejecutor.enviar(lambda: None) is None
@@ -0,0 +1,141 @@
+import asyncio
+import json
+from decimal import Decimal
+
+import pytest
+
+from servicio_http import ServicioTiendas, _a_json
+
+
+@pytest.fixture
+def servicio(pool):
+    servicio = ServicioTiendas(pool)
+    yield servicio
+    asyncio.run(servicio.cerrar())
+
+def pedir(servicio, metodo, ruta, datos=None):
+    cuerpo = b"" if datos is None else json.dumps(datos).encode("utf-8")
+    return asyncio.run(servicio._despachar(metodo, ruta, cuerpo))
+
+
+# -------------------------
+# CLIENTES
+# -------------------------
+def test_listar_clientes_paginado(servicio):
+    estado, datos = pedir(servicio, "GET", "/clientes?desde=1&cantidad=2")
+    assert estado == 200
+    assert datos["total"] == 5
+    assert [fila["id_cliente"] for fila in datos["filas"]] == [2, 3]
+
+def test_crear_cliente_con_dni_numerico(servicio):
+    estado, datos = pedir(servicio, "POST", "/clientes",
+                          {"nombre": "ana", "apellido": "diaz", "dni": 12345678})
+    assert estado == 201
+    assert datos["dni"] == "12345678"
+    assert datos["nombre"] == "Ana"
+
+def test_crear_cliente_dni_repetido(servicio):
+    estado, datos = pedir(servicio, "POST", "/clientes",
+                          {"nombre": "Ana", "apellido": "Diaz", "dni": "70581234"})
+    assert estado == 409
+    assert "DNI" in datos["error"]
+
+@pytest.mark.parametrize("datos", [
+    {"nombre": "Ana", "apellido": "Diaz", "dni": "123"},
+    {"nombre": "Ana", "apellido": "Diaz", "dni": "12345678", "edad": 30},
+    {"nombre": "", "apellido": "Diaz", "dni": "12345678"},
+])
+def test_crear_cliente_invalido(servicio, datos):
+    estado, _ = pedir(servicio, "POST", "/clientes", datos)
+    assert estado == 400
+
+def test_cuerpo_que_no_es_objeto_json(servicio):
+    assert asyncio.run(servicio._despachar("POST", "/clientes", b"{no es json"))[0] == 400
+    assert asyncio.run(servicio._despachar("POST", "/clientes", b"[1, 2]"))[0] == 400
+
+def test_actualizar_cliente_inexistente(servicio):
+    estado, _ = pedir(servicio, "PUT", "/clientes/999",
+                      {"nombre": "Ana", "apellido": "Diaz", "dni": "12345678"})
+    assert estado == 409
+
+
+# -------------------------
+# PRODUCTOS, VENTAS Y PEDIDOS
+# -------------------------
+def test_crear_producto_con_precio_exacto(servicio):
+    estado, datos = pedir(servicio, "POST", "/productos", {"nombre": "Cable", "precio": "19.90", "stock": 3})
+    assert estado == 201
+    assert datos["precio"] == Decimal("19.90")
+
+def test_importes_en_json_sin_redondeo(servicio):
+    _, datos = pedir(servicio, "POST", "/productos", {"nombre": "Cable", "precio": "0.10", "stock": 3})
+    texto = json.dumps(datos, default=_a_json)
+    assert json.loads(texto)["precio"] == "0.10"
+    assert json.loads(json.dumps({"total": Decimal("1234567890123.47")}, default=_a_json)) == \
+        {"total": "1234567890123.47"}
+
+def test_crear_producto_precio_invalido(servicio):
+    for precio in ("abc", "NaN", "-5"):
+        estado, _ = pedir(servicio, "POST", "/productos", {"nombre": "Cable", "precio": precio})
+        assert estado == 400
+
+def test_crear_venta(servicio):
+    estado, datos = pedir(servicio, "POST", "/ventas", {"total": "10.10"})
+    assert estado == 201
+    assert datos["cliente"] == "Sin cliente"
+    assert datos["total"] == Decimal("10.10")
+
+def test_crear_venta_con_cliente(servicio):
+    estado, datos = pedir(servicio, "POST", "/ventas", {"id_cliente": 1, "total": "10.10"})
+    assert estado == 201
+    assert datos["cliente"] == "Luis Torres"
+    _, ventas = pedir(servicio, "GET", "/ventas")
+    assert ventas["filas"][0]["cliente"] == "Luis Torres"
+
+def test_crear_venta_cliente_inexistente(servicio):
+    assert pedir(servicio, "POST", "/ventas", {"id_cliente": 999, "total": "10.10"})[0] == 409
+    assert pedir(servicio, "POST", "/ventas", {"id_cliente": "Luis Torres", "total": "10.10"})[0] == 400
+
+def test_crear_venta_total_invalido(servicio):
+    for total in ("abc", "NaN", 0, None):
+        estado, _ = pedir(servicio, "POST", "/ventas", {"total": total})
+        assert estado == 400
+
+def test_crear_pedido_descuenta_stock(servicio):
+    estado, datos = pedir(servicio, "POST", "/pedidos",
+                          {"id_cliente": 1, "lineas": [{"id_producto": 2, "cantidad": 3}]})
+    assert estado == 201
+    assert datos["total"] == Decimal("135.00")
+    assert datos["cliente"] == "Luis Torres"
+    _, productos = pedir(servicio, "GET", "/productos?desde=1&cantidad=1")
+    assert productos["filas"][0]["stock"] == 47
+
+def test_crear_pedido_sin_stock(servicio):
+    estado, datos = pedir(servicio, "POST", "/pedidos",
+                          {"lineas": [{"id_producto": 2, "cantidad": 1}, {"id_producto": 6, "cantidad": 9}]})
+    assert estado == 409
+    assert "Stock insuficiente" in datos["error"]
+    assert {fila["id_producto"]: fila["stock"] for fila in datos["productos"]} == {2: 50, 6: 8}
+    _, pedidos = pedir(servicio, "GET", "/pedidos")
+    assert pedidos["total"] == 0
+
+def test_crear_pedido_invalido(servicio):
+    assert pedir(servicio, "POST", "/pedidos", {"lineas": []})[0] == 400
+    assert pedir(servicio, "POST", "/pedidos", {"lineas": [{"id_producto": 2, "cantidad": 0}]})[0] == 400
+    assert pedir(servicio, "POST", "/pedidos", {"lineas": [{"id_producto": 99, "cantidad": 1}]})[0] == 409
+
+def test_eliminar_producto_con_pedidos(servicio):
+    pedir(servicio, "POST", "/pedidos", {"lineas": [{"id_producto": 2, "cantidad": 1}]})
+    estado, datos = pedir(servicio, "DELETE", "/productos/2")
+    assert estado == 409
+    assert "pedidos" in datos["error"]
+
+
+# -------------------------
+# RUTAS
+# -------------------------
+def test_rutas_inexistentes(servicio):
+    assert pedir(servicio, "GET", "/nada")[0] == 404
+    assert pedir(servicio, "DELETE", "/ventas")[0] == 405
+    assert pedir(servicio, "GET", "/pedidos/999")[0] == 404
+    assert pedir(servicio, "GET", "/clientes?desde=-1")[0] == 400
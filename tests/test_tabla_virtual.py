@@ -0,0 +1,136 @@
+import pytest
+
+tk = pytest.importorskip("tkinter")
+
+from tabla_virtual import TablaVirtual
+
+
+class FuenteLista:
+    # Fuente sincronica sobre una lista, como la base pero sin hilos
+    def __init__(self, filas):
+        self.filas = list(filas)
+        self.pedidos = []  # (desde, cantidad) de cada pagina pedida
+
+    def total(self, entregar):
+        entregar(len(self.filas))
+
+    def pagina(self, desde, cantidad, entregar):
+        self.pedidos.append((desde, cantidad))
+        entregar(self.filas[desde:desde + cantidad])
+
+
+@pytest.fixture
+def raiz():
+    # Los widgets necesitan pantalla; sin ella estas pruebas se omiten
+    try:
+        raiz = tk.Tk()
+    except tk.TclError:
+        pytest.skip("no hay pantalla para Tk")
+    raiz.withdraw()
+    yield raiz
+    raiz.destroy()
+
+@pytest.fixture
+def fuente():
+    return FuenteLista((numero, f"Cliente {numero}") for numero in range(1000))
+
+@pytest.fixture
+def tabla(raiz, fuente):
+    tabla = TablaVirtual(raiz, ("ID", "Nombre"), fuente.total, fuente.pagina,
+                         alto=5, tamano_pagina=10, paginas_en_memoria=3)
+    tabla.recargar()
+    return tabla
+
+def visibles(tabla):
+    return [tabla.arbol.set(iid, "Nombre") for iid in tabla.arbol.get_children()]
+
+
+# -------------------------
+# PAGINAS
+# -------------------------
+def test_solo_crea_los_items_visibles(tabla, fuente):
+    assert tabla.total == 1000
+    assert visibles(tabla) == [f"Cliente {numero}" for numero in range(5)]
+    # Las paginas visibles mas una pantalla de margen
+    assert fuente.pedidos == [(0, 20)]
+
+def test_desplazarse_pide_solo_las_paginas_que_faltan(tabla, fuente):
+    tabla._ir_a(500)
+    assert visibles(tabla)[0] == "Cliente 500"
+    assert fuente.pedidos[-1] == (490, 30)
+    # Sin volver a pedir lo que ya esta en memoria
+    cantidad = len(fuente.pedidos)
+    tabla._mover(1)
+    assert len(fuente.pedidos) == cantidad
+
+def test_descarta_las_paginas_menos_usadas(tabla):
+    tabla._ir_a(500)
+    assert tabla.fila(500) == (500, "Cliente 500")
+    assert tabla.fila(0) is None
+
+def test_precargar_desactualizada_hasta_recargar(tabla, fuente):
+    tabla.precargar(3, [(1, "Viejo"), (2, "Viejo"), (3, "Viejo")], desactualizada=True)
+    assert visibles(tabla) == ["Viejo"] * 3
+    assert tabla.arbol.item("f0", "tags") == ("desactualizada",)
+    tabla.recargar()
+    assert not tabla.desactualizada
+    assert not tabla.arbol.item("f0", "tags")
+    assert visibles(tabla)[0] == "Cliente 0"
+
+
+# -------------------------
+# CAMBIOS PUNTUALES
+# -------------------------
+def test_insertar_fila_sin_volver_a_consultar(tabla, fuente):
+    fuente.filas.insert(2, (5000, "Nuevo"))
+    pedidos = len(fuente.pedidos)
+    tabla.insertar_fila((5000, "Nuevo"), 2)
+    assert tabla.total == 1001
+    assert visibles(tabla)[1:4] == ["Cliente 1", "Nuevo", "Cliente 2"]
+    assert len(fuente.pedidos) == pedidos
+
+def test_eliminar_fila_pide_solo_la_pagina_incompleta(tabla, fuente):
+    del fuente.filas[3]
+    tabla.eliminar_fila(3)
+    assert tabla.total == 999
+    assert visibles(tabla)[3] == "Cliente 4"
+    # La pagina 1 perdio su primera fila en la 0: se vuelve a pedir
+    assert fuente.pedidos[-1] == (10, 10)
+    assert tabla.fila(19) == (20, "Cliente 20")
+
+def test_actualizar_fila_en_su_lugar(tabla, fuente):
+    pedidos = len(fuente.pedidos)
+    tabla.actualizar_fila((1, "Cliente Uno"))
+    assert visibles(tabla)[:3] == ["Cliente 0", "Cliente Uno", "Cliente 2"]
+    assert len(fuente.pedidos) == pedidos
+
+def test_aplicar_cambios_en_memoria(tabla, fuente):
+    pedidos = len(fuente.pedidos)
+    assert tabla.aplicar_cambios([(2, "Otro"), (3, "Cliente 3")]) == 1
+    assert visibles(tabla)[2] == "Otro"
+    assert len(fuente.pedidos) == pedidos
+
+def test_aplicar_cambios_fuera_de_memoria_recarga(tabla, fuente):
+    pedidos = len(fuente.pedidos)
+    assert tabla.aplicar_cambios([(900, "Cambiado")], eliminadas=[4]) == 2
+    assert len(fuente.pedidos) == pedidos + 1
+    assert fuente.pedidos[-1] == (0, 20)
+
+
+# -------------------------
+# ORDEN
+# -------------------------
+def test_clic_en_encabezado_alterna_el_orden(raiz, fuente):
+    pedidos = []
+    tabla = TablaVirtual(raiz, ("ID", "Nombre"), fuente.total, fuente.pagina,
+                         alto=5, tamano_pagina=10, al_ordenar=pedidos.append)
+    tabla.recargar()
+    tabla._ir_a(50)
+    assert tabla.inicio == 50
+    for _ in range(3):
+        tabla._clic_encabezado(1)
+        if tabla.orden is not None:
+            assert tabla.arbol.heading("Nombre", "text") == "Nombre" + (" ▼" if tabla.orden[1] else " ▲")
+    assert pedidos == [(1, False), (1, True), None]
+    assert tabla.arbol.heading("Nombre", "text") == "Nombre"
+    assert tabla.inicio == 0
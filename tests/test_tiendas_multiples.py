@@ -0,0 +1,67 @@
+import json
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+import consultas
+import sqlite_local
+import tiendas_multiples
+
+
+def datos_tienda(ventas, unidades, compras, bajo_stock):
+    return {"total_ventas": ventas, "total_ingresos": Decimal(ventas * 10), "total_pedidos": 0,
+            "total_pedidos_monto": 0, "unidades_por_producto": unidades,
+            "compras_por_cliente": compras, "productos_bajo_stock": bajo_stock}
+
+def test_consolidar_suma_antes_de_ordenar():
+    por_tienda = {
+        "centro": datos_tienda(2, [("Mouse", 3), ("Teclado", 5)],
+                               [("12345678", "Ana Rios", 2)], [("Mouse", 4)]),
+        "norte": datos_tienda(1, [("Mouse", 4)],
+                              [("12345678", "Ana Rios", 1), (None, "Sin DNI", 2)], [("Teclado", 1)]),
+    }
+    reporte = tiendas_multiples.consolidar(por_tienda, [("sur", "sin red")])
+    assert reporte["total_ventas"] == 3
+    assert reporte["total_ingresos"] == Decimal(30)
+    # Ninguna tienda tiene al Mouse primero, la suma si
+    assert reporte["productos_mas_vendidos"] == [("Mouse", 7), ("Teclado", 5)]
+    assert reporte["clientes_frecuentes"] == [("Ana Rios", 3), ("Sin DNI", 2)]
+    assert reporte["productos_bajo_stock"] == [("Teclado (norte)", 1), ("Mouse (centro)", 4)]
+    assert reporte["por_tienda"]["norte"]["total_ventas"] == 1
+    assert reporte["sin_respuesta"] == [("sur", "sin red")]
+
+def test_cargar_configuracion(tmp_path):
+    ruta = tmp_path / "tiendas.json"
+    assert tiendas_multiples.cargar_configuracion("DSN=x", str(ruta)) == ("tiendas", {"tiendas": "DSN=x"})
+
+    ruta.write_text(json.dumps({"tiendas": {"centro": "DSN=c", "norte": {"sqlite": "n.db"}}}),
+                    encoding="utf-8")
+    assert tiendas_multiples.cargar_configuracion("DSN=x", str(ruta)) == (
+        "centro", {"centro": "DSN=c", "norte": {"sqlite": "n.db"}})
+
+    ruta.write_text(json.dumps({"local": "sur", "tiendas": {"centro": "DSN=c"}}), encoding="utf-8")
+    with pytest.raises(ValueError):
+        tiendas_multiples.cargar_configuracion("DSN=x", str(ruta))
+
+def test_reporte_de_varias_tiendas(ruta_bd, tmp_path):
+    norte = str(tmp_path / "norte.db")
+    conexion = sqlite_local.conectar(norte)
+    sqlite_local.crear_esquema(conexion, con_ejemplos=True)
+    consultas.aplicar_operaciones(conexion, [
+        ("a" * 32, "venta", (1, "Luis Torres", Decimal("19.90"), date(2025, 1, 15))),
+    ])
+    conexion.close()
+    reporte = tiendas_multiples.ReporteTiendas({
+        "centro": {"sqlite": ruta_bd},
+        "norte": {"sqlite": norte},
+        "sur": {"sqlite": str(tmp_path / "no_existe" / "sur.db")},
+    }, conexiones_por_tienda=1)
+    try:
+        datos = reporte.generar()
+    finally:
+        reporte.cerrar()
+    assert datos["total_ventas"] == 1
+    assert datos["por_tienda"]["centro"]["total_ventas"] == 0
+    assert [nombre for nombre, _ in datos["sin_respuesta"]] == ["sur"]
+    assert len(datos["productos_bajo_stock"]) == 2
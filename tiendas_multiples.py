@@ -0,0 +1,133 @@
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import consultas
+from pool_conexiones import PoolConexiones
+from reporte import MotorReporte
+
+# =========================
+# VARIAS TIENDAS
+# =========================
+# Cada tienda tiene su propia base de datos con el esquema completo. La
+# aplicacion trabaja con la base de su tienda ("local") y solo el reporte
+# consolidado consulta a las demas: cada tienda calcula sus totales y
+# agrupaciones en paralelo y aqui se suman.
+#
+# tiendas.json, junto al programa (si no existe hay una sola tienda):
+#   {
+#       "local": "centro",
+#       "tiendas": {
+#           "centro": "DRIVER={SQL Server};SERVER=localhost;DATABASE=tiendas_centro;Trusted_Connection=yes;",
+#           "norte": "DRIVER={SQL Server};SERVER=norte;DATABASE=tiendas_norte;Trusted_Connection=yes;",
+#           "prueba": {"sqlite": "prueba.db"}
+#       }
+#   }
+# Un texto es una cadena de conexion ODBC; {"sqlite": ruta} usa una base
+# local de sqlite_local.py, util para probar con varios archivos.
+
+ARCHIVO_TIENDAS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tiendas.json")
+TIENDA_UNICA = "tiendas"
+
+
+def cargar_configuracion(cadena_por_defecto, ruta=ARCHIVO_TIENDAS):
+    # Devuelve (nombre_local, {nombre: origen})
+    if not os.path.exists(ruta):
+        return TIENDA_UNICA, {TIENDA_UNICA: cadena_por_defecto}
+    with open(ruta, encoding="utf-8") as archivo:
+        configuracion = json.load(archivo)
+    origenes = configuracion.get("tiendas") or {}
+    if not origenes:
+        raise ValueError(f"{ruta}: no hay tiendas configuradas")
+    local = configuracion.get("local") or next(iter(origenes))
+    if local not in origenes:
+        raise ValueError(f"{ruta}: la tienda local '{local}' no esta en la lista")
+    return local, origenes
+
+def fabrica_conexion(origen):
+    # Funcion sin argumentos que abre una conexion nueva, para PoolConexiones
+    if isinstance(origen, dict) and "sqlite" in origen:
+        import sqlite_local
+        return partial(sqlite_local.conectar, origen["sqlite"])
+    import pyodbc
+    return partial(pyodbc.connect, origen)
+
+
+def consolidar(por_tienda, sin_respuesta=()):
+    # por_tienda: {nombre: datos de consultas.PARTES_CONSOLIDADO}. Devuelve
+    # las mismas claves que el reporte general mas el detalle por tienda.
+    totales = {"total_ventas": 0, "total_ingresos": 0, "total_pedidos": 0, "total_pedidos_monto": 0}
+    unidades = Counter()
+    compras = {}  # dni -> [cliente, compras]
+    bajo_stock = []
+    detalle = {}
+    for tienda, datos in por_tienda.items():
+        detalle[tienda] = {clave: datos[clave] for clave in totales}
+        for clave in totales:
+            totales[clave] += datos[clave]
+        for nombre, cantidad in datos["unidades_por_producto"]:
+            unidades[nombre] += cantidad
+        for dni, cliente, cantidad in datos["compras_por_cliente"]:
+            acumulado = compras.setdefault(dni or cliente, [cliente, 0])
+            acumulado[1] += cantidad
+        bajo_stock.extend((f"{nombre} ({tienda})", stock)
+                          for nombre, stock in datos["productos_bajo_stock"])
+
+    return dict(
+        totales,
+        productos_mas_vendidos=unidades.most_common(5),
+        clientes_frecuentes=sorted((tuple(valor) for valor in compras.values()),
+                                   key=lambda fila: fila[1], reverse=True)[:5],
+        productos_bajo_stock=sorted(bajo_stock, key=lambda fila: fila[1])[:5],
+        por_tienda=detalle,
+        sin_respuesta=list(sin_respuesta),
+    )
+
+
+class ReporteTiendas:
+    # Un MotorReporte por tienda: dentro de cada tienda las partes corren en
+    # paralelo y las tiendas tambien, asi el consolidado tarda lo que la
+    # parte mas lenta de la tienda mas lenta. No guarda resultados: las
+    # ventas de las otras tiendas no avisan a esta aplicacion.
+    def __init__(self, origenes, local=None, pool_local=None, conexiones_por_tienda=2):
+        self._pools = {}
+        self._propios = []  # pools creados aqui, que se cierran aqui
+        for nombre, origen in origenes.items():
+            if nombre == local and pool_local is not None:
+                self._pools[nombre] = pool_local
+            else:
+                pool = PoolConexiones(fabrica_conexion(origen), tamano_maximo=conexiones_por_tienda,
+                                      tiempo_espera=30.0)
+                self._pools[nombre] = pool
+                self._propios.append(pool)
+        self._motores = {nombre: MotorReporte(pool, partes=consultas.PARTES_CONSOLIDADO, vigencia=0)
+                         for nombre, pool in self._pools.items()}
+        self._hilos = ThreadPoolExecutor(max_workers=len(self._motores), thread_name_prefix="tiendas")
+
+    @property
+    def tiendas(self):
+        return list(self._motores)
+
+    def generar(self):
+        # Pensado para un hilo de fondo. Una tienda caida no impide el
+        # reporte de las demas: queda en "sin_respuesta".
+        futuros = {nombre: self._hilos.submit(motor.generar) for nombre, motor in self._motores.items()}
+        por_tienda, sin_respuesta = {}, []
+        for nombre, futuro in futuros.items():
+            try:
+                por_tienda[nombre] = futuro.result()
+            except Exception as e:
+                sin_respuesta.append((nombre, str(e)))
+        if not por_tienda:
+            raise RuntimeError("Ninguna tienda respondió:\n" +
+                               "\n".join(f"{nombre}: {error}" for nombre, error in sin_respuesta))
+        return consolidar(por_tienda, sin_respuesta)
+
+    def cerrar(self):
+        self._hilos.shutdown(wait=False, cancel_futures=True)
+        for motor in self._motores.values():
+            motor.cerrar()
+        for pool in self._propios:
+            pool.cerrar()
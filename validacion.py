@@ -0,0 +1,64 @@
+from decimal import Decimal, InvalidOperation
+
+from consultas import ErrorNegocio
+
+# =========================
+# VALIDACION DE DATOS
+# =========================
+# Reglas comunes a los formularios y a la importacion masiva: reciben los
+# textos tal como se escribieron (en un Entry o en una celda del CSV) y
+# devuelven el diccionario que esperan las funciones de consultas.py, o
+# lanzan ErrorNegocio con el mensaje para el usuario.
+
+# Largo maximo de cada columna de texto, como en SQLQueryDB.tiendas.sql
+LARGOS_CLIENTE = {"nombre": 100, "apellido": 100, "telefono": 15, "correo": 100, "direccion": 150}
+LARGOS_PRODUCTO = {"nombre": 100, "categoria": 100, "marca": 50}
+
+def _texto(valor):
+    return (valor or "").strip()
+
+def _verificar_largos(datos, largos):
+    for campo, largo in largos.items():
+        if datos[campo] and len(datos[campo]) > largo:
+            raise ErrorNegocio(f"El campo {campo} admite como maximo {largo} caracteres")
+
+def cliente_desde_campos(nombre, apellido, dni, telefono=None, correo=None, direccion=None):
+    cliente = {
+        "nombre": _texto(nombre).title(),
+        "apellido": _texto(apellido).title(),
+        "dni": _texto(dni),
+        "telefono": _texto(telefono) or None,
+        "correo": _texto(correo).lower() or None,
+        "direccion": _texto(direccion) or None
+    }
+    if not all([cliente["nombre"], cliente["apellido"], cliente["dni"]]):
+        raise ErrorNegocio("Nombre, Apellido y DNI son obligatorios")
+    if len(cliente["dni"]) != 8 or not cliente["dni"].isdigit():
+        raise ErrorNegocio("El DNI debe tener 8 dígitos numéricos")
+    _verificar_largos(cliente, LARGOS_CLIENTE)
+    return cliente
+
+def producto_desde_campos(nombre, categoria, marca, precio, stock):
+    if not all([_texto(nombre), _texto(precio)]):
+        raise ErrorNegocio("Nombre y Precio son obligatorios")
+    try:
+        # Decimal, como la columna: "19.90" no pasa por el float 19.899999...
+        precio = Decimal(_texto(precio))
+        stock = int(_texto(stock) or 0)
+    except (InvalidOperation, ValueError):
+        raise ErrorNegocio("Precio y Stock deben ser valores numéricos")
+    if not precio.is_finite() or precio <= 0:
+        raise ErrorNegocio("El precio debe ser mayor a 0")
+    if precio >= 10 ** 8:  # DECIMAL(10,2)
+        raise ErrorNegocio("El precio es demasiado alto")
+    if stock < 0:
+        raise ErrorNegocio("El stock no puede ser negativo")
+    producto = {
+        "nombre": _texto(nombre),
+        "categoria": _texto(categoria) or "General",
+        "marca": _texto(marca) or "Sin marca",
+        "precio": precio,
+        "stock": stock
+    }
+    _verificar_largos(producto, LARGOS_PRODUCTO)
+    return producto